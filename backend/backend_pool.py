@@ -0,0 +1,398 @@
+"""
+Fish Speech 后端池
+
+FISH_SPEECH_BACKENDS 配置多个 Fish Speech 实例，每次请求选择一个后端：
+- least_outstanding: 进行中请求最少的后端（相同时选延迟 EWMA 较低的）
+- ewma: 延迟 EWMA ×（进行中请求数 + 1）最小的后端
+后台定期探测 /v1/health，探测失败的后端不参与路由；连续请求失败
+（连接错误、超时、502/503/504）达到阈值时摘除一段时间。
+可重试的失败会换一个后端重试。全部后端都不可用时仍选一个尝试。
+指定 hedge_after 时，请求超过该时间仍未返回就向另一个后端发出相同请求，
+先成功的一方胜出，另一方被取消（对冲请求，降低长尾延迟）。
+max_inflight 限制同时发往每个后端的请求数（分段并发、重试和对冲都计入），
+池的总容量随后端数量增加；所有可用后端都满时请求在池内等待，
+有后端释放名额后再选择。对冲请求只占用另一个后端的空闲名额
+（计入该后端的上限），没有空闲名额的后端时不发对冲请求，也不排队等待。
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import random
+import time
+
+import httpx
+
+# 换后端重试的上游状态码
+RETRY_STATUS = (502, 503, 504)
+# 延迟 EWMA 的平滑系数
+EWMA_ALPHA = 0.3
+
+
+class Backend:
+    """单个 Fish Speech 实例的路由状态"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.outstanding = 0
+        self.ewma_latency = 0.0  # 秒，0 表示还没有样本
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.last_error: Optional[str] = None
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "ejected_for": round(max(0.0, self.ejected_until - now), 1),
+            "outstanding": self.outstanding,
+            "ewma_ms": round(self.ewma_latency * 1000, 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "last_error": self.last_error
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """流式响应关闭时释放后端的进行中计数"""
+
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class BackendPool:
+    """带健康检查和失败摘除的负载均衡"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        client_factory: Callable[[], httpx.AsyncClient],
+        strategy: str = "least_outstanding",
+        health_interval: float = 10.0,
+        health_path: str = "/v1/health",
+        failure_threshold: int = 3,
+        eject_seconds: float = 30.0,
+        max_attempts: int = 2,
+        max_inflight: int = 0
+    ):
+        if not urls:
+            raise ValueError("至少需要配置一个 Fish Speech 后端")
+        self.backends = [Backend(url) for url in urls]
+        self.client_factory = client_factory
+        self.strategy = strategy
+        self.health_interval = health_interval
+        self.health_path = health_path
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.max_attempts = max(1, max_attempts)
+        # 每个后端的进行中请求上限，0 表示不限制
+        self.max_inflight = max_inflight
+        self._waiters: List[asyncio.Future] = []
+        self.waiting = 0
+        self._probe_task: Optional[asyncio.Task] = None
+        self.retries = 0
+        self.probes = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def urls(self) -> List[str]:
+        return [b.url for b in self.backends]
+
+    # ---- 选择 ----
+
+    def _score(self, backend: Backend):
+        if self.strategy == "ewma":
+            return (backend.ewma_latency * (backend.outstanding + 1), backend.outstanding)
+        return (backend.outstanding, backend.ewma_latency)
+
+    def pick(self, exclude: Optional[set] = None) -> Backend:
+        """选择一个后端；可用后端都已尝试过或都不可用时退回全部后端中最优的一个"""
+        exclude = exclude or set()
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b.available(now) and b.url not in exclude]
+        if not candidates:
+            candidates = [b for b in self.backends if b.url not in exclude] or self.backends
+        best = min(self._score(b) for b in candidates)
+        # 分数相同时随机，避免所有 worker 同时打到第一个后端
+        return random.choice([b for b in candidates if self._score(b) == best])
+
+    def _has_capacity(self, backend: Backend) -> bool:
+        return self.max_inflight <= 0 or backend.outstanding < self.max_inflight
+
+    def _pick_free(self, tried: set) -> Optional[Backend]:
+        """
+        在还有名额的后端中选择（与 pick 相同的优先级）；没有名额时返回 None
+        有可用后端时只在可用后端中选，不会因为它们都满了就发往已摘除的后端
+        """
+        now = time.monotonic()
+        pool = [b for b in self.backends if b.available(now)] or self.backends
+        free = [b for b in pool if self._has_capacity(b)]
+        if not free:
+            return None
+        exclude = {b.url for b in self.backends if b not in free}
+        if all(b.url in tried for b in free):
+            return self.pick(exclude)
+        return self.pick(exclude | tried)
+    # ---- 结果记录 ----
+
+    def _success(self, backend: Backend, latency: float):
+        backend.consecutive_failures = 0
+        if backend.ewma_latency == 0.0:
+            backend.ewma_latency = latency
+        else:
+            backend.ewma_latency = (1 - EWMA_ALPHA) * backend.ewma_latency + EWMA_ALPHA * latency
+
+    def _failure(self, backend: Backend, error: str):
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        backend.last_error = error
+        if backend.consecutive_failures >= self.failure_threshold and len(self.backends) > 1:
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+            backend.consecutive_failures = 0
+            backend.ejections += 1
+            print(f"[BackendPool] 连续失败，摘除 {backend.url} {self.eject_seconds:.0f}s: {error}")
+
+    # ---- 请求 ----
+
+    async def _send(self, method: str, path: str, stream: bool, tried: set,
+                    reserved: Optional[List[Backend]] = None, **kwargs) -> httpx.Response:
+        """reserved 中是已占用名额的后端（对冲请求），第一次尝试直接使用"""
+        attempts = min(self.max_attempts, len(self.backends))
+        for attempt in range(attempts):
+            if reserved:
+                backend = reserved.pop()
+            else:
+                backend = await self._acquire(tried)
+            tried.add(backend.url)
+            last = attempt == attempts - 1
+            backend.requests += 1
+            released = False
+
+            def release(backend=backend):
+                nonlocal released
+                if not released:
+                    released = True
+                    self._release_slot(backend)
+
+            start = time.monotonic()
+            try:
+                client = self.client_factory()
+                request = client.build_request(method, f"{backend.url}{path}", **kwargs)
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                release()
+                self._failure(backend, f"{type(e).__name__}: {e}")
+                if last:
+                    raise
+                self.retries += 1
+                print(f"[BackendPool] {backend.url} 请求失败，换后端重试: {type(e).__name__}")
+                continue
+            except BaseException:
+                release()
+                raise
+
+            if response.status_code in RETRY_STATUS:
+                self._failure(backend, f"HTTP {response.status_code}")
+                if not last:
+                    await response.aclose()
+                    release()
+                    self.retries += 1
+                    print(f"[BackendPool] {backend.url} 返回 {response.status_code}，换后端重试")
+                    continue
+            else:
+                # 流式请求按首包（响应头）时间计延迟
+                self._success(backend, time.monotonic() - start)
+            # 调用方可据此得知实际处理请求的后端和该次请求的耗时
+            response.extensions["backend"] = backend.url
+            response.extensions["backend_latency"] = time.monotonic() - start
+
+            if stream and not response.is_closed:
+                response.stream = _ReleasingStream(response.stream, release)
+            else:
+                release()
+            return response
+
+    async def _acquire(self, tried: set) -> Backend:
+        """选择一个还有名额的后端并占用一个名额；所有后端都满时等待"""
+        backend = self._pick_free(tried)
+        if backend is None:
+            self.waiting += 1
+            try:
+                while backend is None:
+                    waiter = asyncio.get_running_loop().create_future()
+                    self._waiters.append(waiter)
+                    try:
+                        await waiter
+                    finally:
+                        if waiter in self._waiters:
+                            self._waiters.remove(waiter)
+                    backend = self._pick_free(tried)
+            finally:
+                self.waiting -= 1
+        backend.outstanding += 1
+        return backend
+
+    def _release_slot(self, backend: Backend):
+        """释放名额并唤醒等待者重新选择后端（等待数量有限，全部唤醒）"""
+        backend.outstanding -= 1
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _reserve_hedge(self, tried: set) -> Optional[Backend]:
+        """为对冲请求占用一个未尝试过的可用后端的空闲名额；没有时返回 None（不等待）"""
+        now = time.monotonic()
+        free = [b for b in self.backends
+                if b.available(now) and b.url not in tried and self._has_capacity(b)]
+        if not free:
+            return None
+        backend = self.pick({b.url for b in self.backends if b not in free})
+        backend.outstanding += 1
+        return backend
+
+    async def _hedged(self, method: str, path: str, stream: bool,
+                      hedge_after: Optional[float], **kwargs) -> httpx.Response:
+        tried = set()
+        primary = asyncio.ensure_future(self._send(method, path, stream, tried, **kwargs))
+        if hedge_after is None or len(self.backends) < 2:
+            return await primary
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        target = None if done else self._reserve_hedge(tried)
+        if target is None:
+            return await primary
+
+        self.hedges += 1
+        print(f"[BackendPool] {hedge_after:.2f}s 未返回，向 {target.url} 发出对冲请求")
+        reserved = [target]
+        hedge = asyncio.ensure_future(self._send(method, path, stream, tried, reserved, **kwargs))
+        pending = {primary, hedge}
+        failed = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code == 200:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        for other in done - {task}:
+                            await self._discard(other)
+                        return task.result()
+                    failed.append(task)
+            # 两个请求都失败：返回第一个错误响应，否则抛出第一个异常
+            for task in failed:
+                if task.exception() is None:
+                    for other in failed:
+                        if other is not task:
+                            await self._discard(other)
+                    return task.result()
+            raise failed[0].exception()
+        finally:
+            # 取消落败的请求（_send 被取消时会释放进行中计数）
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            if reserved:
+                # 对冲任务还没开始执行就被取消，归还预先占用的名额
+                self._release_slot(reserved.pop())
+
+    @staticmethod
+    async def _discard(task: asyncio.Task):
+        """关闭已完成但落败的请求的响应"""
+        if not task.cancelled() and task.exception() is None:
+            await task.result().aclose()
+
+    async def request(self, method: str, path: str, hedge_after: Optional[float] = None,
+                      **kwargs) -> httpx.Response:
+        """发送请求并读取完整响应；连接失败或 502/503/504 时换后端重试"""
+        return await self._hedged(method, path, False, hedge_after, **kwargs)
+
+    async def stream(self, method: str, path: str, hedge_after: Optional[float] = None,
+                     **kwargs) -> httpx.Response:
+        """发送流式请求，返回未读取正文的响应（调用方负责 aclose）"""
+        return await self._hedged(method, path, True, hedge_after, **kwargs)
+
+    # ---- 健康检查 ----
+
+    async def probe(self, backend: Backend):
+        """探测单个后端的健康检查接口"""
+        self.probes += 1
+        try:
+            response = await self.client_factory().get(
+                f"{backend.url}{self.health_path}", timeout=min(5.0, self.health_interval)
+            )
+            ok = response.status_code == 200
+            error = None if ok else f"health HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            ok, error = False, f"health {type(e).__name__}"
+        if ok != backend.healthy:
+            print(f"[BackendPool] {backend.url} {'恢复' if ok else '健康检查失败'}"
+                  + (f": {error}" if error else ""))
+        backend.healthy = ok
+        if error:
+            backend.last_error = error
+
+    async def probe_all(self):
+        await asyncio.gather(*(self.probe(b) for b in self.backends))
+
+    async def _probe_loop(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                print(f"[BackendPool] 健康检查异常: {e}")
+            await asyncio.sleep(self.health_interval)
+
+    def start(self):
+        """启动后台健康检查（只有一个后端或间隔为 0 时不探测）"""
+        if self._probe_task is None and self.health_interval > 0 and len(self.backends) > 1:
+            self._probe_task = asyncio.ensure_future(self._probe_loop())
+
+    async def aclose(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "strategy": self.strategy,
+            "max_inflight": self.max_inflight,
+            "inflight": sum(b.outstanding for b in self.backends),
+            "waiting": self.waiting,
+            "available": sum(1 for b in self.backends if b.available(now)),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "probes": self.probes,
+            "backends": [b.to_dict(now) for b in self.backends]
+        }
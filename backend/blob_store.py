@@ -0,0 +1,222 @@
+"""
+参考音频存储（内容寻址，磁盘）
+
+上传的参考音频按块流式写入 outputs/blobs/，以 SHA-256 命名并去重，
+会话中只保存哈希。音频内容只在发送给 Fish Speech 时才读取，
+几个用户上传长音频不会占满 worker 内存。
+单个文件超过大小上限时拒绝；目录总大小超过上限时淘汰最久未使用的文件。
+LRU 索引是进程内的，淘汰前通过 referenced() 查询仍被会话引用的哈希
+（SQLite 会话存储时覆盖所有 worker 的会话），被引用的文件不会删除。
+读取在线程池中执行、写入在事件循环中执行，索引和计数的修改都在 _lock 内完成；
+referenced() 在锁外调用，避免与会话存储的锁互相等待。
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set
+import hashlib
+import os
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobTooLarge(ValueError):
+    """上传的音频超过大小上限"""
+
+
+class BlobStore:
+    """内容寻址的音频文件目录"""
+
+    def __init__(
+        self,
+        root: str,
+        max_blob_bytes: int = 50 * 1024 * 1024,
+        max_total_bytes: int = 2048 * 1024 * 1024,
+        referenced: Optional[Callable[[], Set[str]]] = None
+    ):
+        self.root = root
+        self.max_blob_bytes = max_blob_bytes
+        self.max_total_bytes = max_total_bytes
+        # 返回仍被会话引用的哈希；未设置时不知道引用关系，不淘汰任何文件
+        self.referenced = referenced
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # hash -> 文件大小，按最近使用排序
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.dedup_hits = 0
+        self.rejected = 0
+        self.evicted = 0
+        self._load_index()
+
+    def _path(self, blob_hash: str) -> str:
+        return os.path.join(self.root, f"{blob_hash}.bin")
+
+    def _load_index(self):
+        """启动时扫描目录，按 mtime 恢复 LRU 顺序（超出上限的部分在下次写入时淘汰）"""
+        os.makedirs(self.root, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".part"):
+                # 上次写入中断留下的临时文件
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".bin"):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, blob_hash, size in sorted(entries):
+            self._index[blob_hash] = size
+            self._total_bytes += size
+
+    async def put_upload(self, upload) -> str:
+        """按块读取 UploadFile 写入存储，返回哈希；超过上限抛出 BlobTooLarge"""
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(self.root, f"upload_{os.urandom(8).hex()}.part")
+        size = 0
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            with open(tmp_path, "wb") as f:
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_blob_bytes:
+                        with self._lock:
+                            self.rejected += 1
+                        raise BlobTooLarge(
+                            f"参考音频超过大小上限 {self.max_blob_bytes // (1024 * 1024)}MB"
+                        )
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self._commit(tmp_path, digest.hexdigest(), size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_bytes(self, data: bytes) -> str:
+        """写入内存中的音频，返回哈希"""
+        if len(data) > self.max_blob_bytes:
+            with self._lock:
+                self.rejected += 1
+            raise BlobTooLarge(f"参考音频超过大小上限 {self.max_blob_bytes // (1024 * 1024)}MB")
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f"upload_{os.urandom(8).hex()}.part")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        try:
+            return self._commit(tmp_path, hashlib.sha256(data).hexdigest(), len(data))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _commit(self, tmp_path: str, blob_hash: str, size: int) -> str:
+        """临时文件改名为内容哈希；已存在相同内容时直接复用"""
+        path = self._path(blob_hash)
+        if os.path.exists(path):
+            with self._lock:
+                self.dedup_hits += 1
+            self._touch(blob_hash, path)
+            return blob_hash
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.writes += 1
+            if blob_hash not in self._index:
+                self._index[blob_hash] = size
+                self._total_bytes += size
+        self._evict(keep=blob_hash)
+        return blob_hash
+
+    def _touch(self, blob_hash: str, path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if blob_hash in self._index:
+                self._index.move_to_end(blob_hash)
+                return
+        # 其他 worker 写入的文件
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._lock:
+            if blob_hash not in self._index:
+                self._index[blob_hash] = size
+                self._total_bytes += size
+
+    def exists(self, blob_hash: str) -> bool:
+        return os.path.exists(self._path(blob_hash))
+
+    def size(self, blob_hash: str) -> int:
+        return os.path.getsize(self._path(blob_hash))
+
+    def read(self, blob_hash: str) -> bytes:
+        """读取音频内容；文件已被淘汰时抛出 KeyError"""
+        path = self._path(blob_hash)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._drop(blob_hash)
+            raise KeyError(f"参考音频已被清理，请重新上传: {blob_hash[:12]}")
+        self._touch(blob_hash, path)
+        return data
+
+    def _drop(self, blob_hash: str):
+        with self._lock:
+            size = self._index.pop(blob_hash, None)
+            if size is not None:
+                self._total_bytes -= size
+        try:
+            os.remove(self._path(blob_hash))
+        except OSError:
+            pass
+
+    def _evict(self, keep: str = ""):
+        """按 LRU 删除未被会话引用的文件，直到总大小在上限内"""
+        with self._lock:
+            if self._total_bytes <= self.max_total_bytes or self.referenced is None:
+                return
+        referenced = self.referenced()
+        victims = []
+        with self._lock:
+            for blob_hash in list(self._index):
+                if self._total_bytes <= self.max_total_bytes:
+                    break
+                if blob_hash == keep or blob_hash in referenced:
+                    continue
+                self._total_bytes -= self._index.pop(blob_hash)
+                self.evicted += 1
+                victims.append(blob_hash)
+            over_limit = self._total_bytes > self.max_total_bytes
+            remaining = len(self._index)
+        for blob_hash in victims:
+            print(f"[BlobStore] 超出总大小上限，删除: {blob_hash[:12]}")
+            try:
+                os.remove(self._path(blob_hash))
+            except OSError:
+                pass
+        if over_limit:
+            print(f"[BlobStore] 超出总大小上限，剩余 {remaining} 个文件仍被会话引用")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            blobs, total_bytes = len(self._index), self._total_bytes
+        return {
+            "blobs": blobs,
+            "bytes": total_bytes,
+            "max_blob_bytes": self.max_blob_bytes,
+            "max_total_bytes": self.max_total_bytes,
+            "writes": self.writes,
+            "dedup_hits": self.dedup_hits,
+            "rejected": self.rejected,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,118 @@
+"""
+熔断器
+
+按上游统计最近 window 次调用的失败率和慢调用率，任一超过阈值时熔断（open）：
+熔断期间 allow() 直接返回 False，调用方立即走本地兜底，不再等待超时。
+open_seconds 后进入半开（half_open），放行少量探测请求，
+探测成功则恢复（closed），失败则重新熔断。
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """错误率 / 慢调用率熔断"""
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (失败, 慢调用)
+        self._opened_at = 0.0
+        self._probes = 0
+        self.opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        """是否放行本次调用（半开时占用一个探测名额，调用结束后必须 record）"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probes = 0
+            print(f"[CircuitBreaker] {self.name} 半开，放行探测请求")
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                self.rejected += 1
+                return False
+            self._probes += 1
+        return True
+
+    def release(self):
+        """调用被取消（没有结果），归还半开探测名额"""
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def record(self, success: bool, latency: float, error: Optional[str] = None):
+        """记录一次调用结果"""
+        slow = latency >= self.slow_call_seconds
+        if not success:
+            self.last_error = error
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if success and not slow:
+                self.state = CLOSED
+                self._calls.clear()
+                print(f"[CircuitBreaker] {self.name} 探测成功，恢复")
+            else:
+                self._open(error or f"探测过慢 {latency:.1f}s")
+            return
+        self._calls.append((not success, slow))
+        if self.state == CLOSED and len(self._calls) >= self.min_calls:
+            failures, slows = self._rates()
+            if failures >= self.failure_rate:
+                self._open(f"失败率 {failures:.0%}")
+            elif slows >= self.slow_call_rate:
+                self._open(f"慢调用率 {slows:.0%}")
+
+    def _rates(self) -> Tuple[float, float]:
+        if not self._calls:
+            return 0.0, 0.0
+        count = len(self._calls)
+        return (sum(1 for failed, _ in self._calls if failed) / count,
+                sum(1 for _, slow in self._calls if slow) / count)
+
+    def _open(self, reason: str):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+        print(f"[CircuitBreaker] {self.name} 熔断 {self.open_seconds:.0f}s: {reason}")
+
+    def stats(self) -> Dict[str, Any]:
+        failures, slows = self._rates()
+        retry_in = 0.0
+        if self.state == OPEN:
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        return {
+            "state": self.state,
+            "failure_rate": round(failures, 3),
+            "slow_call_rate": round(slows, 3),
+            "calls": len(self._calls),
+            "retry_in": round(retry_in, 1),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,164 @@
+"""
+本地情感分类器（词典 + n-gram 匹配，纯 CPU）
+
+用于 analyze_text 的快速通道：对关键词明确的文本直接给出情感标签和
+置信度，只有置信度低于阈值时才调用大模型。返回结构与
+LLMService.analyze_text 一致。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+from emotion_tags import EMOTION_TAGS, normalize_tag
+
+# 标签 -> [(短语, 权重)]；"" 表示中性（通知、客服等平铺直叙的文本）
+LEXICON: Dict[str, List[Tuple[str, float]]] = {
+    "happy": [("开心", 2.0), ("高兴", 2.0), ("快乐", 1.5), ("哈哈", 2.0), ("太好了", 2.0), ("好开心", 2.5),
+              ("恭喜", 2.0), ("祝贺", 2.0), ("喜欢", 1.0), ("棒", 1.0), ("happy", 2.0), ("glad", 1.5),
+              ("congratulations", 2.0), ("great news", 2.0)],
+    "excited": [("太棒了", 2.5), ("激动", 2.5), ("兴奋", 2.5), ("哇", 2.0), ("终于", 1.0), ("冲", 1.0),
+                ("惊喜", 1.5), ("不敢相信", 1.5), ("amazing", 2.0), ("awesome", 2.0), ("excited", 2.5),
+                ("can't wait", 2.0), ("wow", 2.0)],
+    "sad": [("难过", 2.5), ("伤心", 2.5), ("悲伤", 2.5), ("哭", 1.5), ("遗憾", 1.5), ("失去", 1.5),
+            ("去世", 2.5), ("离开了", 1.5), ("再也", 1.5), ("想念", 1.5), ("sad", 2.5), ("miss you", 2.0),
+            ("passed away", 2.5), ("heartbroken", 2.5)],
+    "unhappy": [("不开心", 2.5), ("不高兴", 2.5), ("郁闷", 2.5), ("烦死了", 2.5), ("unhappy", 2.5)],
+    "angry": [("生气", 2.5), ("气死", 3.0), ("愤怒", 2.5), ("混蛋", 3.0), ("滚", 2.0), ("凭什么", 2.0),
+              ("太过分", 2.5), ("受够了", 2.5), ("angry", 2.5), ("furious", 2.5), ("how dare", 2.5),
+              ("fed up", 2.0)],
+    "scared": [("害怕", 2.5), ("恐怖", 2.0), ("吓", 1.5), ("救命", 2.5), ("scared", 2.5), ("afraid", 2.0),
+               ("terrified", 2.5)],
+    "worried": [("担心", 2.5), ("怎么办", 2.0), ("着急", 1.5), ("会不会", 1.0), ("worried", 2.5),
+                ("concerned", 1.5)],
+    "surprised": [("竟然", 2.0), ("居然", 2.0), ("没想到", 2.0), ("天哪", 2.0), ("真的吗", 1.5),
+                  ("surprised", 2.5), ("really?", 1.5), ("no way", 2.0)],
+    "grateful": [("感谢", 2.0), ("谢谢", 1.5), ("感恩", 2.5), ("多亏", 1.5), ("thank you", 2.0),
+                 ("thanks", 1.5), ("grateful", 2.5)],
+    "sincere": [("抱歉", 2.0), ("对不起", 2.5), ("不好意思", 1.5), ("致歉", 2.5), ("深表歉意", 3.0),
+                ("sorry", 2.0), ("apologize", 2.5)],
+    "comforting": [("别担心", 2.5), ("没关系", 2.0), ("会好起来", 2.5), ("别难过", 2.5), ("加油", 1.5),
+                   ("don't worry", 2.5), ("it's okay", 2.0), ("it will be fine", 2.5)],
+    "serious": [("严禁", 2.5), ("警告", 2.5), ("务必", 2.0), ("必须", 1.0), ("严肃", 2.0), ("违规", 2.0),
+                ("处罚", 2.0), ("warning", 2.5), ("must not", 2.0), ("strictly", 2.0)],
+    "in a hurry tone": [("赶紧", 2.5), ("快点", 2.5), ("来不及", 2.5), ("马上", 1.5), ("立刻", 1.5),
+                        ("紧急", 2.0), ("hurry", 2.5), ("right now", 1.5), ("urgent", 2.0)],
+    "whispering": [("悄悄", 2.5), ("小声", 2.5), ("嘘", 2.5), ("秘密", 1.0), ("whisper", 2.5)],
+    "calm": [("晚安", 2.0), ("宁静", 2.0), ("慢慢", 1.0), ("放松", 1.5), ("深呼吸", 2.5), ("relax", 2.0),
+             ("good night", 2.0)],
+    "": [("通知", 2.0), ("您好", 1.5), ("尊敬的", 2.0), ("温馨提示", 2.5), ("请", 0.5), ("请注意", 1.5),
+         ("您的", 1.0), ("订单", 1.5), ("验证码", 3.0), ("已发货", 2.5), ("客服", 1.5), ("营业时间", 2.5),
+         ("按1", 2.5), ("请按", 2.5), ("欢迎致电", 3.0), ("第一章", 1.5), ("本课程", 2.0),
+         ("dear customer", 2.5), ("please note", 2.0), ("your order", 2.0), ("press 1", 2.5)],
+}
+
+# 各标签推荐语速
+TAG_SPEED = {
+    "excited": 1.1,
+    "happy": 1.05,
+    "angry": 1.1,
+    "in a hurry tone": 1.2,
+    "sad": 0.9,
+    "comforting": 0.9,
+    "calm": 0.9,
+    "whispering": 0.9,
+    "serious": 0.95,
+}
+
+# 场景关键词（第一个命中的场景生效）
+SCENES: List[Tuple[str, Tuple[str, ...]]] = [
+    ("客服", ("客服", "您好", "请按", "欢迎致电", "订单", "customer")),
+    ("通知", ("通知", "温馨提示", "验证码", "请注意", "已发货", "notice")),
+    ("道歉", ("抱歉", "对不起", "致歉", "sorry")),
+    ("庆祝", ("恭喜", "祝贺", "生日快乐", "congratulations")),
+    ("教学", ("本课程", "第一章", "同学们", "lesson")),
+    ("警示", ("严禁", "警告", "warning")),
+]
+
+# 否定词：紧挨在关键词前面时忽略该关键词
+_NEGATION = re.compile(r"(?:不|没|别|毫不|并不|not |no |don't |never )$", re.IGNORECASE)
+
+_PHRASES: Dict[str, List[Tuple[str, float]]] = {}
+for _tag, _entries in LEXICON.items():
+    for _phrase, _weight in _entries:
+        _PHRASES.setdefault(_phrase.lower(), []).append((_tag, _weight))
+# 一个模式扫描全部短语（长短语优先）
+_PHRASE_PATTERN = re.compile(
+    "|".join(re.escape(p) for p in sorted(_PHRASES, key=len, reverse=True)),
+    re.IGNORECASE
+)
+
+# 命中总分达到该值视为证据充分
+STRONG_SCORE = 3.0
+
+
+class LocalEmotionClassifier:
+    """基于词典的情感分类器，附带快速通道命中统计"""
+
+    def __init__(self, threshold: float = 0.8):
+        self.threshold = threshold
+        self.local_hits = 0   # 置信度达标，跳过大模型
+        self.fallbacks = 0    # 置信度不足，交给大模型
+
+    @staticmethod
+    def score(text: str) -> Dict[str, float]:
+        """各标签得分（否定词修饰的关键词不计分）"""
+        scores: Dict[str, float] = {}
+        lowered = text.lower()
+        for match in _PHRASE_PATTERN.finditer(lowered):
+            if _NEGATION.search(lowered[max(0, match.start() - 7):match.start()]):
+                continue
+            for tag, weight in _PHRASES[match.group(0)]:
+                scores[tag] = scores.get(tag, 0.0) + weight
+        # 多个感叹号加强情绪类标签
+        exclaims = lowered.count("!") + lowered.count("！")
+        if exclaims >= 2:
+            for tag in ("excited", "angry", "happy"):
+                if tag in scores:
+                    scores[tag] += 0.5 * exclaims
+        return scores
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """返回与 analyze_text 相同结构的结果，附加 confidence 和 source"""
+        scores = self.score(text)
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        if ranked:
+            tag, top = ranked[0]
+            second = ranked[1][1] if len(ranked) > 1 else 0.0
+            # 证据强度 × 与次优标签的区分度
+            confidence = min(1.0, top / STRONG_SCORE) * (1.0 - second / top)
+        else:
+            tag, top, confidence = "", 0.0, 0.0
+
+        lowered = text.lower()
+        scene = next((name for name, words in SCENES if any(w in lowered for w in words)), "通用")
+        matched = ", ".join(f"{t or 'neutral'}={s:.1f}" for t, s in ranked[:3]) or "无"
+        emotion_tag = normalize_tag(tag) if tag in EMOTION_TAGS else ""
+        return {
+            "scene": scene,
+            "emotion": emotion_tag or "neutral",
+            "emotion_tag": emotion_tag,
+            "pitch": 0,
+            "speed": TAG_SPEED.get(tag, 1.0),
+            "volume": 1.0,
+            "style": "自然",
+            "reason": f"本地词典分类: 命中 {matched}",
+            "confidence": round(confidence, 3),
+            "source": "local"
+        }
+
+    def try_classify(self, text: str) -> Optional[Dict[str, Any]]:
+        """置信度达到阈值时返回结果并计入命中；否则返回 None"""
+        result = self.classify(text)
+        if result["confidence"] >= self.threshold:
+            self.local_hits += 1
+            return result
+        self.fallbacks += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.local_hits + self.fallbacks
+        return {
+            "threshold": self.threshold,
+            "llm_skipped": self.local_hits,
+            "llm_needed": self.fallbacks,
+            "skip_rate": round(self.local_hits / total, 4) if total else 0.0
+        }
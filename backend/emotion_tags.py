@@ -0,0 +1,160 @@
+"""
+Fish Speech 情感标签注册表
+
+标签词表只在这里维护一份：提示词中的标签目录、合成前的标签清理、
+以及情感标签的校验/规范化都由它生成。
+规范格式为 <|tag|>，同时识别旧格式 (tag)。
+"""
+from typing import Dict, List, Optional, Tuple
+import re
+
+# (分类, [(标签, 中文说明), ...])，顺序即提示词中的展示顺序
+EMOTION_TAG_CATEGORIES: List[Tuple[str, List[Tuple[str, str]]]] = [
+    ("基础情感", [
+        ("happy", "开心"),
+        ("angry", "生气"),
+        ("sad", "悲伤"),
+        ("excited", "兴奋"),
+        ("surprised", "惊讶"),
+        ("satisfied", "满意"),
+        ("delighted", "高兴"),
+        ("scared", "害怕"),
+        ("worried", "担心"),
+        ("upset", "沮丧"),
+        ("nervous", "紧张"),
+        ("frustrated", "沮丧"),
+        ("depressed", "抑郁"),
+        ("empathetic", "共情"),
+        ("embarrassed", "尴尬"),
+        ("disgusted", "厌恶"),
+        ("moved", "感动"),
+        ("proud", "骄傲"),
+        ("relaxed", "放松"),
+        ("grateful", "感激"),
+        ("confident", "自信"),
+        ("interested", "感兴趣"),
+        ("curious", "好奇"),
+        ("confused", "困惑"),
+        ("joyful", "快乐"),
+    ]),
+    ("高级情感", [
+        ("disdainful", "轻蔑"),
+        ("unhappy", "不开心"),
+        ("anxious", "焦虑"),
+        ("hysterical", "歇斯底里"),
+        ("indifferent", "冷漠"),
+        ("impatient", "不耐烦"),
+        ("guilty", "内疚"),
+        ("scornful", "轻蔑"),
+        ("panicked", "恐慌"),
+        ("furious", "愤怒"),
+        ("reluctant", "不情愿"),
+        ("keen", "渴望"),
+        ("disapproving", "不赞成"),
+        ("negative", "消极"),
+        ("denying", "否认"),
+        ("astonished", "震惊"),
+        ("serious", "严肃"),
+        ("sarcastic", "讽刺"),
+        ("conciliative", "安抚"),
+        ("comforting", "安慰"),
+        ("sincere", "真诚"),
+        ("sneering", "嘲笑"),
+        ("hesitating", "犹豫"),
+        ("yielding", "屈服"),
+        ("painful", "痛苦"),
+        ("awkward", "尴尬"),
+        ("amused", "逗乐"),
+    ]),
+    ("特殊效果", [
+        ("laughing", "笑"),
+        ("chuckling", "轻笑"),
+        ("sobbing", "啜泣"),
+        ("crying loudly", "大哭"),
+        ("sighing", "叹息"),
+        ("panting", "喘气"),
+        ("groaning", "呻吟"),
+        ("crowd laughing", "人群笑声"),
+        ("background laughter", "背景笑声"),
+        ("audience laughing", "观众笑声"),
+    ]),
+    ("语调标记", [
+        ("in a hurry tone", "匆忙语气"),
+        ("shouting", "喊叫"),
+        ("screaming", "尖叫"),
+        ("whispering", "耳语"),
+        ("soft tone", "柔和语气"),
+    ]),
+]
+
+# 不在提示词目录中、但历史代码/前端会用到的标签
+EXTRA_TAGS: Dict[str, str] = {
+    "calm": "平静",
+    "soft": "温柔",
+}
+
+# 表示“无情感标签”的取值
+NEUTRAL_TAGS = {"neutral", "none", ""}
+
+EMOTION_TAGS: Dict[str, str] = {
+    tag: desc for _, tags in EMOTION_TAG_CATEGORIES for tag, desc in tags
+}
+EMOTION_TAGS.update(EXTRA_TAGS)
+
+_names = "|".join(re.escape(tag) for tag in sorted(EMOTION_TAGS, key=len, reverse=True))
+# 任一格式的标签（连同两侧空白）或普通空白串；一次 sub 完成去标签和空白归一
+_STRIP_PATTERN = re.compile(
+    rf"(?:\s*(?:\((?:{_names})\)|<\|(?:{_names})\|>))+\s*|\s+",
+    re.IGNORECASE
+)
+# 从任意字符串开头提取标签名：(tag) / <|tag|> / 裸 tag，后面可跟说明文字
+_TAG_VALUE_PATTERN = re.compile(r"^\s*(?:\(\s*([^()]*?)\s*\)|<\|\s*(.*?)\s*\|>|([A-Za-z][A-Za-z ]*))")
+
+
+def strip_tags(text: str) -> str:
+    """去掉文本中所有已知情感标签（两种格式），并合并多余空白"""
+    return _STRIP_PATTERN.sub(" ", text).strip()
+
+
+def tag_name(value: Optional[str]) -> Optional[str]:
+    """
+    解析标签名（小写），支持 "(happy)"、"<|happy|>"、"happy"、"(happy) 开心"
+    无法识别时返回 None，中性标签返回 ""
+    """
+    if not value:
+        return ""
+    if not isinstance(value, str):
+        return None
+    match = _TAG_VALUE_PATTERN.match(value)
+    if not match:
+        return None
+    name = next(g for g in match.groups() if g is not None).strip().lower()
+    if name in NEUTRAL_TAGS:
+        return ""
+    return name if name in EMOTION_TAGS else None
+
+
+def normalize_tag(value: Optional[str]) -> str:
+    """规范化为 <|tag|> 格式；中性或无法识别时返回空字符串"""
+    name = tag_name(value)
+    return f"<|{name}|>" if name else ""
+
+
+def is_valid_tag(value: Optional[str]) -> bool:
+    """是否为已知标签（含中性/空）"""
+    return tag_name(value) is not None
+
+
+def render_catalogue(compact: bool = False) -> str:
+    """生成提示词中的标签目录（compact: 每个分类一行，节省 token）"""
+    blocks = []
+    for category, tags in EMOTION_TAG_CATEGORIES:
+        if compact:
+            blocks.append(f"{category}：" + "，".join(f"{tag} {desc}" for tag, desc in tags))
+        else:
+            lines = [f"{category}："] + [f"- ({tag}) {desc}" for tag, desc in tags]
+            blocks.append("\n".join(lines))
+    return ("\n" if compact else "\n\n").join(blocks)
+
+
+EMOTION_TAG_CATALOGUE = render_catalogue()
@@ -0,0 +1,63 @@
+"""
+HTTP 客户端池
+
+按上游（Fish Speech / Kimi）分别维护长连接的 httpx.AsyncClient，
+复用 TCP/TLS 连接，避免每次请求重新握手。由应用 lifespan 统一关闭。
+"""
+from typing import Dict
+import httpx
+
+
+def _http2_available() -> bool:
+    """检测是否安装了 h2（httpx 的 HTTP/2 支持依赖）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientRegistry:
+    """按上游名称管理共享的 AsyncClient，每个上游独立连接池"""
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        verify: bool = False,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True
+    ):
+        self.timeout = timeout
+        self.verify = verify
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2 and _http2_available()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """获取上游对应的共享客户端（不要在调用方 close）"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                verify=self.verify,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2
+            )
+            self._clients[name] = client
+            print(f"[HTTPClientRegistry] 创建连接池: {name} (http2={self.http2})")
+        return client
+
+    async def aclose(self):
+        """关闭全部客户端，释放连接"""
+        for name, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"[HTTPClientRegistry] 关闭 {name} 失败: {e}")
+        self._clients.clear()
@@ -0,0 +1,218 @@
+"""
+合成任务队列
+
+限制同时访问 TTS 后端的任务数，多出的任务排队；队列按客户端分组，
+空出执行槽时在各客户端之间轮转，一个客户端的突发请求不会饿死其他人。
+队列（总数或单个客户端）已满时抛出 QueueFull，由路由返回 429 和
+Retry-After。每个任务有 job_id，完成后结果保留一段时间供查询。
+"""
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import asyncio
+import os
+import time
+
+
+class QueueFull(Exception):
+    """队列已满"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    """一个排队/执行中/已完成的任务"""
+
+    def __init__(self, client_id: str):
+        self.job_id = f"job_{os.urandom(6).hex()}"
+        self.client_id = client_id
+        self.status = "queued"  # queued / running / done / failed
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._turn: Optional[asyncio.Future] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result if self.status == "done" else None,
+            "error": str(self.error) if self.error is not None else None
+        }
+
+
+class JobQueue:
+    """按客户端公平调度的并发受限任务队列"""
+
+    def __init__(
+        self,
+        concurrency: int = 2,
+        max_queued: int = 64,
+        max_per_client: int = 8,
+        result_ttl: float = 600.0,
+        max_finished: int = 1000
+    ):
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.max_per_client = max_per_client
+        self.result_ttl = result_ttl
+        self.max_finished = max_finished
+        self._queues: "OrderedDict[str, Deque[Job]]" = OrderedDict()  # 客户端 -> 排队任务，按轮转顺序
+        self._jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+        self._running = 0
+        self._queued = 0
+        self._avg_duration = 5.0  # 任务耗时 EWMA（秒），用于估算 Retry-After
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    # ---- 调度 ----
+
+    def enqueue(self, client_id: str) -> Job:
+        """登记一个任务并排队；队列已满时抛出 QueueFull"""
+        self._prune()
+        queue = self._queues.get(client_id)
+        if self._queued >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull("合成队列已满，请稍后重试", self.retry_after(self._queued))
+        if queue is not None and len(queue) >= self.max_per_client:
+            self.rejected += 1
+            raise QueueFull("该客户端排队的任务过多，请稍后重试", self.retry_after(len(queue)))
+        job = Job(client_id)
+        job._turn = asyncio.get_running_loop().create_future()
+        self._jobs[job.job_id] = job
+        self._queues.setdefault(client_id, deque()).append(job)
+        self._queued += 1
+        self._dispatch()
+        return job
+
+    async def wait_turn(self, job: Job):
+        """等待执行槽；等待中被取消时从队列移除"""
+        try:
+            await job._turn
+        except asyncio.CancelledError:
+            if job.status == "queued":
+                self._remove_queued(job)
+            elif job.status == "running":
+                self.finish(job, error=Exception("任务已取消"))
+            raise
+
+    def finish(self, job: Job, result: Any = None, error: Optional[BaseException] = None):
+        """任务结束，释放执行槽"""
+        if job.status != "running":
+            return
+        job.finished_at = time.time()
+        if error is None:
+            job.status, job.result = "done", result
+            self.completed += 1
+        else:
+            job.status, job.error = "failed", error
+            self.failed += 1
+        self._avg_duration = 0.8 * self._avg_duration + 0.2 * (job.finished_at - job.started_at)
+        self._running -= 1
+        self._finished[job.job_id] = job
+        self._dispatch()
+
+    def _dispatch(self):
+        """有空闲执行槽时，按客户端轮转启动排队任务"""
+        while self._running < self.concurrency and self._queues:
+            client_id, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+            # 该客户端移到轮转末尾
+            del self._queues[client_id]
+            if queue:
+                self._queues[client_id] = queue
+            self._queued -= 1
+            self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            job._turn.set_result(None)
+
+    def _remove_queued(self, job: Job):
+        queue = self._queues.get(job.client_id)
+        if queue is not None and job in queue:
+            queue.remove(job)
+            self._queued -= 1
+            if not queue:
+                del self._queues[job.client_id]
+        self._jobs.pop(job.job_id, None)
+
+    def _prune(self):
+        """清理过期的已完成任务"""
+        deadline = time.time() - self.result_ttl
+        while self._finished:
+            job_id, job = next(iter(self._finished.items()))
+            if job.finished_at >= deadline and len(self._finished) <= self.max_finished:
+                break
+            del self._finished[job_id]
+            self._jobs.pop(job_id, None)
+
+    # ---- 执行 ----
+
+    async def _execute(self, job: Job, fn: Callable[[], Awaitable[Any]]):
+        await self.wait_turn(job)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self.finish(job, error=Exception("任务已取消"))
+            raise
+        except Exception as e:
+            self.finish(job, error=e)
+        else:
+            self.finish(job, result=result)
+
+    async def run(self, client_id: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """排队执行 fn 并等待结果（异常原样抛出）"""
+        job = self.enqueue(client_id)
+        await self._execute(job, fn)
+        if job.error is not None:
+            raise job.error
+        # 结果已直接返回给调用方，不在已完成列表中保留（音频可能很大）
+        result, job.result = job.result, None
+        return result
+
+    def submit(self, client_id: str, fn: Callable[[], Awaitable[Any]]) -> Job:
+        """后台排队执行 fn，立即返回任务（通过 get() 查询结果）"""
+        job = self.enqueue(client_id)
+        asyncio.ensure_future(self._execute(job, fn))
+        return job
+
+    # ---- 查询 ----
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> int:
+        """排在该任务之前的排队任务数（估计值）"""
+        if job.status != "queued":
+            return 0
+        return sum(1 for q in self._queues.values() for j in q if j.created_at < job.created_at)
+
+    def idle_slots(self) -> int:
+        """空闲的执行槽数（扣除排队中的任务）"""
+        return max(0, self.concurrency - self._running - self._queued)
+
+    def retry_after(self, queued: int) -> float:
+        """按排队数和平均耗时估算需要等待的秒数"""
+        return max(1.0, queued / max(1, self.concurrency) * self._avg_duration)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "running": self._running,
+            "queued": self._queued,
+            "clients": len(self._queues),
+            "max_queued": self.max_queued,
+            "max_per_client": self.max_per_client,
+            "avg_duration": round(self._avg_duration, 3),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
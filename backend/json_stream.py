@@ -0,0 +1,87 @@
+"""
+增量 JSON 解析
+
+大模型流式输出一个 JSON 对象时，逐块喂入文本，顶层字段一旦完整就解析出来，
+不必等整个对象结束。对象之前的内容（如 ```json 代码块标记）和之后的内容都忽略。
+只跟踪顶层对象：字段值内部的嵌套对象/数组、字符串转义都会正确跳过。
+"""
+from typing import Any, Dict, List, Optional
+import json
+
+
+class IncrementalJSONParser:
+    """逐块解析顶层 JSON 对象的字段"""
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._key: Optional[str] = None
+        self._value_start = -1
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """喂入一段文本，返回本次新完成的顶层字段名"""
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        completed = []
+        text = self._text
+        i = self._pos
+        while i < len(text) and not self.done:
+            ch = text[i]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start < 0:
+                        # 顶层对象中、冒号之前的字符串是字段名
+                        self._key = json.loads(text[self._string_start:i + 1])
+                i += 1
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(text, i, completed)
+                    self.done = True
+            elif ch == ":" and self._depth == 1 and self._value_start < 0:
+                self._value_start = i + 1
+            elif ch == "," and self._depth == 1:
+                self._finish_value(text, i, completed)
+            i += 1
+        self._pos = i
+        return completed
+
+    def _finish_value(self, text: str, end: int, completed: List[str]):
+        if self._key is not None and self._value_start >= 0:
+            raw = text[self._value_start:end].strip()
+            try:
+                self.fields[self._key] = json.loads(raw)
+                completed.append(self._key)
+            except ValueError:
+                pass
+        self._key = None
+        self._value_start = -1
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """完整对象（解析完成时）；未结束时返回 None"""
+        return dict(self.fields) if self.done else None
@@ -0,0 +1,81 @@
+"""
+上游延迟统计
+
+记录最近一段时间的请求耗时，估计分位数（p50/p95/p99）。
+合成耗时随文本长度增长，因此样本按"每单位工作量的耗时"保存
+（TTS 以字符数为单位），估计某次请求的耗时时再乘回工作量。
+用于自适应超时（p99 × 系数）和对冲请求的触发时机（p95）。
+超时的请求按已等待的时间记为一个样本（真实耗时至少这么长），
+否则后端整体变慢后 p99 只由成功的快请求算出，超时永远不会放宽。
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import math
+
+
+def _quantile(ordered, q: float) -> float:
+    """已排序样本的 q 分位数（最近秩法）"""
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """滑动窗口分位数估计"""
+
+    def __init__(self, window: int = 512, min_samples: int = 20, min_units: float = 20.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.min_units = min_units  # 短文本也有固定开销，工作量不低于该值
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.timeouts = 0
+
+    def _units(self, units: float) -> float:
+        return max(float(units), self.min_units)
+
+    def record(self, latency: float, units: float = 1.0):
+        """记录一次成功请求的耗时（秒）"""
+        self._samples.append(latency / self._units(units))
+        self.count += 1
+
+    def record_timeout(self, elapsed: Optional[float] = None, units: float = 1.0):
+        """记录一次超时；elapsed 为超时前已等待的秒数，作为耗时下限计入样本"""
+        self.timeouts += 1
+        if elapsed is not None:
+            self._samples.append(elapsed / self._units(units))
+
+    @property
+    def ready(self) -> bool:
+        """样本足够时才给出估计"""
+        return len(self._samples) >= self.min_samples
+
+    def percentile(self, q: float, units: float = 1.0) -> Optional[float]:
+        """估计工作量为 units 的请求耗时的 q 分位数（秒）；样本不足时返回 None"""
+        if not self.ready:
+            return None
+        return _quantile(sorted(self._samples), q) * self._units(units)
+
+    def timeout(self, units: float, default: float, minimum: float, multiplier: float = 2.0) -> float:
+        """自适应超时：p99 × multiplier，限制在 [minimum, default] 之间"""
+        p99 = self.percentile(99, units)
+        if p99 is None:
+            return default
+        return min(default, max(minimum, p99 * multiplier))
+
+    def stats(self) -> Dict[str, Any]:
+        ordered = sorted(self._samples)
+
+        def pct(q: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(_quantile(ordered, q) * self.min_units * 1000, 1)
+
+        return {
+            "samples": len(ordered),
+            "count": self.count,
+            "timeouts": self.timeouts,
+            # 按 min_units 工作量（TTS 为短文本）折算的毫秒数
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99)
+        }
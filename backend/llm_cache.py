@@ -0,0 +1,112 @@
+"""
+大模型分析结果缓存
+
+key = 规范化文本（合并空白）+ 提示词版本。内存层带 TTL 和条目上限，
+可选 SQLite 文件层（进程重启或多 worker 之间共享）。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """合并连续空白并去掉首尾空白"""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class AnalysisCache:
+    """带 TTL 的分析结果缓存（内存 + 可选 SQLite）"""
+
+    def __init__(
+        self,
+        ttl: float = 24 * 3600,
+        max_entries: int = 10000,
+        db_path: Optional[str] = None
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            with self._db_lock:
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                self._db.execute("DELETE FROM analysis_cache WHERE expires_at < ?", (time.time(),))
+                self._db.commit()
+
+    @staticmethod
+    def make_key(text: str, prompt_version: str) -> str:
+        payload = f"{prompt_version}\n{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，返回副本（调用方可以随意修改）"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+            del self._memory[key]
+
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                self._put_memory(key, value, row[1])
+                self.db_hits += 1
+                return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        expires_at = time.time() + self.ttl
+        self._put_memory(key, copy.deepcopy(value), expires_at)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO analysis_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value, ensure_ascii=False), expires_at)
+                    )
+                    self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[AnalysisCache] 写入 SQLite 失败: {e}")
+
+    def _put_memory(self, key: str, value: Dict[str, Any], expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "sqlite": bool(self._db)
+        }
@@ -1,19 +1,61 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-from typing import Optional, Literal, Dict, Any, List
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import Optional, Literal, Dict, Any, List, Callable, Awaitable
+from contextlib import asynccontextmanager
+from collections import OrderedDict
+from contextvars import ContextVar
 import httpx
 import os
 import json
 import tempfile
-import re
 import glob
+import asyncio
+import copy
+import math
+import base64
+import time
 from dotenv import load_dotenv
 
+from http_clients import HTTPClientRegistry
+from voice_assets import VoiceAssetCache
+from synthesis_cache import SynthesisCache
+from time_stretch import stretch_wav, TimeStretcher
+from wav_io import wav_duration, wav_header, streaming_wav_header, WavStreamReader, concat_wavs
+from text_segmenter import split_sentences
+from emotion_tags import strip_tags, normalize_tag, is_valid_tag
+from llm_cache import AnalysisCache, normalize_text
+from singleflight import SingleFlight
+from emotion_classifier import LocalEmotionClassifier
+from session_store import SessionStore, MemorySessionStore, SQLiteSessionStore, content_hash
+from blob_store import BlobStore, BlobTooLarge
+from job_queue import JobQueue, QueueFull
+from reference_audio import ReferenceNormalizer, ReferenceFuser
+from reference_manager import ReferenceManager
+from backend_pool import BackendPool
+from latency_tracker import LatencyTracker
+from circuit_breaker import CircuitBreaker
+from json_stream import IncrementalJSONParser
+from prompts import (
+    ANALYZE_PROMPT_VERSION, TokenUsage, analyze_messages, analyze_batch_messages,
+    feedback_messages, estimate_tokens
+)
+
 # 加载 .env 文件
 load_dotenv()
 
-app = FastAPI(title="Voice Agent - Complete", version="5.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时预加载音色、开始后端健康检查，退出时关闭共享连接池"""
+    voice_assets.preload()
+    fish_speech_pool.start()
+    yield
+    await fish_speech_pool.aclose()
+    await http_clients.aclose()
+
+
+app = FastAPI(title="Voice Agent - Complete", version="5.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,14 +69,74 @@ app.add_middleware(
 AUTODL_BASE_URL = os.getenv("AUTODL_BASE_URL", "https://u894940-9373-577c3325.bjb1.seetacloud.com:8443")
 KIMI_API_KEY = os.getenv("KIMI_API_KEY", "")
 KIMI_BASE_URL = "https://api.moonshot.cn/v1"
-
-# HTTP 客户端配置（不创建全局实例，每次请求新建）
+TTS_TEMPERATURE = 0.7
+# 长文本分句并行合成
+TTS_SEGMENT_ENABLED = os.getenv("TTS_SEGMENT_ENABLED", "1") == "1"
+TTS_SEGMENT_MAX_CHARS = int(os.getenv("TTS_SEGMENT_MAX_CHARS", "120"))
+TTS_SEGMENT_CONCURRENCY = int(os.getenv("TTS_SEGMENT_CONCURRENCY", "4"))
+TTS_CROSSFADE_MS = float(os.getenv("TTS_CROSSFADE_MS", "20"))
+OUTPUTS_DIR = "outputs"
+# 推测合成（后台预合成）中为 True：分段串行、不发对冲请求，同一时间只占一个上游名额
+speculative_synthesis: ContextVar[bool] = ContextVar("speculative_synthesis", default=False)
+
+# HTTP 客户端配置（按上游共享连接池，由 lifespan 关闭）
 HTTP_TIMEOUT = 60.0
 HTTP_VERIFY = False
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "1") == "1"
+
+http_clients = HTTPClientRegistry(
+    timeout=HTTP_TIMEOUT,
+    verify=HTTP_VERIFY,
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    http2=HTTP_ENABLE_HTTP2
+)
+
+def get_fish_speech_client() -> httpx.AsyncClient:
+    """Fish Speech 上游的共享客户端"""
+    return http_clients.get("fish_speech")
+
+def get_kimi_client() -> httpx.AsyncClient:
+    """Kimi 上游的共享客户端"""
+    return http_clients.get("kimi")
+
+# Fish Speech 后端池（逗号分隔多个地址；未配置时只用 AUTODL_BASE_URL）
+FISH_SPEECH_BACKENDS = [
+    url.strip() for url in os.getenv("FISH_SPEECH_BACKENDS", AUTODL_BASE_URL).split(",") if url.strip()
+]
+FISH_SPEECH_LB_STRATEGY = os.getenv("FISH_SPEECH_LB_STRATEGY", "least_outstanding")  # least_outstanding / ewma
+FISH_SPEECH_HEALTH_INTERVAL = float(os.getenv("FISH_SPEECH_HEALTH_INTERVAL", "10"))
+FISH_SPEECH_EJECT_SECONDS = float(os.getenv("FISH_SPEECH_EJECT_SECONDS", "30"))
+FISH_SPEECH_FAILURE_THRESHOLD = int(os.getenv("FISH_SPEECH_FAILURE_THRESHOLD", "3"))
+FISH_SPEECH_MAX_ATTEMPTS = int(os.getenv("FISH_SPEECH_MAX_ATTEMPTS", "2"))
+
+# 同时发往每个 Fish Speech 后端的 /v1/tts 请求数（分段、重试、对冲都计入），0 表示不限制
+FISH_SPEECH_MAX_INFLIGHT = int(os.getenv("FISH_SPEECH_MAX_INFLIGHT", "2"))
+
+fish_speech_pool = BackendPool(
+    FISH_SPEECH_BACKENDS,
+    get_fish_speech_client,
+    strategy=FISH_SPEECH_LB_STRATEGY,
+    health_interval=FISH_SPEECH_HEALTH_INTERVAL,
+    failure_threshold=FISH_SPEECH_FAILURE_THRESHOLD,
+    eject_seconds=FISH_SPEECH_EJECT_SECONDS,
+    max_attempts=FISH_SPEECH_MAX_ATTEMPTS,
+    max_inflight=FISH_SPEECH_MAX_INFLIGHT
+)
 
-def create_http_client():
-    """创建新的 HTTP 客户端"""
-    return httpx.AsyncClient(verify=HTTP_VERIFY, timeout=HTTP_TIMEOUT)
+# 自适应超时：按文本长度和观测到的 p99 耗时计算，限制在 [MIN, MAX] 秒之间
+TTS_TIMEOUT_MAX = float(os.getenv("TTS_TIMEOUT_MAX", "60"))
+TTS_TIMEOUT_MIN = float(os.getenv("TTS_TIMEOUT_MIN", "10"))
+TTS_TIMEOUT_MULTIPLIER = float(os.getenv("TTS_TIMEOUT_MULTIPLIER", "2.0"))
+# 对冲请求：超过 p95 耗时仍未返回时向另一个后端重发（需要至少两个后端）
+TTS_HEDGE_ENABLED = os.getenv("TTS_HEDGE_ENABLED", "1") == "1"
+TTS_HEDGE_PERCENTILE = float(os.getenv("TTS_HEDGE_PERCENTILE", "95"))
+
+tts_latency = LatencyTracker()  # 按字符数折算的 /v1/tts 耗时
 
 # ==================== 音频处理 ====================
 
@@ -44,54 +146,19 @@ class AudioProcessor:
     @staticmethod
     def adjust_speed(audio_bytes: bytes, speed: float) -> bytes:
         """
-        调整音频语速
+        调整音频语速（WSOLA 变速不变调，进程内 NumPy 处理）
         speed: 1.0=正常, >1=加快, <1=减慢
         """
+        if speed == 1.0:
+            return audio_bytes
         try:
-            from pydub import AudioSegment
-            import io
-            
-            # 检查 ffmpeg 是否可用
-            import subprocess
-            try:
-                result = subprocess.run(['ffmpeg', '-version'], capture_output=True, timeout=5)
-                if result.returncode != 0:
-                    print(f"[AudioProcessor] 警告: ffmpeg 返回错误码 {result.returncode}")
-                    print(f"[AudioProcessor] stderr: {result.stderr.decode()[:200]}")
-                    return audio_bytes
-                print(f"[AudioProcessor] ffmpeg 检测成功: {result.stdout.decode()[:100]}...")
-            except FileNotFoundError:
-                print("[AudioProcessor] 警告: ffmpeg 未找到，语速调整功能不可用")
-                print("[AudioProcessor] 请安装 ffmpeg: Mac(brew install ffmpeg) / Linux(sudo apt-get install ffmpeg)")
-                return audio_bytes
-            except Exception as e:
-                print(f"[AudioProcessor] ffmpeg 检测失败: {e}")
-                return audio_bytes
-            
-            # 加载音频
-            audio = AudioSegment.from_wav(io.BytesIO(audio_bytes))
-            original_duration = len(audio) / 1000.0  # 转换为秒
-            print(f"[AudioProcessor] 原始音频时长: {original_duration:.2f}s, 帧率: {audio.frame_rate}")
-            
-            # 调整语速（改变帧率）
-            if speed != 1.0:
-                # 改变播放速度（同时保持音调）
-                new_frame_rate = int(audio.frame_rate * speed)
-                print(f"[AudioProcessor] 调整帧率: {audio.frame_rate} -> {new_frame_rate}")
-                audio = audio._spawn(audio.raw_data, overrides={'frame_rate': new_frame_rate})
-                # 转换回标准帧率
-                audio = audio.set_frame_rate(24000)
-                new_duration = len(audio) / 1000.0
-                print(f"[AudioProcessor] 调整后音频时长: {new_duration:.2f}s")
-            
-            # 导出
-            output = io.BytesIO()
-            audio.export(output, format="wav")
-            return output.getvalue()
-            
-        except ImportError:
-            print("[AudioProcessor] 警告: 未安装 pydub，跳过语速调整")
-            print("[AudioProcessor] 请安装: pip install pydub")
+            original_duration = wav_duration(audio_bytes)
+            output = stretch_wav(audio_bytes, speed)
+            print(f"[AudioProcessor] 语速 {speed}x: {original_duration:.2f}s -> {wav_duration(output):.2f}s")
+            return output
+        except ValueError as e:
+            # 非 PCM WAV 等无法解析的格式
+            print(f"[AudioProcessor] 警告: 无法解析音频，跳过语速调整: {e}")
             return audio_bytes
         except Exception as e:
             print(f"[AudioProcessor] 语速调整失败: {e}")
@@ -154,18 +221,87 @@ def load_voices():
             },
         }
 
-# 加载音色配置
-DEFAULT_VOICES = load_voices()
+# 音色缓存：配置和参考音频（已编码 base64）常驻内存，按 mtime 失效
+VOICE_CACHE_CHECK_INTERVAL = float(os.getenv("VOICE_CACHE_CHECK_INTERVAL", "2.0"))
+voice_assets = VoiceAssetCache(
+    config_path=VOICE_CONFIG_PATH,
+    loader=load_voices,
+    search_dirs=[
+        "",  # 相对当前目录
+        os.path.join(os.path.dirname(__file__), ".."),  # 从backend目录
+        os.path.dirname(__file__),  # 直接相对backend
+        "..",  # 上级目录
+    ],
+    check_interval=VOICE_CACHE_CHECK_INTERVAL
+)
 
 
 # ==================== 大模型服务 ====================
 
+# 分析结果缓存：key 含提示词版本号（prompts.ANALYZE_PROMPT_VERSION），提示词变化时旧缓存失效
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")  # 设置后同时写入 SQLite 文件
+
+analysis_cache = AnalysisCache(
+    ttl=LLM_CACHE_TTL,
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    db_path=LLM_CACHE_DB or None
+)
+analysis_flight = SingleFlight()  # 合并相同文本的并发分析请求
+
+# 本地快速通道：关键词明确的文本不调用大模型
+LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "1") == "1"
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.8"))
+local_classifier = LocalEmotionClassifier(threshold=LOCAL_CLASSIFIER_THRESHOLD)
+
+# Kimi 熔断：最近调用失败率或慢调用率过高时直接走本地兜底，不再逐个等待超时
+KIMI_TIMEOUT = float(os.getenv("KIMI_TIMEOUT", "30"))
+KIMI_BREAKER_WINDOW = int(os.getenv("KIMI_BREAKER_WINDOW", "20"))
+KIMI_BREAKER_MIN_CALLS = int(os.getenv("KIMI_BREAKER_MIN_CALLS", "5"))
+KIMI_BREAKER_FAILURE_RATE = float(os.getenv("KIMI_BREAKER_FAILURE_RATE", "0.5"))
+KIMI_BREAKER_SLOW_SECONDS = float(os.getenv("KIMI_BREAKER_SLOW_SECONDS", "10"))
+KIMI_BREAKER_OPEN_SECONDS = float(os.getenv("KIMI_BREAKER_OPEN_SECONDS", "30"))
+
+kimi_breaker = CircuitBreaker(
+    "kimi",
+    window=KIMI_BREAKER_WINDOW,
+    min_calls=KIMI_BREAKER_MIN_CALLS,
+    failure_rate=KIMI_BREAKER_FAILURE_RATE,
+    slow_call_seconds=KIMI_BREAKER_SLOW_SECONDS,
+    open_seconds=KIMI_BREAKER_OPEN_SECONDS
+)
+kimi_latency = LatencyTracker(min_units=1)
+kimi_usage = TokenUsage()  # 按提示词类型累计 prompt / completion token
+
+# 批量分析：多段文本合并为一次 Kimi 调用，按 token 预算和条数分组
+# 每段文本创建一个会话：单次批量最多占会话上限的 1/10，避免挤掉正在交互的会话
+ANALYZE_BATCH_MAX_TEXTS = int(os.getenv("ANALYZE_BATCH_MAX_TEXTS", "50"))
+ANALYZE_BATCH_TOKEN_BUDGET = int(os.getenv("ANALYZE_BATCH_TOKEN_BUDGET", "1500"))
+ANALYZE_BATCH_ITEMS_PER_CALL = int(os.getenv("ANALYZE_BATCH_ITEMS_PER_CALL", "10"))
+ANALYZE_BATCH_CONCURRENCY = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", "4"))
+ANALYZE_BATCH_TIMEOUT = float(os.getenv("ANALYZE_BATCH_TIMEOUT", "60"))
+
+analysis_batch_stats = {"batches": 0, "texts": 0, "llm_calls": 0, "fallbacks": 0}
+
+
 class LLMService:
     """大模型服务 - 智能分析和反馈理解"""
     
     @staticmethod
-    async def analyze_text(text: str) -> Dict[str, Any]:
-        """阶段1: 分析文本确定合成参数"""
+    async def analyze_text(text: str, local_checked: bool = False) -> Dict[str, Any]:
+        """
+        阶段1: 分析文本确定合成参数
+        - 本地分类器置信度达标时直接返回，不调用大模型
+        - 否则调用 Kimi（按规范化文本 + 提示词版本缓存）
+        local_checked: 调用方已用本地分类器判断过且未命中（批量分析），不再重复分类
+        """
+        
+        if LOCAL_CLASSIFIER_ENABLED and not local_checked:
+            local_result = local_classifier.try_classify(text)
+            if local_result is not None:
+                print(f"[LLMService] 本地分类命中: {local_result['emotion']} (置信度 {local_result['confidence']})")
+                return local_result
         
         if not KIMI_API_KEY:
             return {
@@ -179,136 +315,21 @@ class LLMService:
                 "reason": "未配置Kimi API，使用默认参数"
             }
         
-        prompt = f"""分析以下文本，确定最佳语音合成参数。
-
-【Fish Speech 支持的情感标记】（必须从这些中选择，不要自己造词）
-基础情感：
-- (happy) 开心
-- (angry) 生气  
-- (sad) 悲伤
-- (excited) 兴奋
-- (surprised) 惊讶
-- (satisfied) 满意
-- (delighted) 高兴
-- (scared) 害怕
-- (worried) 担心
-- (upset) 沮丧
-- (nervous) 紧张
-- (frustrated) 沮丧
-- (depressed) 抑郁
-- (empathetic) 共情
-- (embarrassed) 尴尬
-- (disgusted) 厌恶
-- (moved) 感动
-- (proud) 骄傲
-- (relaxed) 放松
-- (grateful) 感激
-- (confident) 自信
-- (interested) 感兴趣
-- (curious) 好奇
-- (confused) 困惑
-- (joyful) 快乐
-
-高级情感：
-- (disdainful) 轻蔑
-- (unhappy) 不开心
-- (anxious) 焦虑
-- (hysterical) 歇斯底里
-- (indifferent) 冷漠
-- (impatient) 不耐烦
-- (guilty) 内疚
-- (scornful) 轻蔑
-- (panicked) 恐慌
-- (furious) 愤怒
-- (reluctant) 不情愿
-- (keen) 渴望
-- (disapproving) 不赞成
-- (negative) 消极
-- (denying) 否认
-- (astonished) 震惊
-- (serious) 严肃
-- (sarcastic) 讽刺
-- (conciliative) 安抚
-- (comforting) 安慰
-- (sincere) 真诚
-- (sneering) 嘲笑
-- (hesitating) 犹豫
-- (yielding) 屈服
-- (painful) 痛苦
-- (awkward) 尴尬
-- (amused) 逗乐
-
-特殊效果：
-- (laughing) 笑
-- (chuckling) 轻笑
-- (sobbing) 啜泣
-- (crying loudly) 大哭
-- (sighing) 叹息
-- (panting) 喘气
-- (groaning) 呻吟
-- (crowd laughing) 人群笑声
-- (background laughter) 背景笑声
-- (audience laughing) 观众笑声
-
-语调标记：
-- (in a hurry tone) 匆忙语气
-- (shouting) 喊叫
-- (screaming) 尖叫
-- (whispering) 耳语
-- (soft tone) 柔和语气
-
-【重要提示】
-- 情感标记必须从上面的列表中精确选择，格式为 "(标签名)"
-- 不要自己创造新的情感标签
-- 如果不确定，使用 "(neutral)" 或留空
-
-【语速调整】
-- 1.0 = 正常语速
-- > 1.0 = 加快（如 1.2）
-- < 1.0 = 减慢（如 0.8）
-
-文本："{text}"
-
-请分析：
-1. 场景/场合
-2. 最适合的情感标记（必须从上面列表精确选择，只返回标签名，如 <|happy|>、<|angry|>、<|sad|>、<|excited|>、<|calm|>、<|surprised|>）
-3. 推荐语速（1.0正常, >1加快, <1减慢）
-4. 选择理由
-
-输出JSON：
-{{
-    "scene": "场景",
-    "emotion": "<|happy|>",
-    "speed": 1.0,
-    "reason": "详细分析理由"
-}}
-
-重要：emotion 字段必须只包含情感标签，如 "<|sad|>"，不要包含任何中文或emoji。"""
-
-        async with create_http_client() as client:
-            response = await client.post(
-                f"{KIMI_BASE_URL}/chat/completions",
-                headers={"Authorization": f"Bearer {KIMI_API_KEY}"},
-                json={
-                    "model": "moonshot-v1-8k",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                
-                try:
-                    if "```json" in content:
-                        content = content.split("```json")[1].split("```")[0]
-                    elif "```" in content:
-                        content = content.split("```")[1].split("```")[0]
-                    return json.loads(content.strip())
-                except:
-                    pass
+        key = AnalysisCache.make_key(text, ANALYZE_PROMPT_VERSION)
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        async def fetch():
+            result = await LLMService._analyze_text_remote(normalize_text(text))
+            if result is not None:
+                analysis_cache.put(key, result)
+            return result
+        
+        # 相同文本的并发请求只调用一次 Kimi
+        result = await analysis_flight.do(key, fetch)
+        if result is not None:
+            return copy.deepcopy(result)
         
         # 默认返回
         return {
@@ -323,7 +344,259 @@ class LLMService:
         }
     
     @staticmethod
-    async def understand_feedback(feedback: str, current_params: Dict, audio_count: int) -> Dict[str, Any]:
+    async def _chat(
+        api_key: str,
+        messages: List[Dict[str, str]],
+        kind: str,
+        timeout: float = KIMI_TIMEOUT,
+        units: int = 1
+    ) -> Optional[str]:
+        """
+        调用 Kimi 对话接口，返回回复内容；熔断中、请求失败、本地异常或非 200 时返回 None
+        units: 本次请求包含的条目数（批量分析），耗时按条目折算后再判断是否过慢
+        """
+        if not kimi_breaker.allow():
+            print("[LLMService] Kimi 熔断中，直接使用本地兜底")
+            return None
+        
+        start = time.monotonic()
+        try:
+            response = await get_kimi_client().post(
+                f"{KIMI_BASE_URL}/chat/completions",
+                headers={"Authorization": f"Bearer {api_key}"},
+                json={
+                    "model": "moonshot-v1-8k",
+                    "messages": messages,
+                    "temperature": 0.3
+                },
+                timeout=timeout
+            )
+        except httpx.HTTPError as e:
+            kimi_breaker.record(False, (time.monotonic() - start) / units, type(e).__name__)
+            if isinstance(e, httpx.TimeoutException):
+                kimi_latency.record_timeout(time.monotonic() - start, units)
+            print(f"[LLMService] Kimi 请求失败: {type(e).__name__}: {e}")
+            return None
+        except asyncio.CancelledError:
+            kimi_breaker.release()
+            raise
+        except Exception as e:
+            # 本地出错（如客户端已关闭），不能说明 Kimi 是否正常：归还半开探测名额，不计入失败
+            kimi_breaker.release()
+            print(f"[LLMService] Kimi 请求异常: {type(e).__name__}: {e}")
+            return None
+        
+        latency = time.monotonic() - start
+        if response.status_code != 200:
+            kimi_breaker.record(False, latency / units, f"HTTP {response.status_code}")
+            print(f"[LLMService] Kimi 返回 HTTP {response.status_code}: {response.text[:200]}")
+            return None
+        kimi_breaker.record(True, latency / units)
+        kimi_latency.record(latency, units)
+        try:
+            result = response.json()
+            kimi_usage.record(kind, result.get("usage"))
+            return result["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            return None
+    
+    @staticmethod
+    async def _chat_stream(
+        api_key: str,
+        messages: List[Dict[str, str]],
+        kind: str,
+        on_delta: Callable[[str], None]
+    ) -> Optional[str]:
+        """
+        流式调用 Kimi 对话接口，每收到一段回复内容调用 on_delta
+        返回完整回复；熔断中、请求失败或中途断开时返回 None（已回调的内容仍然有效）
+        on_delta 抛出异常时不再回调，继续接收完整回复
+        """
+        if not kimi_breaker.allow():
+            print("[LLMService] Kimi 熔断中，直接使用本地兜底")
+            return None
+        
+        start = time.monotonic()
+        first_token = None
+        parts = []
+        usage = None
+        try:
+            async with get_kimi_client().stream(
+                "POST",
+                f"{KIMI_BASE_URL}/chat/completions",
+                headers={"Authorization": f"Bearer {api_key}"},
+                json={
+                    "model": "moonshot-v1-8k",
+                    "messages": messages,
+                    "temperature": 0.3,
+                    "stream": True
+                },
+                timeout=KIMI_TIMEOUT
+            ) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    kimi_breaker.record(False, time.monotonic() - start, f"HTTP {response.status_code}")
+                    print(f"[LLMService] Kimi 返回 HTTP {response.status_code}: {body[:200]}")
+                    return None
+                # SSE: 每行 "data: {...}"，以 "data: [DONE]" 结束
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(payload)
+                        choice = (chunk.get("choices") or [{}])[0]
+                        delta = (choice.get("delta") or {}).get("content")
+                    except (ValueError, IndexError, TypeError, AttributeError):
+                        continue
+                    # usage 在最后一个数据块中（顶层或 choices[0] 内）
+                    usage = chunk.get("usage") or choice.get("usage") or usage
+                    if delta:
+                        if first_token is None:
+                            first_token = time.monotonic() - start
+                        parts.append(delta)
+                        if on_delta is not None:
+                            try:
+                                on_delta(delta)
+                            except Exception as e:
+                                print(f"[LLMService] 流式回调异常，不再回调: {type(e).__name__}: {e}")
+                                on_delta = None
+        except httpx.HTTPError as e:
+            kimi_breaker.record(False, time.monotonic() - start, type(e).__name__)
+            if isinstance(e, httpx.TimeoutException):
+                kimi_latency.record_timeout(time.monotonic() - start)
+            print(f"[LLMService] Kimi 流式请求失败: {type(e).__name__}: {e}")
+            return None
+        except asyncio.CancelledError:
+            kimi_breaker.release()
+            raise
+        except Exception as e:
+            # 本地处理出错，不能说明 Kimi 是否正常：归还半开探测名额，不计入失败
+            kimi_breaker.release()
+            print(f"[LLMService] Kimi 流式回复处理失败: {type(e).__name__}: {e}")
+            return None
+        
+        # 流式调用按首个 token 的耗时判断是否过慢
+        total = time.monotonic() - start
+        kimi_breaker.record(True, first_token if first_token is not None else total)
+        kimi_latency.record(total)
+        kimi_usage.record(kind, usage)
+        return "".join(parts)
+    
+    @staticmethod
+    async def _analyze_text_remote(text: str) -> Optional[Dict[str, Any]]:
+        """调用 Kimi 分析文本；失败或无法解析时返回 None"""
+        content = await LLMService._chat(KIMI_API_KEY, analyze_messages(text), "analyze")
+        
+        if content is not None:
+            try:
+                if "```json" in content:
+                    content = content.split("```json")[1].split("```")[0]
+                elif "```" in content:
+                    content = content.split("```")[1].split("```")[0]
+                return json.loads(content.strip())
+            except:
+                pass
+        return None
+    
+    @staticmethod
+    async def analyze_batch(texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        批量分析文本，返回与 texts 一一对应的分析结果
+        - 本地分类器命中、结果缓存命中的直接返回；相同文本只分析一次
+        - 其余按 token 预算分组，每组一次 Kimi 调用（返回 JSON 数组）
+        - 某条结果缺失或无法解析时，只对该条走单条分析
+        """
+        analysis_batch_stats["batches"] += 1
+        analysis_batch_stats["texts"] += len(texts)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        pending: "OrderedDict[str, List[int]]" = OrderedDict()  # 缓存 key -> 文本下标
+        for i, text in enumerate(texts):
+            local_result = local_classifier.try_classify(text) if LOCAL_CLASSIFIER_ENABLED else None
+            if local_result is not None:
+                results[i] = local_result
+                continue
+            key = AnalysisCache.make_key(text, ANALYZE_PROMPT_VERSION)
+            cached = analysis_cache.get(key) if KIMI_API_KEY else None
+            if cached is not None:
+                results[i] = copy.deepcopy(cached)
+                continue
+            pending.setdefault(key, []).append(i)
+        
+        if not KIMI_API_KEY:
+            # 未配置 Kimi：逐条返回默认参数
+            for indexes in pending.values():
+                for i in indexes:
+                    results[i] = await LLMService.analyze_text(texts[i], local_checked=True)
+            return results
+        
+        # 按 token 预算和条数分组
+        chunks: List[List[str]] = []
+        size = 0
+        for key, indexes in pending.items():
+            cost = estimate_tokens(texts[indexes[0]]) + 10  # 每条的 JSON 包装开销
+            if not chunks or len(chunks[-1]) >= ANALYZE_BATCH_ITEMS_PER_CALL or size + cost > ANALYZE_BATCH_TOKEN_BUDGET:
+                chunks.append([])
+                size = 0
+            chunks[-1].append(key)
+            size += cost
+        
+        semaphore = asyncio.Semaphore(ANALYZE_BATCH_CONCURRENCY)
+        
+        async def run(keys: List[str]):
+            chunk_texts = [normalize_text(texts[pending[key][0]]) for key in keys]
+            async with semaphore:
+                parsed = await LLMService._analyze_batch_remote(chunk_texts)
+            
+            async def resolve(n: int, key: str):
+                result = parsed.get(n)
+                if result is not None:
+                    analysis_cache.put(key, result)
+                else:
+                    analysis_batch_stats["fallbacks"] += 1
+                    result = await LLMService.analyze_text(texts[pending[key][0]], local_checked=True)
+                for i in pending[key]:
+                    results[i] = copy.deepcopy(result)
+            
+            await asyncio.gather(*(resolve(n, key) for n, key in enumerate(keys)))
+        
+        await asyncio.gather(*(run(keys) for keys in chunks))
+        print(f"[LLMService] 批量分析 {len(texts)} 条: {len(pending)} 条调用 Kimi（{len(chunks)} 次）")
+        return results
+    
+    @staticmethod
+    async def _analyze_batch_remote(texts: List[str]) -> Dict[int, Dict[str, Any]]:
+        """一次 Kimi 调用分析多段文本，返回 {下标: 结果}；缺失或无法解析的条目不在结果中"""
+        analysis_batch_stats["llm_calls"] += 1
+        content = await LLMService._chat(
+            KIMI_API_KEY, analyze_batch_messages(texts), "analyze_batch",
+            timeout=ANALYZE_BATCH_TIMEOUT, units=len(texts)
+        )
+        if content is None:
+            return {}
+        start, end = content.find("["), content.rfind("]")
+        try:
+            items = json.loads(content[start:end + 1]) if 0 <= start < end else None
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            print(f"[LLMService] 批量分析结果不是 JSON 数组: {content[:200]}")
+            return {}
+        parsed = {}
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get("id"), int) and 0 <= item["id"] < len(texts):
+                parsed[item.pop("id")] = item
+        return parsed
+    
+    @staticmethod
+    async def understand_feedback(
+        feedback: str,
+        current_params: Dict,
+        audio_count: int,
+        on_adjustments: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
         阶段2: 理解用户反馈，使用大模型分析并返回调整方案
         
@@ -331,6 +604,10 @@ class LLMService:
         - analysis: 大模型分析过程
         - adjustments: 参数调整
         - function_calls: 需要调用的功能列表
+        
+        大模型回复按流式接收，adjustments 字段一完整就调用 on_adjustments
+        （调用方可以提前开始合成，不必等 analysis/tips 输出完）。
+        返回结果中的 adjustments 与回调时给出的一致。
         """
         
         # 运行时动态读取环境变量
@@ -340,158 +617,61 @@ class LLMService:
             # 备用：规则匹配
             return LLMService._rule_based_feedback(feedback, current_params, audio_count)
         
-        prompt = f"""分析用户反馈，确定语音合成参数调整方案。
-
-【当前参数】
-- 语速(speed): {current_params.get('speed', 1.0)}
-- 情感标签(emotion_tag): {current_params.get('emotion_tag', '无')}
-
-【Fish Speech 支持的情感标记】（必须从这些中选择，不要自己造词）
-基础情感：
-- (happy) 开心
-- (angry) 生气  
-- (sad) 悲伤
-- (excited) 兴奋
-- (surprised) 惊讶
-- (satisfied) 满意
-- (delighted) 高兴
-- (scared) 害怕
-- (worried) 担心
-- (upset) 沮丧
-- (nervous) 紧张
-- (frustrated) 沮丧
-- (depressed) 抑郁
-- (empathetic) 共情
-- (embarrassed) 尴尬
-- (disgusted) 厌恶
-- (moved) 感动
-- (proud) 骄傲
-- (relaxed) 放松
-- (grateful) 感激
-- (confident) 自信
-- (interested) 感兴趣
-- (curious) 好奇
-- (confused) 困惑
-- (joyful) 快乐
-
-高级情感：
-- (disdainful) 轻蔑
-- (unhappy) 不开心
-- (anxious) 焦虑
-- (hysterical) 歇斯底里
-- (indifferent) 冷漠
-- (impatient) 不耐烦
-- (guilty) 内疚
-- (scornful) 轻蔑
-- (panicked) 恐慌
-- (furious) 愤怒
-- (reluctant) 不情愿
-- (keen) 渴望
-- (disapproving) 不赞成
-- (negative) 消极
-- (denying) 否认
-- (astonished) 震惊
-- (serious) 严肃
-- (sarcastic) 讽刺
-- (conciliative) 安抚
-- (comforting) 安慰
-- (sincere) 真诚
-- (sneering) 嘲笑
-- (hesitating) 犹豫
-- (yielding) 屈服
-- (painful) 痛苦
-- (awkward) 尴尬
-- (amused) 逗乐
-
-特殊效果：
-- (laughing) 笑
-- (chuckling) 轻笑
-- (sobbing) 啜泣
-- (crying loudly) 大哭
-- (sighing) 叹息
-- (panting) 喘气
-- (groaning) 呻吟
-- (crowd laughing) 人群笑声
-- (background laughter) 背景笑声
-- (audience laughing) 观众笑声
-
-语调标记：
-- (in a hurry tone) 匆忙语气
-- (shouting) 喊叫
-- (screaming) 尖叫
-- (whispering) 耳语
-- (soft tone) 柔和语气
-
-【可用调整工具】
-1. adjust_emotion: 调整情感标签
-   - 必须从上面的【Fish Speech 支持的情感标记】列表中选择
-   - 格式为 "(标签名)"，如 "(happy)", "(serious)"
-   - 不要自己创造新的情感标签
-   
-2. adjust_speed: 调整语速（音频后处理）
-   - 范围: 0.5-2.0, 1.0为正常
-   - 注意: 这是独立的后处理步骤，不是TTS参数
-
-【重要提示】
-- 情感标签必须从上面的列表中精确选择
-- 不要自己造词，如果列表中没有合适的，选择最接近的
-- 如果不确定，可以不调整情感标签
-
-【用户反馈】
-"{feedback}"
-
-请分析：
-1. 用户反馈的具体含义
-2. 需要调用哪些调整工具
-3. 每个工具的具体参数（情感标签必须从列表中选择）
-4. 调整理由
-
-输出JSON格式：
-{{
-    "analysis": "详细分析过程...",
-    "adjustments": {{
-        "speed": 1.0,
-        "emotion_tag": "<|happy|>"
-    }},
-    "function_calls": [
-        {{"function": "adjust_emotion", "params": {{"tag": "<|happy|>"}}, "reason": "..."}},
-        {{"function": "adjust_speed", "params": {{"speed": 0.9}}, "reason": "..."}}
-    ],
-    "tips": ["提示1", "提示2"]
-}}
-
-重要：emotion_tag 字段必须只包含情感标签，如 "<|sad|>"，不要包含任何中文或emoji。"""
-
+        parser = IncrementalJSONParser()
+        emitted = None
+        
+        def on_delta(delta: str):
+            nonlocal emitted
+            for key in parser.feed(delta):
+                if key == "adjustments" and isinstance(parser.fields[key], dict):
+                    emitted = LLMService._validate_feedback({"adjustments": parser.fields[key]})["adjustments"]
+                    print(f"[LLMService] 调整方案已解析: {emitted}")
+                    if on_adjustments is not None:
+                        try:
+                            on_adjustments(emitted)
+                        except Exception as e:
+                            print(f"[LLMService] 提前合成回调失败: {type(e).__name__}: {e}")
+        
         # 使用运行时读取的 kimi_api_key
-        async with create_http_client() as client:
-            response = await client.post(
-                f"{KIMI_BASE_URL}/chat/completions",
-                headers={"Authorization": f"Bearer {kimi_api_key}"},
-                json={
-                    "model": "moonshot-v1-8k",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                
-                try:
-                    if "```json" in content:
-                        content = content.split("```json")[1].split("```")[0]
-                    elif "```" in content:
-                        content = content.split("```")[1].split("```")[0]
-                    parsed = json.loads(content.strip())
-                    return parsed
-                except Exception as e:
-                    print(f"解析失败: {e}, 内容: {content}")
+        content = await LLMService._chat_stream(
+            kimi_api_key, feedback_messages(feedback, current_params), "feedback", on_delta
+        )
+        
+        result = None
+        parsed = parser.result()
+        if parsed is not None:
+            try:
+                result = LLMService._validate_feedback(parsed)
+            except Exception as e:
+                print(f"解析失败: {e}, 内容: {content}")
+        elif content is not None:
+            print(f"解析失败: 回复不是完整的 JSON, 内容: {content}")
+        if emitted is not None:
+            # 调整方案已交给调用方（可能已开始合成），即使后续内容中断或无法解析也沿用
+            result = result or {"analysis": parser.fields.get("analysis", ""), "function_calls": [], "tips": []}
+            result["adjustments"] = emitted
+        if result is not None:
+            return result
         
         # 失败时回退到规则匹配
         return LLMService._rule_based_feedback(feedback, current_params, audio_count)
     
+    @staticmethod
+    def _validate_feedback(result: Dict[str, Any]) -> Dict[str, Any]:
+        """校验大模型给出的情感标签：规范为 <|tag|>，丢弃词表外的标签"""
+        adjustments = result.get("adjustments") or {}
+        if "emotion_tag" in adjustments:
+            if is_valid_tag(adjustments["emotion_tag"]):
+                adjustments["emotion_tag"] = normalize_tag(adjustments["emotion_tag"])
+            else:
+                print(f"[LLMService] 丢弃未知情感标签: {adjustments['emotion_tag']}")
+                adjustments.pop("emotion_tag")
+        result["adjustments"] = adjustments
+        for call in result.get("function_calls") or []:
+            if call.get("function") == "adjust_emotion" and isinstance(call.get("params"), dict):
+                call["params"]["tag"] = normalize_tag(call["params"].get("tag"))
+        return result
+    
     @staticmethod
     def _rule_based_feedback(feedback: str, current_params: Dict, audio_count: int) -> Dict[str, Any]:
         """基于规则的反馈处理（备用）"""
@@ -567,199 +747,298 @@ class LLMService:
 class FishSpeechService:
     """Fish Speech 服务 - 统一后端支持克隆和普通模式"""
     
+    @staticmethod
+    def build_text(text: str, params: Optional[Dict] = None) -> str:
+        """拼接情感标签并清理文本中已有的标记，得到发送给 Fish Speech 的最终文本"""
+        # 过滤文本里的 (emotion) 和 <|emotion|> 标记（避免重复），同时合并多余空格
+        final_text = strip_tags(text)
+        if params and params.get("emotion_tag"):
+            emotion_tag = normalize_tag(params["emotion_tag"])
+            if emotion_tag:
+                # 统一使用 <|emotion|> 格式
+                final_text = emotion_tag + " " + final_text
+            else:
+                print(f"[FishSpeechService] 忽略未知情感标签: {params['emotion_tag']}")
+        return final_text
+    
     @staticmethod
     async def synthesize(
         text: str,
         reference_audio: Optional[bytes] = None,
         reference_id: Optional[str] = None,
-        params: Optional[Dict] = None
+        params: Optional[Dict] = None,
+        upstream_ref: Optional[str] = None
     ) -> bytes:
         """
-        合成语音
+        合成语音（上游合成 + 本地后处理）
         - 有 reference_audio: 克隆模式
         - 有 reference_id: 预设音色模式
         - 都无: 默认音色
+        - upstream_ref: 参考音频已在上游注册的 id，有则只发送 id
         """
+        audio_data = await FishSpeechService.synthesize_raw(
+            text,
+            reference_audio=reference_audio,
+            reference_id=reference_id,
+            params=params,
+            upstream_ref=upstream_ref
+        )
+        return FishSpeechService.postprocess(audio_data, params)
+    
+    @staticmethod
+    def build_request(
+        text: str,
+        reference_audio: Optional[bytes] = None,
+        reference_id: Optional[str] = None,
+        params: Optional[Dict] = None,
+        upstream_ref: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """构造 /v1/tts 请求体"""
         
         # 应用参数（通过文本标签）
-        final_text = text
-        emotion_tag = ""
-        if params:
-            if params.get("emotion_tag"):
-                emotion_tag = params['emotion_tag']
-                # 直接使用 <|emotion|> 格式，不需要转换
-                final_text = emotion_tag + " " + final_text
+        final_text = FishSpeechService.build_text(text, params)
+        data = {
+            "text": final_text,
+            "temperature": TTS_TEMPERATURE
+        }
+        
+        if upstream_ref:
+            # 参考音频已在上游注册，只发送 id
+            data["reference_id"] = upstream_ref
+        elif reference_audio:
+            # 克隆模式 - 使用上传的音频
+            # 转为 base64，使用 references 参数
+            audio_base64 = base64.b64encode(reference_audio).decode('utf-8')
+            # 注意：情感标签已经通过 final_text 传递，参考音频的 text 字段不需要重复
+            data["references"] = [
+                {
+                    "audio": audio_base64,
+                    "text": ""  # 参考音频的文本描述，不需要情感标签
+                }
+            ]
+        elif reference_id:
+            # 普通模式 - 使用预设音色（reference_id）
+            # 参考音频已在缓存中预先编码为 base64
+            asset = voice_assets.get(reference_id)
+            if asset:
+                print(f"[音色合成] 使用预设音色: {reference_id}, 音频: {asset.path}")
+                data["references"] = [
+                    {
+                        "audio": asset.audio_base64,
+                        "text": ""  # 参考音频的文本描述，不需要情感标签
+                    }
+                ]
+            # 否则 fallback 到纯文本（未配置参考音频或文件不存在）
+        # 默认模式 - 不传参考音频
+        return data
+    
+    @staticmethod
+    async def synthesize_raw(
+        text: str,
+        reference_audio: Optional[bytes] = None,
+        reference_id: Optional[str] = None,
+        params: Optional[Dict] = None,
+        upstream_ref: Optional[str] = None,
+        reference_hash: Optional[str] = None
+    ) -> bytes:
+        """
+        调用 Fish Speech 合成，返回未经后处理（语速调整前）的原始音频
+        长文本按句切分后并发合成（每段都带情感标签），再交叉淡化拼接
+        reference_hash: blob_store 中的参考音频，只在需要内联发送时才读取
+        """
+        if reference_hash and not upstream_ref:
+            reference_audio = await load_reference_audio(reference_hash)
+        segments = [text]
+        if TTS_SEGMENT_ENABLED and len(text) > TTS_SEGMENT_MAX_CHARS:
+            segments = split_sentences(text, max_chars=TTS_SEGMENT_MAX_CHARS)
+        if len(segments) <= 1:
+            return await FishSpeechService.synthesize_segment(
+                text, reference_audio, reference_id, params, upstream_ref, reference_hash
+            )
         
-        # 过滤旧格式的情感标记 (emotion) 和 <|emotion|> 格式（避免重复）
-        final_text = re.sub(r'\(happy\)|\(angry\)|\(sad\)|\(excited\)|\(serious\)|\(soft\)|\(whispering\)|\(shouting\)', '', final_text)
-        final_text = re.sub(r'\(disdainful\)|\(unhappy\)|\(anxious\)|\(hysterical\)|\(indifferent\)|\(impatient\)|\(guilty\)|\(scornful\)|\(panicked\)|\(furious\)|\(reluctant\)|\(keen\)|\(disapproving\)|\(negative\)|\(denying\)|\(astonished\)|\(sarcastic\)|\(conciliative\)|\(comforting\)|\(sincere\)|\(sneering\)|\(hesitating\)|\(yielding\)|\(painful\)|\(awkward\)|\(amused\)', '', final_text)
-        final_text = re.sub(r'\(laughing\)|\(chuckling\)|\(sobbing\)|\(crying loudly\)|\(sighing\)|\(panting\)|\(groaning\)|\(crowd laughing\)|\(background laughter\)|\(audience laughing\)', '', final_text)
-        final_text = re.sub(r'\(in a hurry tone\)|\(screaming\)|\(soft tone\)', '', final_text)
-        # 清理多余空格
-        final_text = re.sub(r'\s+', ' ', final_text).strip()
+        concurrency = 1 if speculative_synthesis.get() else TTS_SEGMENT_CONCURRENCY
+        print(f"[FishSpeechService] 长文本分 {len(segments)} 段并行合成（并发 {concurrency}）")
+        semaphore = asyncio.Semaphore(concurrency)
         
-        # 创建临时客户端
-        client = httpx.AsyncClient(verify=False, timeout=60.0)
+        async def run(segment: str) -> bytes:
+            async with semaphore:
+                return await FishSpeechService.synthesize_segment(
+                    segment, reference_audio, reference_id, params, upstream_ref, reference_hash
+                )
         
+        tasks = [asyncio.ensure_future(run(segment)) for segment in segments]
         try:
-            if reference_audio:
-                # 克隆模式 - 使用上传的音频
-                # 转为 base64，使用 references 参数
-                import base64
-                audio_base64 = base64.b64encode(reference_audio).decode('utf-8')
-                
-                # 获取情感标签，用于参考音频的 text 字段
-                # 注意：情感标签已经通过 final_text 传递，这里不需要重复
-                emotion_text = ""
-                
-                data = {
-                    "text": final_text,
-                    "temperature": 0.7,
-                    "references": [
-                        {
-                            "audio": audio_base64,
-                            "text": ""  # 参考音频的文本描述，不需要情感标签
-                        }
-                    ]
-                }
-                
-                response = await client.post(
-                    f"{AUTODL_BASE_URL}/v1/tts",
-                    json=data,
-                    timeout=60.0
-                )
-            elif reference_id:
-                # 普通模式 - 使用预设音色（reference_id）
-                # 获取音色对应的参考音频路径
-                voices = load_voices()
-                voice_config = voices.get(reference_id, {})
-                ref_audio_path = voice_config.get("reference_audio")
-                
-                if ref_audio_path:
-                    # 尝试多个可能的路径
-                    possible_paths = [
-                        ref_audio_path,  # 相对路径
-                        os.path.join(os.path.dirname(__file__), "..", ref_audio_path),  # 从backend目录
-                        os.path.join(os.path.dirname(__file__), ref_audio_path),  # 直接相对backend
-                        f"../{ref_audio_path}",  # 上级目录
-                    ]
-                    
-                    ref_audio_full_path = None
-                    for path in possible_paths:
-                        if os.path.exists(path):
-                            ref_audio_full_path = path
-                            break
-                    
-                    if ref_audio_full_path:
-                        print(f"[音色合成] 使用预设音色: {reference_id}, 音频: {ref_audio_full_path}")
-                        # 读取参考音频文件
-                        with open(ref_audio_full_path, "rb") as f:
-                            ref_audio_bytes = f.read()
-                        # 转为 base64，使用 references 参数
-                        import base64
-                        audio_base64 = base64.b64encode(ref_audio_bytes).decode('utf-8')
-                        
-                        # 获取情感标签
-                        # 注意：情感标签已经通过 final_text 传递，这里不需要重复
-                        emotion_text = ""
-                        
-                        data = {
-                            "text": final_text,
-                            "temperature": 0.7,
-                            "references": [
-                                {
-                                    "audio": audio_base64,
-                                    "text": ""  # 参考音频的文本描述，不需要情感标签
-                                }
-                            ]
-                        }
-                        response = await client.post(
-                            f"{AUTODL_BASE_URL}/v1/tts",
-                            json=data,
-                            timeout=60.0
-                        )
-                    else:
-                        print(f"[音色合成] 未找到参考音频: {ref_audio_path}，尝试路径: {possible_paths}")
-                        #  fallback 到纯文本
-                        data = {"text": final_text, "temperature": 0.7}
-                        response = await client.post(
-                            f"{AUTODL_BASE_URL}/v1/tts",
-                            json=data,
-                            timeout=60.0
-                        )
-                else:
-                    # 没有参考音频配置
-                    data = {"text": final_text, "temperature": 0.7}
-                    response = await client.post(
-                        f"{AUTODL_BASE_URL}/v1/tts",
-                        json=data,
-                        timeout=60.0
-                    )
-            else:
-                # 默认模式 - 不传参考音频
-                data = {
-                    "text": final_text,
-                    "temperature": 0.7
-                }
-                
-                response = await client.post(
-                    f"{AUTODL_BASE_URL}/v1/tts",
-                    json=data,
-                    timeout=60.0
-                )
+            results = await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+        return concat_wavs(results, crossfade_ms=TTS_CROSSFADE_MS)
+    
+    @staticmethod
+    async def synthesize_segment(
+        text: str,
+        reference_audio: Optional[bytes] = None,
+        reference_id: Optional[str] = None,
+        params: Optional[Dict] = None,
+        upstream_ref: Optional[str] = None,
+        reference_hash: Optional[str] = None
+    ) -> bytes:
+        """单次 /v1/tts 调用"""
+        data = FishSpeechService.build_request(text, reference_audio, reference_id, params, upstream_ref)
+        units = len(data["text"])
+        timeout = tts_latency.timeout(units, TTS_TIMEOUT_MAX, TTS_TIMEOUT_MIN, TTS_TIMEOUT_MULTIPLIER)
+        hedge_after = None
+        if TTS_HEDGE_ENABLED and not speculative_synthesis.get():
+            hedge_after = tts_latency.percentile(TTS_HEDGE_PERCENTILE, units)
+        
+        # 经后端池选择 Fish Speech 实例（失败时换实例重试，慢请求对冲到另一个实例）
+        try:
+            response = await fish_speech_pool.request(
+                "POST", "/v1/tts", hedge_after=hedge_after, json=data, timeout=timeout
+            )
+        except httpx.TimeoutException:
+            tts_latency.record_timeout(timeout, units)
+            print(f"[FishSpeechService] 合成超时（{timeout:.1f}s, {units} 字）")
+            raise
+        
+        if response.status_code == 200:
+            # 记录实际返回结果的那次请求的耗时（对冲时不含等待 p95 的时间）
+            tts_latency.record(response.extensions["backend_latency"], units)
+            audio_data = response.content
+            print(f"[FishSpeechService] 收到音频: {len(audio_data)} bytes")
             
-            if response.status_code == 200:
-                audio_data = response.content
-                
-                # 统一后处理：调整语速
-                print(f"[FishSpeechService] 收到音频: {len(audio_data)} bytes")
-                
-                # 检查音频时长
-                try:
-                    from pydub import AudioSegment
-                    import io
-                    audio_check = AudioSegment.from_wav(io.BytesIO(audio_data))
-                    print(f"[FishSpeechService] FishSpeech 原始音频时长: {len(audio_check)/1000:.2f}s")
-                except Exception as e:
-                    print(f"[FishSpeechService] 无法检测原始音频时长: {e}")
-                
-                print(f"[FishSpeechService] params: {params}")
-                
-                if params:
-                    speed = params.get("speed", 1.0)
-                    print(f"[FishSpeechService] speed 值: {speed}, 类型: {type(speed)}")
-                    
-                    if speed != 1.0:
-                        print(f"[FishSpeechService] 开始调整语速: {speed}x")
-                        audio_data = AudioProcessor.adjust_speed(audio_data, speed)
-                        print(f"[FishSpeechService] 语速调整完成")
-                        
-                        # 检查调整后音频时长
-                        try:
-                            from pydub import AudioSegment
-                            import io
-                            audio_final = AudioSegment.from_wav(io.BytesIO(audio_data))
-                            print(f"[FishSpeechService] 调整后音频时长: {len(audio_final)/1000:.2f}s")
-                        except Exception as e:
-                            print(f"[FishSpeechService] 无法检测调整后音频时长: {e}")
-                    else:
-                        print(f"[FishSpeechService] speed=1.0, 跳过语速调整")
-                else:
-                    print(f"[FishSpeechService] params 为空，跳过语速调整")
-                
-                return audio_data
+            # 检查音频时长
+            try:
+                print(f"[FishSpeechService] FishSpeech 原始音频时长: {wav_duration(audio_data):.2f}s")
+            except Exception as e:
+                print(f"[FishSpeechService] 无法检测原始音频时长: {e}")
             
-            # 详细错误信息
-            error_detail = f"HTTP {response.status_code}: {response.text}"
-            print(f"[TTS 错误] {error_detail}")
-            print(f"[TTS 请求] 模式: {'克隆' if reference_audio else ('预设' if reference_id else '默认')}")
+            return audio_data
+        
+        if upstream_ref and ReferenceManager.is_missing_reference(response.status_code, response.text):
+            # 上游丢失了已注册的参考音频，改为内联发送
+            reference_manager.forget(upstream_ref)
+            if reference_audio is None and reference_hash:
+                reference_audio = await load_reference_audio(reference_hash)
+            return await FishSpeechService.synthesize_segment(text, reference_audio, reference_id, params)
+        
+        # 详细错误信息
+        error_detail = f"HTTP {response.status_code}: {response.text}"
+        print(f"[TTS 错误] {error_detail}")
+        print(f"[TTS 请求] 模式: {'克隆' if reference_audio or reference_hash else ('预设' if reference_id else '默认')}")
+        raise Exception(f"合成失败: {error_detail}")
+    
+    @staticmethod
+    async def open_stream(
+        text: str,
+        reference_audio: Optional[bytes] = None,
+        reference_id: Optional[str] = None,
+        params: Optional[Dict] = None,
+        upstream_ref: Optional[str] = None,
+        reference_hash: Optional[str] = None
+    ) -> httpx.Response:
+        """
+        以流式模式请求 Fish Speech，返回已确认 200 的响应（调用方负责 aclose）
+        音频按块到达：先是 WAV 文件头，然后是 PCM 数据
+        reference_hash: blob_store 中的参考音频，只在需要内联发送时才读取
+        """
+        if reference_hash and not upstream_ref:
+            reference_audio = await load_reference_audio(reference_hash)
+        data = FishSpeechService.build_request(text, reference_audio, reference_id, params, upstream_ref)
+        data["streaming"] = True
+        data["format"] = "wav"
+        
+        # 流式响应头通常立即返回，不做对冲；读超时沿用自适应超时
+        timeout = tts_latency.timeout(len(data["text"]), TTS_TIMEOUT_MAX, TTS_TIMEOUT_MIN, TTS_TIMEOUT_MULTIPLIER)
+        response = await fish_speech_pool.stream("POST", "/v1/tts", json=data, timeout=timeout)
+        if response.status_code != 200:
+            body = await response.aread()
+            await response.aclose()
+            if upstream_ref and ReferenceManager.is_missing_reference(response.status_code, body.decode("utf-8", "replace")):
+                reference_manager.forget(upstream_ref)
+                return await FishSpeechService.open_stream(
+                    text, reference_audio, reference_id, params, reference_hash=reference_hash
+                )
+            error_detail = f"HTTP {response.status_code}: {body.decode('utf-8', 'replace')}"
+            print(f"[TTS 错误] 流式合成: {error_detail}")
             raise Exception(f"合成失败: {error_detail}")
-        finally:
-            await client.aclose()
+        return response
+    
+    @staticmethod
+    def postprocess(audio_data: bytes, params: Optional[Dict] = None) -> bytes:
+        """统一后处理：调整语速（纯本地处理，不访问上游）"""
+        print(f"[FishSpeechService] params: {params}")
+        
+        if params:
+            speed = params.get("speed", 1.0)
+            print(f"[FishSpeechService] speed 值: {speed}, 类型: {type(speed)}")
+            
+            if speed != 1.0:
+                print(f"[FishSpeechService] 开始调整语速: {speed}x")
+                audio_data = AudioProcessor.adjust_speed(audio_data, speed)
+                print(f"[FishSpeechService] 语速调整完成")
+            else:
+                print(f"[FishSpeechService] speed=1.0, 跳过语速调整")
+        else:
+            print(f"[FishSpeechService] params 为空，跳过语速调整")
+        
+        return audio_data
+
+
+# ==================== 参考音频存储 ====================
+
+# 上传的参考音频流式写入磁盘，会话只保存内容哈希
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(OUTPUTS_DIR, "blobs"))
+BLOB_MAX_UPLOAD_MB = int(os.getenv("BLOB_MAX_UPLOAD_MB", "50"))
+BLOB_MAX_TOTAL_MB = int(os.getenv("BLOB_MAX_TOTAL_MB", "2048"))
+
+blob_store = BlobStore(
+    root=BLOB_DIR,
+    max_blob_bytes=BLOB_MAX_UPLOAD_MB * 1024 * 1024,
+    max_total_bytes=BLOB_MAX_TOTAL_MB * 1024 * 1024
+)
+
+# 参考音频预处理：高于 44.1kHz 时降采样、单声道、去首尾静音、截断到最大时长
+REFERENCE_NORMALIZE_ENABLED = os.getenv("REFERENCE_NORMALIZE_ENABLED", "1") == "1"
+REFERENCE_MAX_SECONDS = float(os.getenv("REFERENCE_MAX_SECONDS", "30"))
+
+reference_normalizer = ReferenceNormalizer(
+    blob_store,
+    max_seconds=REFERENCE_MAX_SECONDS,
+    enabled=REFERENCE_NORMALIZE_ENABLED
+)
+
+# 多段参考音频融合：按质量取前 N 段拼接为一段（1 表示只用质量最好的一段）
+REFERENCE_FUSION_TOP_N = int(os.getenv("REFERENCE_FUSION_TOP_N", "3"))
+
+reference_fuser = ReferenceFuser(
+    reference_normalizer,
+    top_n=REFERENCE_FUSION_TOP_N,
+    max_seconds=REFERENCE_MAX_SECONDS
+)
+
+
+# 参考音频在 Fish Speech 上注册一次，之后按 reference_id 合成
+REFERENCE_REGISTRATION_ENABLED = os.getenv("REFERENCE_REGISTRATION_ENABLED", "1") == "1"
+
+reference_manager = ReferenceManager(
+    get_fish_speech_client,
+    fish_speech_pool.urls,
+    enabled=REFERENCE_REGISTRATION_ENABLED
+)
+
+
+async def load_reference_audio(audio_hash: str) -> bytes:
+    """从 blob_store 读取参考音频"""
+    return await asyncio.to_thread(blob_store.read, audio_hash)
 
 
 # ==================== 会话管理 ====================
 
+# 每个会话保留的原始音频版本数（用于仅调整语速时跳过上游合成）
+SESSION_RAW_AUDIO_KEEP = int(os.getenv("SESSION_RAW_AUDIO_KEEP", "4"))
+
 class SynthesisSession:
     """合成会话"""
     
@@ -768,7 +1047,7 @@ class SynthesisSession:
         self.mode = "default"  # clone 或 default
         self.text = ""
         self.voice_id = "xiaoxiao"
-        self.reference_audios: List[bytes] = []  # 支持多段音频
+        self.reference_audios: List[str] = []  # 参考音频在 blob_store 中的哈希，支持多段
         self.analysis = {}
         self.current_params = {
             "speed": 1.0,
@@ -776,9 +1055,209 @@ class SynthesisSession:
         }
         self.version = 0
         self.history = []
+        # 上游原始音频（语速调整前），key 为不含语速的上游参数指纹
+        self.raw_audios: "OrderedDict[str, bytes]" = OrderedDict()
+    
+    def remember_raw_audio(self, upstream_key: str, audio: bytes):
+        """保存原始音频，只保留最近 SESSION_RAW_AUDIO_KEEP 个版本"""
+        self.raw_audios.pop(upstream_key, None)
+        self.raw_audios[upstream_key] = audio
+        while len(self.raw_audios) > SESSION_RAW_AUDIO_KEEP:
+            self.raw_audios.popitem(last=False)
+
+    def synthesis_snapshot(self) -> "SynthesisSession":
+        """只含合成所需字段的副本（不复制分析结果、历史和原始音频）"""
+        snapshot = SynthesisSession()
+        snapshot.session_id = self.session_id
+        snapshot.mode = self.mode
+        snapshot.text = self.text
+        snapshot.voice_id = self.voice_id
+        snapshot.reference_audios = list(self.reference_audios)
+        snapshot.current_params = dict(self.current_params)
+        snapshot.version = self.version
+        return snapshot
+
+    def memory_bytes(self) -> int:
+        """会话占用的音频内存（原始音频缓存；参考音频在磁盘上，不计入）"""
+        return sum(len(a) for a in self.raw_audios.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为 JSON 可存储的结构，音频只记录内容哈希"""
+        return {
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "text": self.text,
+            "voice_id": self.voice_id,
+            "reference_audios": list(self.reference_audios),
+            "analysis": self.analysis,
+            "current_params": self.current_params,
+            "version": self.version,
+            "history": self.history,
+            "raw_audios": [[key, content_hash(a)] for key, a in self.raw_audios.items()]
+        }
+
+    def audio_blobs(self) -> Dict[str, bytes]:
+        """会话内存中持有的音频 {哈希: 内容}（参考音频已在 blob_store 中）"""
+        return {content_hash(a): a for a in self.raw_audios.values()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], load_audio) -> "SynthesisSession":
+        """从 to_dict() 的结果还原，load_audio(hash) 读取音频内容"""
+        session = cls()
+        for field in ("session_id", "mode", "text", "voice_id", "analysis", "current_params", "version", "history"):
+            setattr(session, field, data[field])
+        session.reference_audios = list(data["reference_audios"])
+        session.raw_audios = OrderedDict((key, load_audio(h)) for key, h in data["raw_audios"])
+        return session
+
+
+def only_speed_changed(old_params: Dict, new_params: Dict) -> bool:
+    """判断两组参数是否只有语速不同（此时只需重跑本地后处理）"""
+    keys = (set(old_params) | set(new_params)) - {"speed"}
+    if any(old_params.get(k) != new_params.get(k) for k in keys):
+        return False
+    return old_params.get("speed", 1.0) != new_params.get("speed", 1.0)
+
+
+# 会话存储：memory（单 worker）或 sqlite（多个 worker 共享 SESSION_DB）
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB = os.getenv("SESSION_DB", os.path.join(OUTPUTS_DIR, "sessions.db"))
+# 会话上限：空闲超时、最大会话数、音频内存预算，超出按 LRU 淘汰
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_MAX_AUDIO_MB = int(os.getenv("SESSION_MAX_AUDIO_MB", "512"))
+
+
+def create_session_store() -> SessionStore:
+    """按 SESSION_BACKEND 创建会话存储"""
+    limits = dict(
+        idle_ttl=SESSION_IDLE_TTL,
+        max_sessions=SESSION_MAX_COUNT,
+        max_audio_bytes=SESSION_MAX_AUDIO_MB * 1024 * 1024
+    )
+    if SESSION_BACKEND == "sqlite":
+        print(f"[SessionStore] 使用 SQLite 会话存储: {SESSION_DB}")
+        return SQLiteSessionStore(SESSION_DB, SynthesisSession.from_dict, **limits)
+    if SESSION_BACKEND != "memory":
+        print(f"[SessionStore] 未知的 SESSION_BACKEND={SESSION_BACKEND}，使用内存存储")
+    return MemorySessionStore(**limits)
+
+
+sessions = create_session_store()
+# 参考音频只淘汰不再被任何会话引用的文件
+blob_store.referenced = sessions.referenced_blobs
+
+
+# ==================== 合成结果缓存 ====================
+
+SYNTHESIS_CACHE_ENABLED = os.getenv("SYNTHESIS_CACHE_ENABLED", "1") == "1"
+SYNTHESIS_CACHE_MEMORY_MB = int(os.getenv("SYNTHESIS_CACHE_MEMORY_MB", "64"))
+SYNTHESIS_CACHE_DISK_MB = int(os.getenv("SYNTHESIS_CACHE_DISK_MB", "1024"))
+
+synthesis_cache = SynthesisCache(
+    cache_dir=os.path.join(OUTPUTS_DIR, "cache"),
+    memory_max_bytes=SYNTHESIS_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_max_bytes=SYNTHESIS_CACHE_DISK_MB * 1024 * 1024,
+    enabled=SYNTHESIS_CACHE_ENABLED
+)
+
+
+def upstream_cache_key(session: SynthesisSession) -> str:
+    """决定上游合成结果的参数指纹（文本、音色指纹、温度），不含后处理参数"""
+    if session.mode == "clone":
+        if session.reference_audios:
+            ref_hash = reference_fuser.fingerprint(session.reference_audios)
+        else:
+            ref_hash = content_hash(b"")
+        voice_fingerprint = "clone:" + ref_hash
+    else:
+        asset = voice_assets.get(session.voice_id)
+        voice_fingerprint = f"preset:{session.voice_id}:{asset.sha256 if asset else ''}"
+    return SynthesisCache.make_key(
+        text=FishSpeechService.build_text(session.text, session.current_params),
+        voice=voice_fingerprint,
+        temperature=TTS_TEMPERATURE
+    )
 
 
-sessions: Dict[str, SynthesisSession] = {}
+def synthesis_cache_key(upstream_key: str, params: Dict) -> str:
+    """最终音频的缓存 key = 上游指纹 + 后处理参数"""
+    return SynthesisCache.make_key(
+        upstream=upstream_key,
+        speed=float(params.get("speed", 1.0) or 1.0)
+    )
+
+
+async def session_reference_hash(session: SynthesisSession) -> Optional[str]:
+    """克隆模式实际发送的参考音频（规范化后；多段时为融合结果），返回 blob_store 哈希"""
+    if not session.reference_audios:
+        return None
+    return await asyncio.to_thread(reference_fuser.fuse, session.reference_audios)
+
+
+async def session_upstream_reference(session: SynthesisSession) -> Optional[str]:
+    """会话音色在 Fish Speech 上注册的 reference_id；不支持或注册失败时返回 None（内联发送音频）"""
+    if session.mode == "clone":
+        if not session.reference_audios:
+            return None
+        ref_hash = await session_reference_hash(session)
+        return await reference_manager.ensure(ref_hash, lambda: blob_store.read(ref_hash))
+    asset = voice_assets.get(session.voice_id)
+    if asset is None:
+        return None
+    return await reference_manager.ensure(asset.sha256, lambda: base64.b64decode(asset.audio_base64))
+
+
+# 合并上游参数相同的并发合成（例如多人同时试听同一预设音色和示例文本）
+synthesis_flight = SingleFlight()
+
+
+async def fetch_raw_audio(session: SynthesisSession) -> bytes:
+    """调用 Fish Speech 合成会话当前文本，返回语速调整前的原始音频"""
+    if session.mode == "clone":
+        # 克隆模式 - 使用用户上传的音频（多段时为融合结果）
+        # 参考音频已在上游注册时只发送 id，不读取音频内容
+        return await FishSpeechService.synthesize_raw(
+            text=session.text,
+            reference_hash=await session_reference_hash(session),
+            params=session.current_params,
+            upstream_ref=await session_upstream_reference(session)
+        )
+    # 普通模式 - 使用预设音色
+    return await FishSpeechService.synthesize_raw(
+        text=session.text,
+        reference_id=session.voice_id,  # 传递音色ID
+        params=session.current_params,
+        upstream_ref=await session_upstream_reference(session)
+    )
+
+
+async def synthesize_session(session: SynthesisSession) -> bytes:
+    """
+    按会话当前参数合成
+    - 命中结果缓存: 直接返回
+    - 会话内已有相同上游参数的原始音频（只改了语速）: 只重跑本地后处理
+    - 相同上游参数的合成正在进行: 等待并共享其结果
+    - 否则调用 Fish Speech
+    """
+    upstream_key = upstream_cache_key(session)
+    cache_key = synthesis_cache_key(upstream_key, session.current_params)
+    cached = synthesis_cache.get(cache_key)
+    if cached is not None:
+        print(f"[SynthesisCache] 命中: {session.session_id} key={cache_key[:12]}")
+        return cached
+    
+    raw_audio = session.raw_audios.get(upstream_key)
+    if raw_audio is not None:
+        print(f"[synthesize_session] 上游参数未变，仅重跑本地后处理: {session.session_id}")
+        session.raw_audios.move_to_end(upstream_key)
+    else:
+        raw_audio = await synthesis_flight.do(upstream_key, lambda: fetch_raw_audio(session))
+    session.remember_raw_audio(upstream_key, raw_audio)
+    
+    audio_data = FishSpeechService.postprocess(raw_audio, session.current_params)
+    synthesis_cache.put(cache_key, audio_data)
+    return audio_data
 
 
 # ==================== API 路由 ====================
@@ -806,7 +1285,7 @@ async def list_voices():
                 "default_params": v["default_params"],
                 "preview_url": f"/voices/{k}/preview"
             }
-            for k, v in DEFAULT_VOICES.items()
+            for k, v in voice_assets.voices().items()
         ]
     }
 
@@ -814,10 +1293,11 @@ async def list_voices():
 @app.get("/voices/{voice_id}/preview")
 async def get_voice_preview(voice_id: str):
     """获取预设音色的参考音频（用于试听）"""
-    if voice_id not in DEFAULT_VOICES:
+    voices = voice_assets.voices()
+    if voice_id not in voices:
         return JSONResponse(status_code=404, content={"error": "音色不存在"})
     
-    voice = DEFAULT_VOICES[voice_id]
+    voice = voices[voice_id]
     audio_path = voice.get("reference_audio")
     
     if not audio_path:
@@ -851,9 +1331,22 @@ async def analyze_text(
     
     # 智能分析
     analysis = await LLMService.analyze_text(text)
+    session = create_analysis_session(mode, text, voice_id, analysis)
     
-    # 创建会话
-    session_id = f"sess_{len(sessions)}_{os.urandom(4).hex()}"
+    return {
+        "session_id": session.session_id,
+        "phase": "analysis",
+        "mode": mode,
+        "text": text,
+        "analysis": analysis,
+        "suggested_params": session.current_params,
+        "message": "分析完成，请确认参数或调整后合成"
+    }
+
+
+def create_analysis_session(mode: str, text: str, voice_id: Optional[str], analysis: Dict[str, Any]) -> SynthesisSession:
+    """按分析结果创建会话"""
+    session_id = f"sess_{sessions.created}_{os.urandom(4).hex()}"
     session = SynthesisSession()
     session.session_id = session_id
     session.mode = mode
@@ -862,24 +1355,8 @@ async def analyze_text(
     session.analysis = analysis
     
     # 提取情感标签（从 emotion 字段转换）
-    emotion_value = analysis.get("emotion", "")
-    # 如果 emotion 包含括号，提取标签名并转换为 <|emotion|> 格式
-    emotion_map = {
-        "(happy)": "<|happy|>",
-        "(angry)": "<|angry|>",
-        "(sad)": "<|sad|>",
-        "(excited)": "<|excited|>",
-        "(surprised)": "<|surprised|>",
-        "(calm)": "<|calm|>"
-    }
-    emotion_tag = ""
-    if emotion_value and "(" in emotion_value:
-        # 可能是 "(happy) 开心" 或 "(happy)" 格式
-        extracted = emotion_value.split(")")[0] + ")"
-        emotion_tag = emotion_map.get(extracted, "")
-    elif emotion_value and emotion_value.startswith("<"):
-        # 已经是 <|emotion|> 格式
-        emotion_tag = emotion_value
+    # 可能是 "(happy) 开心"、"(happy)" 或 "<|happy|>" 格式，统一为 <|emotion|>；未知标签丢弃
+    emotion_tag = normalize_tag(analysis.get("emotion", ""))
     
     session.current_params = {
         "speed": analysis.get("speed", 1.0),
@@ -890,27 +1367,197 @@ async def analyze_text(
     
     sessions[session_id] = session
     
+    # 用户阅读建议参数时，GPU 空闲的话先按建议参数在后台合成
+    maybe_speculate(session)
+    return session
+
+
+@app.post("/synthesize/analyze/batch")
+async def analyze_batch(
+    mode: Literal["clone", "default"] = Form(...),
+    texts: str = Form(...),
+    voice_id: Optional[str] = Form(None)
+):
+    """
+    批量分析（脚本、IVR 提示语等批量导入）
+    
+    - texts: JSON 字符串数组
+    - 多段文本合并为一次大模型调用，每段文本创建一个会话
+    """
+    try:
+        text_list = json.loads(texts)
+    except ValueError:
+        text_list = None
+    if not isinstance(text_list, list) or not all(isinstance(t, str) for t in text_list):
+        return JSONResponse(status_code=400, content={"error": "texts 必须是 JSON 字符串数组"})
+    if not text_list or not all(t.strip() for t in text_list):
+        return JSONResponse(status_code=400, content={"error": "文本不能为空"})
+    max_texts = min(ANALYZE_BATCH_MAX_TEXTS, max(1, sessions.max_sessions // 10))
+    if len(text_list) > max_texts:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"单次最多 {max_texts} 段文本", "code": "TOO_MANY_TEXTS"}
+        )
+    
+    analyses = await LLMService.analyze_batch(text_list)
+    items = []
+    for text, analysis in zip(text_list, analyses):
+        session = create_analysis_session(mode, text, voice_id, analysis)
+        items.append({
+            "session_id": session.session_id,
+            "text": text,
+            "analysis": analysis,
+            "suggested_params": session.current_params
+        })
+    
     return {
-        "session_id": session_id,
         "phase": "analysis",
         "mode": mode,
-        "text": text,
-        "analysis": analysis,
-        "suggested_params": session.current_params,
-        "message": "分析完成，请确认参数或调整后合成"
+        "count": len(items),
+        "items": items,
+        "message": f"已分析 {len(items)} 段文本，请确认参数或调整后合成"
     }
 
 
 # ==================== 阶段2: 首次合成 ====================
 
+def apply_param_overrides(session: SynthesisSession, **overrides):
+    """将表单中非空的参数覆盖到会话当前参数"""
+    for key, value in overrides.items():
+        if value is not None:
+            session.current_params[key] = value
+
+
+async def store_reference_upload(session: SynthesisSession, upload: UploadFile) -> Optional[JSONResponse]:
+    """将上传的参考音频流式写入 blob_store 并加入会话；超过大小上限时返回 413 响应"""
+    try:
+        audio_hash = await blob_store.put_upload(upload)
+    except BlobTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e), "code": "AUDIO_TOO_LARGE"})
+    sessions.add_reference_audio(session, audio_hash)
+    # 上传时就完成预处理和融合，首次合成不用再等
+    await asyncio.to_thread(reference_fuser.fuse, session.reference_audios)
+    return None
+
+
+# ==================== 合成任务队列 ====================
+
+# 同时访问 Fish Speech 的合成任务数；超出的排队，队列满时返回 429
+# 默认按后端数量放大（每个后端 FISH_SPEECH_MAX_INFLIGHT 个，不限制时每个后端 2 个）
+SYNTHESIS_CONCURRENCY = int(os.getenv(
+    "SYNTHESIS_CONCURRENCY",
+    str((FISH_SPEECH_MAX_INFLIGHT or 2) * len(FISH_SPEECH_BACKENDS))
+))
+SYNTHESIS_QUEUE_MAX = int(os.getenv("SYNTHESIS_QUEUE_MAX", "64"))
+SYNTHESIS_QUEUE_PER_CLIENT = int(os.getenv("SYNTHESIS_QUEUE_PER_CLIENT", "8"))
+
+synthesis_jobs = JobQueue(
+    concurrency=SYNTHESIS_CONCURRENCY,
+    max_queued=SYNTHESIS_QUEUE_MAX,
+    max_per_client=SYNTHESIS_QUEUE_PER_CLIENT
+)
+
+
+def request_client_id(request: Request) -> str:
+    """任务队列按客户端 IP 做公平调度"""
+    return request.client.host if request.client else "unknown"
+
+
+def queue_full_response(e: QueueFull) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(e), "code": "QUEUE_FULL", "retry_after": math.ceil(e.retry_after)},
+        headers={"Retry-After": str(math.ceil(e.retry_after))}
+    )
+
+
+def needs_upstream(session: SynthesisSession) -> bool:
+    """本次合成是否需要调用 Fish Speech（结果缓存、会话原始音频都未命中，且没有相同的合成正在进行）"""
+    upstream_key = upstream_cache_key(session)
+    if upstream_key in session.raw_audios or upstream_key in synthesis_flight:
+        return False
+    return synthesis_cache_key(upstream_key, session.current_params) not in synthesis_cache
+
+
+async def queued_synthesize(request: Request, session: SynthesisSession) -> bytes:
+    """需要调用 Fish Speech 时经任务队列执行（受并发限制），否则直接返回"""
+    if needs_upstream(session):
+        return await synthesis_jobs.run(request_client_id(request), lambda: synthesize_session(session))
+    return await synthesize_session(session)
+
+
+# 推测合成：分析完成后按建议参数在后台预先合成，结果写入合成缓存，
+# 用户不改参数直接确认时 /synthesize 立即命中。只在执行槽空闲
+# （超过 SPECULATIVE_RESERVE_SLOTS 个）时进行，不挤占真实请求；
+# 合成时分段串行、不对冲，同一时间最多占用一个上游名额
+SPECULATIVE_SYNTHESIS_ENABLED = os.getenv("SPECULATIVE_SYNTHESIS_ENABLED", "0") == "1"
+SPECULATIVE_RESERVE_SLOTS = int(os.getenv("SPECULATIVE_RESERVE_SLOTS", "1"))
+
+speculation_stats = {"started": 0, "skipped": 0, "completed": 0, "failed": 0}
+
+
+def maybe_speculate(session: SynthesisSession):
+    """
+    队列空闲时在后台合成会话当前参数对应的音频
+    结果写入合成缓存，原始音频写回会话（之后只改语速时不必再调用上游）
+    """
+    if not SPECULATIVE_SYNTHESIS_ENABLED or not SYNTHESIS_CACHE_ENABLED:
+        # 没有合成缓存时，用户确认参数后无法直接命中推测结果
+        return
+    if session.mode == "clone" and not session.reference_audios:
+        return
+    if not needs_upstream(session):
+        return
+    if synthesis_jobs.idle_slots() <= SPECULATIVE_RESERVE_SLOTS:
+        speculation_stats["skipped"] += 1
+        return
+    # 使用会话快照，避免与用户后续请求同时修改同一会话
+    snapshot = session.synthesis_snapshot()
+    upstream_key = upstream_cache_key(snapshot)
+    
+    async def job():
+        # 只影响本任务（submit 为每个任务创建独立的上下文）
+        speculative_synthesis.set(True)
+        try:
+            await synthesize_session(snapshot)
+        except Exception as e:
+            speculation_stats["failed"] += 1
+            print(f"[推测合成] {snapshot.session_id} 失败: {e}")
+            raise
+        speculation_stats["completed"] += 1
+        print(f"[推测合成] {snapshot.session_id} 已写入缓存")
+        # 会话期间没有新合成版本时，把原始音频写回存储中的会话
+        current = await sessions.aget(snapshot.session_id)
+        raw_audio = snapshot.raw_audios.get(upstream_key)
+        if (current is not None and raw_audio is not None and current.version == snapshot.version
+                and upstream_key not in current.raw_audios):
+            current.remember_raw_audio(upstream_key, raw_audio)
+            sessions.save(current)
+    
+    # 立即占用执行槽（同步入队），后续请求的空闲判断能看到它
+    synthesis_jobs.submit("speculative", job)
+    speculation_stats["started"] += 1
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """查询合成任务状态；完成后 result 为与 /synthesize 相同的响应"""
+    job = synthesis_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "任务不存在或已过期"})
+    return {**job.to_dict(), "position": synthesis_jobs.position(job)}
+
+
 @app.post("/synthesize")
 async def synthesize(
+    request: Request,
     session_id: str = Form(...),
     speed: Optional[float] = Form(None),
     pitch: Optional[int] = Form(None),
     volume: Optional[float] = Form(None),
     emotion_tag: Optional[str] = Form(None),
-    reference_audio: Optional[UploadFile] = File(None)
+    reference_audio: Optional[UploadFile] = File(None),
+    async_job: bool = Form(False)
 ):
     """
     阶段2: 合成语音
@@ -918,22 +1565,16 @@ async def synthesize(
     - 应用用户调整的参数
     - 支持上传参考音频（克隆模式）
     - 返回合成结果和优化建议
+    - async_job=true 时立即返回 202 和 job_id，通过 /jobs/{job_id} 查询结果
+    - 合成队列已满时返回 429（带 Retry-After）
     """
     
-    if session_id not in sessions:
+    session = await sessions.aget(session_id)
+    if session is None:
         return JSONResponse(status_code=404, content={"error": "会话不存在"})
     
-    session = sessions[session_id]
-    
     # 应用用户调整
-    if speed is not None:
-        session.current_params["speed"] = speed
-    if pitch is not None:
-        session.current_params["pitch"] = pitch
-    if volume is not None:
-        session.current_params["volume"] = volume
-    if emotion_tag is not None:
-        session.current_params["emotion_tag"] = emotion_tag
+    apply_param_overrides(session, speed=speed, pitch=pitch, volume=volume, emotion_tag=emotion_tag)
     
     # 打印接收到的参数
     print(f"[/synthesize] 接收参数: session_id={session_id}, speed={speed}, pitch={pitch}, volume={volume}, emotion_tag={emotion_tag}")
@@ -941,8 +1582,9 @@ async def synthesize(
     
     # 保存新上传的参考音频
     if reference_audio:
-        audio_bytes = await reference_audio.read()
-        session.reference_audios.append(audio_bytes)
+        error = await store_reference_upload(session, reference_audio)
+        if error:
+            return error
     
     # 检查是否有参考音频
     if session.mode == "clone" and len(session.reference_audios) == 0:
@@ -951,31 +1593,15 @@ async def synthesize(
             content={"error": "克隆模式需要上传参考音频", "code": "MISSING_AUDIO"}
         )
     
-    try:
-        # 执行合成
-        if session.mode == "clone":
-            # 克隆模式 - 使用用户上传的音频（取第一段或融合）
-            ref_audio = session.reference_audios[0] if session.reference_audios else None
-            audio_data = await FishSpeechService.synthesize(
-                text=session.text,
-                reference_audio=ref_audio,
-                params=session.current_params
-            )
-        else:
-            # 普通模式 - 使用预设音色
-            audio_data = await FishSpeechService.synthesize(
-                text=session.text,
-                reference_id=session.voice_id,  # 传递音色ID
-                params=session.current_params
-            )
-        
+    def save_result(audio_data: bytes) -> Dict[str, Any]:
         # 保存音频到固定目录（语速调整已在 FishSpeechService 中完成）
-        os.makedirs("outputs", exist_ok=True)
-        audio_filename = f"outputs/{session_id}_{session.version}.wav"
+        os.makedirs(OUTPUTS_DIR, exist_ok=True)
+        audio_filename = os.path.join(OUTPUTS_DIR, f"{session_id}_{session.version}.wav")
         with open(audio_filename, "wb") as f:
             f.write(audio_data)
         
         session.version += 1
+        sessions.save(session)
         
         # 构建提示
         tips = []
@@ -996,14 +1622,205 @@ async def synthesize(
             "message": f"第{session.version}版合成完成"
         }
     
+    async def job() -> Dict[str, Any]:
+        return save_result(await synthesize_session(session))
+    
+    try:
+        if async_job:
+            # 后台排队，立即返回 job_id，结果通过 /jobs/{job_id} 查询
+            sessions.save(session)
+            queued = synthesis_jobs.submit(request_client_id(request), job)
+            return JSONResponse(status_code=202, content={
+                "session_id": session_id,
+                "job_id": queued.job_id,
+                "status": queued.status,
+                "status_url": f"/jobs/{queued.job_id}"
+            })
+        # 执行合成（命中缓存时不调用 Fish Speech，也不排队）
+        return save_result(await queued_synthesize(request, session))
+    
+    except QueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
         print(f"[合成错误] {str(e)}")
         print(f"[错误详情] {error_trace}")
+        sessions.save(session)
         return JSONResponse(status_code=500, content={"error": str(e), "detail": error_trace})
 
 
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    响应结束时（包括客户端在响应头发出前就已断开、正文生成器从未启动的情况）
+    调用 on_close，释放执行槽和上游连接
+    """
+    
+    def __init__(self, content, on_close: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+
+@app.post("/synthesize/stream")
+async def synthesize_stream(
+    request: Request,
+    session_id: str = Form(...),
+    speed: Optional[float] = Form(None),
+    pitch: Optional[int] = Form(None),
+    volume: Optional[float] = Form(None),
+    emotion_tag: Optional[str] = Form(None),
+    reference_audio: Optional[UploadFile] = File(None)
+):
+    """
+    阶段2（流式）: 边合成边返回音频
+    
+    - Fish Speech 的音频块到达后立即转发给客户端（chunked WAV），同时写入 outputs/
+    - 语速调整在流上增量完成（WSOLA）
+    - 响应头 X-Audio-Url / X-Version 给出完整文件地址和版本号
+    """
+    
+    session = await sessions.aget(session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content={"error": "会话不存在"})
+    apply_param_overrides(session, speed=speed, pitch=pitch, volume=volume, emotion_tag=emotion_tag)
+    
+    if reference_audio:
+        error = await store_reference_upload(session, reference_audio)
+        if error:
+            return error
+    
+    if session.mode == "clone" and len(session.reference_audios) == 0:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "克隆模式需要上传参考音频", "code": "MISSING_AUDIO"}
+        )
+    
+    os.makedirs(OUTPUTS_DIR, exist_ok=True)
+    audio_filename = os.path.join(OUTPUTS_DIR, f"{session_id}_{session.version}.wav")
+    headers = {
+        "X-Session-Id": session_id,
+        "X-Version": str(session.version + 1),
+        "X-Audio-Url": f"/audio/{os.path.basename(audio_filename)}"
+    }
+    params = dict(session.current_params)
+    upstream_key = upstream_cache_key(session)
+    cache_key = synthesis_cache_key(upstream_key, params)
+    
+    # 命中缓存（或只改了语速）时不需要上游，直接整段返回
+    audio_data = synthesis_cache.get(cache_key)
+    try:
+        if audio_data is None and (upstream_key in session.raw_audios or upstream_key in synthesis_flight):
+            audio_data = await synthesize_session(session)
+        if audio_data is not None:
+            with open(audio_filename, "wb") as f:
+                f.write(audio_data)
+            session.version += 1
+            sessions.save(session)
+            return StreamingResponse(iter([audio_data]), media_type="audio/wav", headers=headers)
+    except Exception as e:
+        print(f"[合成错误] 流式（本地结果）: {e}")
+        sessions.save(session)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    
+    # 流式合成在整个转发期间占用一个执行槽
+    try:
+        job = synthesis_jobs.enqueue(request_client_id(request))
+    except QueueFull as e:
+        return queue_full_response(e)
+    await synthesis_jobs.wait_turn(job)
+    headers["X-Job-Id"] = job.job_id
+    
+    try:
+        ref_hash = await session_reference_hash(session) if session.mode == "clone" else None
+        upstream = await FishSpeechService.open_stream(
+            text=session.text,
+            reference_hash=ref_hash,
+            reference_id=None if ref_hash else session.voice_id,
+            params=params,
+            upstream_ref=await session_upstream_reference(session)
+        )
+    except Exception as e:
+        print(f"[合成错误] 流式: {e}")
+        synthesis_jobs.finish(job, error=e)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    
+    speed_value = float(params.get("speed", 1.0) or 1.0)
+    
+    async def relay():
+        reader = WavStreamReader()
+        stretcher = None
+        raw_chunks = []
+        pcm_chunks = []
+        tmp_filename = audio_filename + ".part"
+        f = open(tmp_filename, "wb")
+        completed = False
+        try:
+            async for chunk in upstream.aiter_bytes():
+                raw_chunks.append(chunk)
+                pcm = reader.feed(chunk)
+                if not reader.header_ready:
+                    continue
+                if stretcher is None:
+                    stretcher = TimeStretcher(speed_value, reader.sample_rate, reader.channels) if speed_value != 1.0 else False
+                    header = streaming_wav_header(reader.sample_rate, reader.channels)
+                    f.write(header)
+                    yield header
+                if stretcher:
+                    pcm = stretcher.process(pcm)
+                if len(pcm):
+                    data = pcm.tobytes()
+                    pcm_chunks.append(data)
+                    f.write(data)
+                    yield data
+            if stretcher:
+                data = stretcher.flush().tobytes()
+                pcm_chunks.append(data)
+                f.write(data)
+                yield data
+            if not reader.header_ready:
+                raise Exception("上游未返回有效的 WAV 音频")
+            
+            # 回填真实长度，落盘并写入缓存
+            pcm_all = b"".join(pcm_chunks)
+            final_header = wav_header(reader.sample_rate, reader.channels, len(pcm_all) // (2 * reader.channels))
+            f.seek(0)
+            f.write(final_header)
+            f.close()
+            os.replace(tmp_filename, audio_filename)
+            completed = True
+            
+            session.remember_raw_audio(upstream_key, b"".join(raw_chunks))
+            synthesis_cache.put(cache_key, final_header + pcm_all)
+            session.version += 1
+            sessions.save(session)
+            print(f"[/synthesize/stream] 完成: {audio_filename}, {len(pcm_all)} bytes PCM")
+        except Exception as e:
+            print(f"[/synthesize/stream] 中断: {e}")
+            raise
+        finally:
+            await upstream.aclose()
+            synthesis_jobs.finish(job, error=None if completed else Exception("流式合成中断"))
+            if not completed:
+                f.close()
+                try:
+                    os.remove(tmp_filename)
+                except OSError:
+                    pass
+    
+    async def release():
+        # relay() 正常结束时已经释放过，这里重复调用无副作用
+        await upstream.aclose()
+        synthesis_jobs.finish(job, error=Exception("流式合成中断"))
+    
+    return ReleasingStreamingResponse(relay(), on_close=release, media_type="audio/wav", headers=headers)
+
+
 # ==================== 阶段3: 交互优化 ====================
 
 @app.post("/synthesize/feedback/analyze")
@@ -1017,11 +1834,10 @@ async def feedback_analyze(
     用户确认后再调用 /synthesize/feedback/apply 执行合成
     """
     
-    if session_id not in sessions:
+    session = await sessions.aget(session_id)
+    if session is None:
         return JSONResponse(status_code=404, content={"error": "会话不存在"})
     
-    session = sessions[session_id]
-    
     # 理解反馈（大模型分析）
     result = await LLMService.understand_feedback(
         feedback,
@@ -1044,6 +1860,7 @@ async def feedback_analyze(
         "adjustments": adjustments,  # 具体调整
         "current_params": session.current_params,  # 当前参数
         "proposed_params": proposed_params,  # 建议参数
+        "speed_only": only_speed_changed(session.current_params, proposed_params),  # 仅语速变化时无需重新调用 TTS
         "tips": result.get("tips", []),
         "need_more_audio": result.get("need_more_audio", False),
         "message": "请确认参数调整"
@@ -1052,6 +1869,7 @@ async def feedback_analyze(
 
 @app.post("/synthesize/feedback/apply")
 async def feedback_apply(
+    request: Request,
     session_id: str = Form(...),
     apply_adjustments: bool = Form(True),
     params: Optional[str] = Form(None),  # JSON 字符串，包含调整后的参数
@@ -1063,15 +1881,15 @@ async def feedback_apply(
     用户确认后调用此接口执行实际合成
     """
     
-    if session_id not in sessions:
+    session = await sessions.aget(session_id)
+    if session is None:
         return JSONResponse(status_code=404, content={"error": "会话不存在"})
     
-    session = sessions[session_id]
-    
     # 保存额外上传的音频
     if additional_audio:
-        audio_bytes = await additional_audio.read()
-        session.reference_audios.append(audio_bytes)
+        error = await store_reference_upload(session, additional_audio)
+        if error:
+            return error
     
     # 应用用户确认后的参数
     if apply_adjustments and params:
@@ -1079,33 +1897,23 @@ async def feedback_apply(
             import json
             new_params = json.loads(params)
             print(f"[feedback_apply] 应用调整后的参数: {new_params}")
+            if only_speed_changed(session.current_params, {**session.current_params, **new_params}):
+                print(f"[feedback_apply] 仅语速变化，复用原始音频做本地后处理")
             session.current_params.update(new_params)
         except Exception as e:
             print(f"[feedback_apply] 解析参数失败: {e}")
     
     try:
         # 执行合成 (feedback_apply)
-        if session.mode == "clone":
-            ref_audio = session.reference_audios[0] if session.reference_audios else None
-            audio_data = await FishSpeechService.synthesize(
-                text=session.text,
-                reference_audio=ref_audio,
-                params=session.current_params
-            )
-        else:
-            # 普通模式 - 使用预设音色
-            audio_data = await FishSpeechService.synthesize(
-                text=session.text,
-                reference_id=session.voice_id,  # 传递音色ID
-                params=session.current_params
-            )
+        audio_data = await queued_synthesize(request, session)
         
         # 保存音频（语速调整已在 FishSpeechService 中完成）
-        os.makedirs("outputs", exist_ok=True)
+        os.makedirs(OUTPUTS_DIR, exist_ok=True)
         session.version += 1
-        audio_filename = f"outputs/{session_id}_{session.version}.wav"
+        audio_filename = os.path.join(OUTPUTS_DIR, f"{session_id}_{session.version}.wav")
         with open(audio_filename, "wb") as f:
             f.write(audio_data)
+        sessions.save(session)
         
         # 获取最后一次反馈记录
         last_feedback = session.history[-1]["feedback"] if session.history else ""
@@ -1122,12 +1930,17 @@ async def feedback_apply(
             "message": f"第{session.version}版合成完成"
         }
     
+    except QueueFull as e:
+        sessions.save(session)
+        return queue_full_response(e)
     except Exception as e:
+        sessions.save(session)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
 @app.post("/synthesize/feedback")
 async def feedback(
+    request: Request,
     session_id: str = Form(...),
     feedback: str = Form(...),
     additional_audio: Optional[UploadFile] = File(None)
@@ -1136,28 +1949,40 @@ async def feedback(
     阶段3: 接收反馈、分析、调整参数、自动合成新语音（旧版，保留兼容）
     """
     
-    if session_id not in sessions:
+    session = await sessions.aget(session_id)
+    if session is None:
         return JSONResponse(status_code=404, content={"error": "会话不存在"})
     
-    session = sessions[session_id]
-    
     # 保存额外上传的音频
     if additional_audio:
-        audio_bytes = await additional_audio.read()
-        session.reference_audios.append(audio_bytes)
+        error = await store_reference_upload(session, additional_audio)
+        if error:
+            return error
+    
+    synthesis_task = None
+    
+    def start_synthesis(adjustments: Dict[str, Any]):
+        # 调整方案一解析出来就开始合成，与大模型继续输出分析说明的时间重叠
+        nonlocal synthesis_task
+        for key, value in adjustments.items():
+            if value is not None:
+                session.current_params[key] = value
+        synthesis_task = asyncio.ensure_future(queued_synthesize(request, session))
     
     # 理解反馈（大模型分析）
     result = await LLMService.understand_feedback(
         feedback,
         session.current_params,
-        len(session.reference_audios)
+        len(session.reference_audios),
+        on_adjustments=start_synthesis
     )
     
-    # 应用调整
+    # 应用调整（已提前开始合成时调整已经生效）
     adjustments = result.get("adjustments", {})
-    for key, value in adjustments.items():
-        if value is not None:
-            session.current_params[key] = value
+    if synthesis_task is None:
+        for key, value in adjustments.items():
+            if value is not None:
+                session.current_params[key] = value
     
     # 记录历史
     session.history.append({
@@ -1170,26 +1995,19 @@ async def feedback(
     
     # 自动合成新语音
     try:
-        # 执行合成
-        if session.mode == "clone":
-            ref_audio = session.reference_audios[0] if session.reference_audios else None
-            audio_data = await FishSpeechService.synthesize(
-                text=session.text,
-                reference_audio=ref_audio,
-                params=session.current_params
-            )
+        # 执行合成（或等待提前开始的合成）
+        if synthesis_task is not None:
+            audio_data = await synthesis_task
         else:
-            audio_data = await FishSpeechService.synthesize(
-                text=session.text,
-                params=session.current_params
-            )
+            audio_data = await queued_synthesize(request, session)
         
         # 保存音频（语速调整已在 FishSpeechService 中完成）
-        os.makedirs("outputs", exist_ok=True)
+        os.makedirs(OUTPUTS_DIR, exist_ok=True)
         session.version += 1
-        audio_filename = f"outputs/{session_id}_{session.version}.wav"
+        audio_filename = os.path.join(OUTPUTS_DIR, f"{session_id}_{session.version}.wav")
         with open(audio_filename, "wb") as f:
             f.write(audio_data)
+        sessions.save(session)
         
         # 构建提示
         tips = result.get("tips", [])
@@ -1211,7 +2029,11 @@ async def feedback(
             "message": f"第{session.version}版合成完成（已根据反馈自动优化）"
         }
     
+    except QueueFull as e:
+        sessions.save(session)
+        return queue_full_response(e)
     except Exception as e:
+        sessions.save(session)
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 
@@ -1220,16 +2042,16 @@ async def feedback(
 @app.get("/session/{session_id}")
 async def get_session(session_id: str):
     """获取会话状态"""
-    if session_id not in sessions:
+    session = await sessions.aget(session_id)
+    if session is None:
         return JSONResponse(status_code=404, content={"error": "会话不存在"})
-    
-    session = sessions[session_id]
     return {
         "session_id": session_id,
         "mode": session.mode,
         "text": session.text,
         "version": session.version,
         "audio_count": len(session.reference_audios),
+        "memory_bytes": session.memory_bytes(),
         "current_params": session.current_params,
         "history": session.history
     }
@@ -1238,12 +2060,12 @@ async def get_session(session_id: str):
 @app.post("/session/{session_id}/add-audio")
 async def add_audio(session_id: str, audio: UploadFile = File(...)):
     """添加更多参考音频"""
-    if session_id not in sessions:
+    session = await sessions.aget(session_id)
+    if session is None:
         return JSONResponse(status_code=404, content={"error": "会话不存在"})
-    
-    session = sessions[session_id]
-    audio_bytes = await audio.read()
-    session.reference_audios.append(audio_bytes)
+    error = await store_reference_upload(session, audio)
+    if error:
+        return error
     
     return {
         "success": True,
@@ -1258,7 +2080,7 @@ async def get_audio(filename: str):
     patterns = [
         f"/tmp/{filename}",
         f"/tmp/*{filename}*",
-        f"outputs/{filename}",
+        f"{OUTPUTS_DIR}/{filename}",
         f"../assets/voices/{filename}",
         f"assets/voices/{filename}"
     ]
@@ -1271,10 +2093,45 @@ async def get_audio(filename: str):
     return JSONResponse(status_code=404, content={"error": "文件不存在"})
 
 
+@app.get("/health")
+async def health():
+    """上游健康状况：Kimi 熔断状态、可用的 Fish Speech 后端"""
+    kimi = kimi_breaker.stats()
+    fish_speech = fish_speech_pool.stats()
+    degraded = kimi["state"] != "closed" or fish_speech["available"] == 0
+    return {
+        "status": "degraded" if degraded else "ok",
+        "upstreams": {
+            "kimi": kimi,
+            "fish_speech": fish_speech
+        }
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    """缓存等运行时统计"""
+    return {
+        "analysis_cache": {**analysis_cache.stats(), **analysis_flight.stats(), "batch": analysis_batch_stats},
+        "local_classifier": local_classifier.stats(),
+        "sessions": sessions.stats(),
+        "blob_store": blob_store.stats(),
+        "reference_normalizer": reference_normalizer.stats(),
+        "reference_fuser": reference_fuser.stats(),
+        "synthesis_jobs": {**synthesis_jobs.stats(), "speculation": speculation_stats},
+        "fish_speech_backends": fish_speech_pool.stats(),
+        "latency": {"fish_speech": tts_latency.stats(), "kimi": kimi_latency.stats()},
+        "llm_tokens": kimi_usage.stats(),
+        "reference_manager": reference_manager.stats(),
+        "synthesis_cache": {**synthesis_cache.stats(), **synthesis_flight.stats()},
+        "voice_assets": voice_assets.stats()
+    }
+
+
 @app.get("/voices/{voice_id}/sample")
 async def get_voice_sample(voice_id: str):
     """获取音色示例音频"""
-    voices = load_voices()
+    voices = voice_assets.voices()
     if voice_id not in voices:
         return JSONResponse(status_code=404, content={"error": "音色不存在"})
     
@@ -0,0 +1,120 @@
+"""
+大模型提示词模板
+
+提示词在导入时组装一次，每次请求的消息分为两部分：
+- system: 公共前缀（情感标签目录、标签和语速规则）+ 任务说明和输出格式，
+  全部是固定内容，逐字节不变。公共前缀在最前面，分析和反馈理解两类请求
+  共享同一段前缀，可以命中服务端的上下文缓存
+- user: 本次请求才变化的内容（文本 / 当前参数和反馈），很短
+
+TokenUsage 按提示词类型累计接口返回的 usage（prompt / completion / 缓存命中 token）。
+修改提示词内容时需要同时修改 ANALYZE_PROMPT_VERSION，使旧的分析缓存失效。
+"""
+from typing import Any, Dict, List, Optional
+import json
+
+from emotion_tags import render_catalogue
+
+ANALYZE_PROMPT_VERSION = "analyze-v2"
+
+# ==================== 固定部分（导入时组装） ====================
+
+SYSTEM_PREFIX = f"""你是语音合成参数助手，为 Fish Speech 选择情感标签和语速。
+
+【情感标签】只能从下表精确选择，输出格式为 <|标签名|>（如 <|happy|>），不要自己造词；不确定时留空 ""
+{render_catalogue(compact=True)}
+
+【语速】speed 范围 0.5-2.0：1.0 正常，>1.0 加快（如 1.2），<1.0 减慢（如 0.8）
+
+只输出 JSON，情感标签字段只包含标签本身，不要包含中文或 emoji。"""
+
+ANALYZE_INSTRUCTIONS = """【任务】分析用户给出的文本，确定最佳语音合成参数：场景/场合、最适合的情感标签、推荐语速、选择理由。
+输出 JSON：
+{"scene": "场景", "emotion": "<|happy|>", "speed": 1.0, "reason": "详细分析理由"}"""
+
+FEEDBACK_INSTRUCTIONS = """【任务】理解用户对当前合成结果的反馈，确定参数调整方案。
+可用调整工具：
+1. adjust_emotion: 调整情感标签，params 为 {"tag": "<|标签名|>"}；列表中没有合适的就选最接近的，或不调整
+2. adjust_speed: 调整语速（合成后的独立后处理，不是 TTS 参数），params 为 {"speed": 0.9}
+输出 JSON（adjustments 放在最前面）：
+{"adjustments": {"speed": 1.0, "emotion_tag": "<|happy|>"}, "analysis": "详细分析过程", "function_calls": [{"function": "adjust_emotion", "params": {"tag": "<|happy|>"}, "reason": "..."}, {"function": "adjust_speed", "params": {"speed": 0.9}, "reason": "..."}], "tips": ["提示1", "提示2"]}"""
+
+BATCH_ANALYZE_INSTRUCTIONS = """【任务】用户给出一个 JSON 数组，每项是 {"id": 编号, "text": "文本"}。逐条分析每段文本，确定最佳语音合成参数：场景/场合、最适合的情感标签、推荐语速、选择理由（简短）。
+输出 JSON 数组，每段文本一项，id 与输入对应，不要遗漏：
+[{"id": 0, "scene": "场景", "emotion": "<|happy|>", "speed": 1.0, "reason": "简短理由"}]"""
+
+ANALYZE_SYSTEM = f"{SYSTEM_PREFIX}\n\n{ANALYZE_INSTRUCTIONS}"
+BATCH_ANALYZE_SYSTEM = f"{SYSTEM_PREFIX}\n\n{BATCH_ANALYZE_INSTRUCTIONS}"
+FEEDBACK_SYSTEM = f"{SYSTEM_PREFIX}\n\n{FEEDBACK_INSTRUCTIONS}"
+
+
+# ==================== 每次请求的消息 ====================
+
+def analyze_messages(text: str) -> List[Dict[str, str]]:
+    """文本分析（analyze_text）"""
+    return [
+        {"role": "system", "content": ANALYZE_SYSTEM},
+        {"role": "user", "content": f"文本：\"{text}\""}
+    ]
+
+
+def analyze_batch_messages(texts: List[str]) -> List[Dict[str, str]]:
+    """批量文本分析：第 i 段文本的 id 为 i"""
+    items = [{"id": i, "text": text} for i, text in enumerate(texts)]
+    return [
+        {"role": "system", "content": BATCH_ANALYZE_SYSTEM},
+        {"role": "user", "content": json.dumps(items, ensure_ascii=False)}
+    ]
+
+
+def feedback_messages(feedback: str, current_params: Dict[str, Any]) -> List[Dict[str, str]]:
+    """反馈理解（understand_feedback）"""
+    speed = current_params.get("speed", 1.0)
+    emotion_tag = current_params.get("emotion_tag") or "无"
+    return [
+        {"role": "system", "content": FEEDBACK_SYSTEM},
+        {"role": "user", "content": f"当前参数：speed={speed}，emotion_tag={emotion_tag}\n用户反馈：\"{feedback}\""}
+    ]
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数（偏大）：非 ASCII 字符按 1 个，ASCII 按 4 个字符 1 个"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+# ==================== token 统计 ====================
+
+class TokenUsage:
+    """按提示词类型累计接口返回的 usage"""
+
+    def __init__(self):
+        self._kinds: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, usage: Optional[Dict[str, Any]]):
+        """记录一次调用的 usage（OpenAI 兼容格式）；没有 usage 时忽略"""
+        if not isinstance(usage, dict):
+            return
+        prompt = int(usage.get("prompt_tokens") or 0)
+        completion = int(usage.get("completion_tokens") or 0)
+        details = usage.get("prompt_tokens_details") or {}
+        cached = int(usage.get("cached_tokens") or details.get("cached_tokens") or 0)
+        entry = self._kinds.setdefault(kind, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0
+        })
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt
+        entry["completion_tokens"] += completion
+        entry["cached_tokens"] += cached
+        print(f"[TokenUsage] {kind}: prompt {prompt}（缓存 {cached}）, completion {completion}")
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for kind, entry in self._kinds.items():
+            calls = max(1, entry["calls"])
+            result[kind] = {
+                **entry,
+                "avg_prompt_tokens": round(entry["prompt_tokens"] / calls, 1),
+                "avg_completion_tokens": round(entry["completion_tokens"] / calls, 1)
+            }
+        return result
@@ -0,0 +1,320 @@
+"""
+参考音频预处理
+
+用户上传的参考音频在发送给 Fish Speech 前统一处理：
+高于 44.1kHz 的降采样（低采样率的不升采样）、混为单声道、去掉首尾静音、
+截断到最大时长，输出 16-bit PCM WAV。处理结果不比原文件小时仍发送原文件。
+处理结果存入 blob_store，按原始音频哈希记录对应关系，同一段音频只处理一次，
+之后每个版本都发送处理后的小文件。
+WAV 直接用 NumPy 处理；其他格式需要 pydub（和 ffmpeg），不可用时原样发送。
+
+会话有多段参考音频时，ReferenceFuser 按质量挑选并拼接为一段。
+两者都在线程池中调用，缓存表和计数在 _lock 内修改，解码和处理在锁外进行。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import hashlib
+import io
+import threading
+
+import numpy as np
+
+from wav_io import is_wav, read_wav, write_wav
+
+# Fish Speech 编码器的原生采样率
+TARGET_SAMPLE_RATE = 44100
+# 判定静音的帧长和阈值（相对峰值）
+SILENCE_FRAME_MS = 20
+SILENCE_THRESHOLD_DB = -40.0
+# 去静音后首尾保留的余量
+SILENCE_PADDING_MS = 100
+
+
+def _decode(data: bytes):
+    """解码为 (int16 数组 shape=(帧数, 声道数), 采样率)；无法解码时返回 None"""
+    if is_wav(data):
+        try:
+            return read_wav(data)
+        except ValueError as e:
+            print(f"[ReferenceAudio] WAV 解析失败，尝试 pydub: {e}")
+    try:
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(io.BytesIO(data)).set_sample_width(2)
+    except ImportError:
+        print("[ReferenceAudio] 未安装 pydub，非 WAV 参考音频原样发送")
+        return None
+    except Exception as e:
+        print(f"[ReferenceAudio] 解码失败，原样发送: {e}")
+        return None
+    samples = np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, segment.channels)
+    return samples, segment.frame_rate
+
+
+def _lowpass(signal: np.ndarray, cutoff: float, taps: int = 63) -> np.ndarray:
+    """加窗 sinc 低通（cutoff 为相对采样率的归一化频率，0~0.5）"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return np.convolve(signal, kernel / kernel.sum(), mode="same")
+
+
+def resample(signal: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """单声道 float 信号重采样（降采样前先低通防混叠）"""
+    if source_rate == target_rate or len(signal) == 0:
+        return signal
+    if target_rate < source_rate:
+        signal = _lowpass(signal, 0.5 * target_rate / source_rate)
+    duration = len(signal) / source_rate
+    target_len = max(1, int(round(duration * target_rate)))
+    positions = np.arange(target_len) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(signal)), signal)
+
+
+def trim_silence(signal: np.ndarray, sample_rate: int,
+                 threshold_db: float = SILENCE_THRESHOLD_DB) -> np.ndarray:
+    """去掉首尾低于 (峰值 + threshold_db) 的静音，两端保留少量余量"""
+    frame = max(1, sample_rate * SILENCE_FRAME_MS // 1000)
+    count = len(signal) // frame
+    if count == 0:
+        return signal
+    frames = signal[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    peak = rms.max()
+    if peak <= 0:
+        return signal
+    voiced = np.nonzero(rms >= peak * 10 ** (threshold_db / 20))[0]
+    padding = sample_rate * SILENCE_PADDING_MS // 1000
+    start = max(0, voiced[0] * frame - padding)
+    end = min(len(signal), (voiced[-1] + 1) * frame + padding)
+    return signal[start:end]
+
+
+def normalize_reference(data: bytes, max_seconds: float = 30.0,
+                        sample_rate: int = TARGET_SAMPLE_RATE) -> Optional[bytes]:
+    """
+    规范化参考音频，返回 16-bit 单声道 WAV
+    只在源采样率高于 sample_rate 时降采样，升采样只会让文件变大
+    无法解码时返回 None（调用方应原样使用输入）
+    """
+    decoded = _decode(data)
+    if decoded is None:
+        return None
+    samples, source_rate = decoded
+    signal = samples.astype(np.float32).mean(axis=1)
+    if source_rate > sample_rate:
+        signal = resample(signal, source_rate, sample_rate)
+    else:
+        sample_rate = source_rate
+    signal = trim_silence(signal, sample_rate)
+    if max_seconds > 0:
+        signal = signal[:int(max_seconds * sample_rate)]
+    return write_wav(np.clip(np.rint(signal), -32768, 32767).astype(np.int16), sample_rate)
+
+
+class ReferenceNormalizer:
+    """参考音频规范化，结果按原始音频哈希缓存在 blob_store 中"""
+
+    def __init__(self, blob_store, max_seconds: float = 30.0,
+                 max_entries: int = 1024, enabled: bool = True):
+        self.blob_store = blob_store
+        self.max_seconds = max_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._normalized: "OrderedDict[str, str]" = OrderedDict()  # 原始哈希 -> 规范化后哈希
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def normalize(self, audio_hash: str) -> str:
+        """返回规范化后音频的哈希（首次调用时处理并写入 blob_store）"""
+        if not self.enabled:
+            return audio_hash
+        with self._lock:
+            cached = self._normalized.get(audio_hash)
+        if cached is not None and self.blob_store.exists(cached):
+            with self._lock:
+                if audio_hash in self._normalized:
+                    self._normalized.move_to_end(audio_hash)
+            return cached
+
+        original = self.blob_store.read(audio_hash)
+        output = normalize_reference(original, self.max_seconds)
+        if output is None or len(output) >= len(original):
+            # 无法解码，或处理后没有变小（如已压缩的 MP3）：原样发送
+            result = audio_hash
+        else:
+            result = self.blob_store.put_bytes(output)
+            print(f"[ReferenceAudio] 规范化 {audio_hash[:12]}: {len(original)} -> {len(output)} bytes")
+        with self._lock:
+            if result == audio_hash:
+                self.passthrough += 1
+            else:
+                self.processed += 1
+                self.bytes_in += len(original)
+                self.bytes_out += len(output)
+            self._normalized[audio_hash] = result
+            self._normalized.move_to_end(audio_hash)
+            while len(self._normalized) > self.max_entries:
+                self._normalized.popitem(last=False)
+        return result
+
+    def load(self, audio_hash: str) -> bytes:
+        """读取规范化后的参考音频"""
+        return self.blob_store.read(self.normalize(audio_hash))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._normalized)
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "processed": self.processed,
+            "passthrough": self.passthrough,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "max_seconds": self.max_seconds
+        }
+
+
+# ==================== 多段参考音频融合 ====================
+
+# 融合时相邻片段之间插入的静音
+FUSION_GAP_MS = 250
+
+
+def reference_quality(signal: np.ndarray, sample_rate: int) -> float:
+    """
+    参考音频质量评分（越高越好）：信噪比估计、有效时长、语音占比，
+    削波严重时扣分。signal 为单声道 float（int16 量程）
+    """
+    frame = max(1, sample_rate * SILENCE_FRAME_MS // 1000)
+    count = len(signal) // frame
+    if count == 0:
+        return 0.0
+    rms = np.sqrt(np.mean(signal[:count * frame].reshape(count, frame) ** 2, axis=1))
+    peak = rms.max()
+    if peak <= 0:
+        return 0.0
+    voiced_ratio = float(np.mean(rms >= peak * 10 ** (SILENCE_THRESHOLD_DB / 20)))
+    noise = np.percentile(rms, 10) + 1.0
+    snr_db = 20 * np.log10(np.percentile(rms, 90) / noise)
+    clipped = float(np.mean(np.abs(signal) >= 32000))
+    duration = len(signal) / sample_rate
+    return float(0.5 * min(max(snr_db, 0.0), 60.0) / 60.0
+            + 0.3 * min(duration, 10.0) / 10.0
+            + 0.2 * voiced_ratio
+            - 5.0 * clipped)
+
+
+class ReferenceFuser:
+    """
+    把会话的多段参考音频融合为一段：按质量评分取前 top_n 段，
+    依次拼接（中间插入短静音）并截断到最大时长。
+    结果按参考音频集合缓存，集合不变时不重复计算。
+    """
+
+    def __init__(self, normalizer: ReferenceNormalizer, top_n: int = 3,
+                 max_seconds: float = 30.0, max_entries: int = 1024):
+        self.normalizer = normalizer
+        self.blob_store = normalizer.blob_store
+        self.top_n = top_n
+        self.max_seconds = max_seconds
+        self.max_entries = max_entries
+        self._quality: "OrderedDict[str, float]" = OrderedDict()  # 规范化后哈希 -> 评分
+        self._fused: "OrderedDict[str, str]" = OrderedDict()     # 集合指纹 -> 融合结果哈希
+        self._lock = threading.Lock()
+        self.fusions = 0
+        self.cache_hits = 0
+
+    def fingerprint(self, audio_hashes: List[str]) -> str:
+        """参考音频集合的指纹（单段时就是该段的哈希）"""
+        if len(audio_hashes) == 1:
+            return audio_hashes[0]
+        payload = f"top{self.top_n}:" + ",".join(audio_hashes)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _decode(self, norm_hash: str):
+        try:
+            samples, sample_rate = read_wav(self.blob_store.read(norm_hash))
+        except ValueError:
+            return None
+        return samples.astype(np.float32).mean(axis=1), sample_rate
+
+    def quality(self, norm_hash: str) -> float:
+        """单段（规范化后）参考音频的质量评分；无法解析的音频为 -1"""
+        with self._lock:
+            score = self._quality.get(norm_hash)
+        if score is None:
+            decoded = self._decode(norm_hash)
+            score = reference_quality(*decoded) if decoded else -1.0
+            self._remember(self._quality, norm_hash, score)
+        return score
+
+    def fuse(self, audio_hashes: List[str]) -> str:
+        """返回发送给 Fish Speech 的参考音频哈希（单段时为规范化结果）"""
+        normalized = [self.normalizer.normalize(h) for h in audio_hashes]
+        if len(normalized) == 1:
+            return normalized[0]
+        key = self.fingerprint(audio_hashes)
+        with self._lock:
+            cached = self._fused.get(key)
+        if cached is not None and self.blob_store.exists(cached):
+            with self._lock:
+                if key in self._fused:
+                    self._fused.move_to_end(key)
+                self.cache_hits += 1
+            return cached
+
+        ranked = sorted(dict.fromkeys(normalized), key=self.quality, reverse=True)
+        selected = [h for h in ranked if self.quality(h) >= 0][:max(1, self.top_n)]
+        if len(selected) <= 1:
+            result = selected[0] if selected else normalized[0]
+        else:
+            result = self.blob_store.put_bytes(self._concat(selected))
+            with self._lock:
+                self.fusions += 1
+            print(f"[ReferenceAudio] 融合 {len(selected)}/{len(audio_hashes)} 段参考音频 -> {result[:12]}")
+        self._remember(self._fused, key, result)
+        return result
+
+    def _concat(self, norm_hashes: List[str]) -> bytes:
+        parts = []
+        sample_rate = None
+        limit = None
+        total = 0
+        for norm_hash in norm_hashes:
+            signal, rate = self._decode(norm_hash)
+            if sample_rate is None:
+                sample_rate = rate
+                limit = int(self.max_seconds * rate) if self.max_seconds > 0 else None
+                gap = np.zeros(rate * FUSION_GAP_MS // 1000, dtype=np.float32)
+            signal = resample(signal, rate, sample_rate)
+            if parts:
+                parts.append(gap)
+                total += len(gap)
+            parts.append(signal)
+            total += len(signal)
+            if limit is not None and total >= limit:
+                break
+        fused = np.concatenate(parts)
+        if limit is not None:
+            fused = fused[:limit]
+        return write_wav(np.clip(np.rint(fused), -32768, 32767).astype(np.int16), sample_rate)
+
+    def _remember(self, table: OrderedDict, key: str, value):
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fused_sets = len(self._fused)
+        return {
+            "top_n": self.top_n,
+            "fused_sets": fused_sets,
+            "fusions": self.fusions,
+            "cache_hits": self.cache_hits
+        }
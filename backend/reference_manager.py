@@ -0,0 +1,123 @@
+"""
+Fish Speech 参考音频注册
+
+每段参考音频（按内容哈希）只通过 /v1/references/add 上传一次，
+之后合成时只发送 reference_id，不再每个版本都带上完整的 base64 音频。
+- 配置了多个 Fish Speech 后端时，在每个后端上都注册，全部成功才使用 id
+- 上游不支持注册接口（404/405）时标记为不支持，之后一律内联发送
+- 合成时上游报告 reference_id 不存在（例如服务重启），调用方调用
+  forget() 并改为内联音频重试，下次再重新注册
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import httpx
+
+from singleflight import SingleFlight
+
+
+class ReferenceManager:
+    """内容哈希 -> 上游 reference_id"""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], httpx.AsyncClient],
+        base_urls: List[str],
+        enabled: bool = True,
+        id_prefix: str = "va_",
+        timeout: float = 30.0
+    ):
+        self.client_factory = client_factory
+        self.base_urls = base_urls
+        self.enabled = enabled
+        self.id_prefix = id_prefix
+        self.timeout = timeout
+        self.supported: Optional[bool] = None  # None 表示尚未探测
+        self._registered: Dict[str, str] = {}
+        self._flight = SingleFlight()
+        self.registrations = 0
+        self.failures = 0
+        self.reused = 0
+        self.forgotten = 0
+
+    def reference_id(self, content_hash: str) -> str:
+        """由内容哈希得到确定的 reference_id（多个 worker 得到同一个 id）"""
+        return f"{self.id_prefix}{content_hash[:32]}"
+
+    async def ensure(self, content_hash: str, load_audio: Callable[[], bytes]) -> Optional[str]:
+        """返回已注册的 reference_id；首次调用时上传，失败或不支持时返回 None"""
+        if not self.enabled or self.supported is False:
+            return None
+        ref_id = self._registered.get(content_hash)
+        if ref_id is not None:
+            self.reused += 1
+            return ref_id
+        return await self._flight.do(content_hash, lambda: self._register(content_hash, load_audio))
+
+    async def _register(self, content_hash: str, load_audio: Callable[[], bytes]) -> Optional[str]:
+        ref_id = self.reference_id(content_hash)
+        try:
+            # 读取（可能还要规范化/融合）在线程池中执行，不阻塞事件循环
+            audio = await asyncio.to_thread(load_audio)
+        except KeyError as e:
+            self.failures += 1
+            print(f"[ReferenceManager] 注册失败，本次内联发送: {e}")
+            return None
+        results = await asyncio.gather(*(self._register_on(url, ref_id, audio) for url in self.base_urls))
+        if all(results):
+            self.supported = True
+            self._registered[content_hash] = ref_id
+            self.registrations += 1
+            print(f"[ReferenceManager] 已注册参考音频: {ref_id}")
+            return ref_id
+        return None
+
+    async def _register_on(self, base_url: str, ref_id: str, audio: bytes) -> bool:
+        """在单个后端上注册，成功（或已存在）返回 True"""
+        try:
+            response = await self.client_factory().post(
+                f"{base_url}/v1/references/add",
+                data={"id": ref_id, "text": ""},
+                files={"audio": ("reference.wav", audio, "audio/wav")},
+                timeout=self.timeout
+            )
+        except httpx.HTTPError as e:
+            self.failures += 1
+            print(f"[ReferenceManager] {base_url} 注册失败，本次内联发送: {e}")
+            return False
+
+        body = response.text.lower()
+        if response.status_code in (200, 409) or "already exist" in body:
+            # 409 / already exists: 其他 worker 或上次运行已注册过相同内容
+            return True
+        if response.status_code in (404, 405):
+            # 任一后端不支持时都无法按 id 合成（请求可能被路由到该后端）
+            self.supported = False
+            print(f"[ReferenceManager] {base_url} 不支持 /v1/references/add，改为内联发送参考音频")
+            return False
+        self.failures += 1
+        print(f"[ReferenceManager] {base_url} 注册失败 HTTP {response.status_code}: {response.text[:200]}")
+        return False
+
+    @staticmethod
+    def is_missing_reference(status_code: int, body: str) -> bool:
+        """合成请求的错误是否因为上游找不到 reference_id"""
+        return status_code in (400, 404, 422, 500) and "reference" in body.lower()
+
+    def forget(self, ref_id: str):
+        """上游已丢失该 reference_id，下次重新注册"""
+        for content_hash, registered in list(self._registered.items()):
+            if registered == ref_id:
+                del self._registered[content_hash]
+                self.forgotten += 1
+                print(f"[ReferenceManager] 上游已丢失 {ref_id}，回退为内联音频")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "supported": self.supported,
+            "registered": len(self._registered),
+            "registrations": self.registrations,
+            "reused": self.reused,
+            "failures": self.failures,
+            "forgotten": self.forgotten
+        }
@@ -0,0 +1,421 @@
+"""
+会话存储
+
+SessionStore 定义会话存储接口（与 dict 兼容：in / [] / len），路由修改
+会话后调用 save() 写回。提供两种实现：
+- MemorySessionStore：进程内 LRU 表，只适合单 worker
+- SQLiteSessionStore：会话序列化为 JSON 存入 SQLite，多个本地 worker
+  共享同一个数据库文件；会话内存中的音频按内容哈希单独存放，相同音频只存一份
+
+两种实现都支持空闲超时（TTL）、最大会话数和会话音频内存预算，
+超出时按最近最少使用（LRU）顺序淘汰，正在写入的会话不会被淘汰。
+referenced_blobs() 返回仍被会话引用的参考音频哈希，blob_store 淘汰时跳过。
+会话对象需实现 session_id、reference_audios、memory_bytes()，
+SQLite 实现还需要 to_dict() / audio_blobs() 以及反序列化函数。
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def content_hash(data: bytes) -> str:
+    """音频内容哈希（SHA-256）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class SessionStore(ABC):
+    """会话存储接口"""
+
+    def __init__(self, idle_ttl: float, max_sessions: int, max_audio_bytes: int):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_audio_bytes = max_audio_bytes
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_count = 0
+        self.evicted_memory = 0
+
+    # ---- 子类实现 ----
+
+    @abstractmethod
+    def load(self, session_id: str):
+        """读取会话，不存在时返回 None"""
+
+    @abstractmethod
+    def save(self, session):
+        """写回（或新建）会话"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """删除会话（不存在时忽略）"""
+
+    @abstractmethod
+    def usage(self) -> List[Tuple[str, int]]:
+        """各会话的音频内存占用 [(session_id, bytes)]"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """当前会话数"""
+
+    @abstractmethod
+    def referenced_blobs(self) -> Set[str]:
+        """所有会话引用的参考音频哈希（reference_audios）"""
+
+    # ---- dict 兼容接口 ----
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.load(session_id) is not None
+
+    def __getitem__(self, session_id: str):
+        session = self.load(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        return session
+
+    def __setitem__(self, session_id: str, session):
+        session.session_id = session_id
+        self.created += 1
+        self.save(session)
+
+    def get(self, session_id: str, default=None):
+        session = self.load(session_id)
+        return default if session is None else session
+
+    async def aget(self, session_id: str, default=None):
+        """路由中读取会话（涉及磁盘 I/O 的实现在线程池中执行）"""
+        return self.get(session_id, default)
+
+    def add_reference_audio(self, session, audio_ref: str):
+        """为会话追加参考音频（blob_store 中的哈希）并写回"""
+        session.reference_audios.append(audio_ref)
+        self.save(session)
+
+    # ---- 统计 ----
+
+    def stats(self, top: int = 5) -> Dict[str, Any]:
+        """总量统计，附带内存占用最大的 top 个会话"""
+        usage = sorted(self.usage(), key=lambda item: item[1], reverse=True)
+        return {
+            "backend": type(self).__name__,
+            "sessions": len(usage),
+            "memory_bytes": sum(size for _, size in usage),
+            "largest": [{"session_id": sid, "memory_bytes": size} for sid, size in usage[:top]],
+            "max_sessions": self.max_sessions,
+            "max_audio_bytes": self.max_audio_bytes,
+            "idle_ttl": self.idle_ttl,
+            "created": self.created,
+            "evicted_idle": self.evicted_idle,
+            "evicted_count": self.evicted_count,
+            "evicted_memory": self.evicted_memory
+        }
+
+
+class MemorySessionStore(SessionStore):
+    """进程内 LRU 会话表"""
+
+    def __init__(
+        self,
+        idle_ttl: float = 3600.0,
+        max_sessions: int = 1000,
+        max_audio_bytes: int = 512 * 1024 * 1024,
+        sweep_interval: float = 30.0
+    ):
+        super().__init__(idle_ttl, max_sessions, max_audio_bytes)
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._last_sweep = 0.0
+
+    def load(self, session_id: str):
+        self._maybe_sweep()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._touch(session_id)
+        return session
+
+    def save(self, session):
+        self._sessions[session.session_id] = session
+        self._touch(session.session_id)
+        self.enforce_limits(protect=session.session_id)
+
+    def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._last_access.pop(session_id, None)
+
+    def usage(self) -> List[Tuple[str, int]]:
+        return [(sid, s.memory_bytes()) for sid, s in self._sessions.items()]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def referenced_blobs(self) -> Set[str]:
+        return {h for s in list(self._sessions.values()) for h in s.reference_audios}
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.sweep()
+
+    def sweep(self) -> int:
+        """淘汰空闲超时的会话，返回淘汰数量"""
+        deadline = time.monotonic() - self.idle_ttl
+        expired = [sid for sid, ts in self._last_access.items() if ts < deadline]
+        for sid in expired:
+            self.delete(sid)
+        self.evicted_idle += len(expired)
+        if expired:
+            print(f"[SessionStore] 淘汰 {len(expired)} 个空闲会话")
+        return len(expired)
+
+    def enforce_limits(self, protect: Optional[str] = None):
+        """按 LRU 淘汰，直到会话数和音频内存都在上限内（protect 指定的会话不淘汰）"""
+        self._maybe_sweep()
+        while len(self._sessions) > self.max_sessions:
+            victim = next((sid for sid in self._sessions if sid != protect), None)
+            if victim is None:
+                break
+            self.delete(victim)
+            self.evicted_count += 1
+        total = sum(size for _, size in self.usage())
+        for sid in list(self._sessions):
+            if total <= self.max_audio_bytes:
+                break
+            if sid == protect:
+                continue
+            total -= self._sessions[sid].memory_bytes()
+            self.delete(sid)
+            self.evicted_memory += 1
+            print(f"[SessionStore] 内存超出预算，淘汰会话: {sid}")
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite 会话存储（多个 worker 共享一个数据库文件）
+    loader(data, load_audio) 把 to_dict() 的结果还原为会话对象。
+    每个 worker 缓存最近读取的会话对象，数据库中的版本号未变时直接复用。
+    读取时的访问时间先记在内存中，每 access_flush_interval 秒批量写回，
+    不必每次读取都提交一次事务。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        loader: Callable[[Dict[str, Any], Callable[[str], bytes]], Any],
+        idle_ttl: float = 3600.0,
+        max_sessions: int = 1000,
+        max_audio_bytes: int = 512 * 1024 * 1024,
+        local_cache_size: int = 64,
+        access_flush_interval: float = 5.0
+    ):
+        super().__init__(idle_ttl, max_sessions, max_audio_bytes)
+        self.db_path = db_path
+        self.access_flush_interval = access_flush_interval
+        self._pending_access: Dict[str, float] = {}  # session_id -> 尚未写回的访问时间
+        self._last_flush = time.time()
+        self.loader = loader
+        self.local_cache_size = local_cache_size
+        # session_id -> (rev, 会话对象)
+        self._local: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.db_loads = 0
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10.0)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, rev TEXT NOT NULL, "
+                "accessed_at REAL NOT NULL, memory_bytes INTEGER NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS session_audio ("
+                "session_id TEXT NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (session_id, hash))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS session_audio_hash ON session_audio (hash)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS audio_blobs (hash TEXT PRIMARY KEY, data BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def _load_audio(self, audio_hash: str) -> bytes:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM audio_blobs WHERE hash = ?", (audio_hash,)).fetchone()
+        if row is None:
+            raise KeyError(f"音频不存在: {audio_hash}")
+        return bytes(row[0])
+
+    async def aget(self, session_id: str, default=None):
+        return await asyncio.to_thread(self.get, session_id, default)
+
+    def load(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT rev, accessed_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            accessed_at = max(row[1], self._pending_access.get(session_id, 0.0)) if row else 0.0
+            if row is None or accessed_at < now - self.idle_ttl:
+                self._local.pop(session_id, None)
+                self._pending_access.pop(session_id, None)
+                return None
+            self._pending_access[session_id] = now
+            if now - self._last_flush >= self.access_flush_interval:
+                self._flush_access()
+                self._db.commit()
+            rev = row[0]
+            cached = self._local.get(session_id)
+            if cached is not None and cached[0] == rev:
+                self._local.move_to_end(session_id)
+                self.local_hits += 1
+                return cached[1]
+
+        with self._lock:
+            data_row = self._db.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if data_row is None:
+            return None
+        try:
+            session = self.loader(json.loads(data_row[0]), self._load_audio)
+        except (KeyError, ValueError) as e:
+            print(f"[SessionStore] 会话 {session_id} 读取失败: {e}")
+            return None
+        self.db_loads += 1
+        self._remember(session_id, rev, session)
+        return session
+
+    def save(self, session):
+        session_id = session.session_id
+        blobs = session.audio_blobs()
+        rev = os.urandom(8).hex()
+        with self._lock:
+            self._pending_access.pop(session_id, None)
+            self._db.executemany(
+                "INSERT OR IGNORE INTO audio_blobs (hash, data) VALUES (?, ?)",
+                [(h, sqlite3.Binary(b)) for h, b in blobs.items()]
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, rev, accessed_at, memory_bytes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session_id, json.dumps(session.to_dict(), ensure_ascii=False), rev,
+                 time.time(), session.memory_bytes())
+            )
+            self._db.execute("DELETE FROM session_audio WHERE session_id = ?", (session_id,))
+            self._db.executemany(
+                "INSERT INTO session_audio (session_id, hash) VALUES (?, ?)",
+                [(session_id, h) for h in blobs]
+            )
+            # 淘汰按访问时间排序，先写回内存中的访问时间
+            self._flush_access()
+            self._enforce_limits(protect=session_id)
+            self._db.commit()
+        self._remember(session_id, rev, session)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._delete(session_id)
+            self._collect_blobs()
+            self._db.commit()
+
+    def usage(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            return [(r[0], r[1]) for r in self._db.execute("SELECT id, memory_bytes FROM sessions")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def referenced_blobs(self) -> Set[str]:
+        # 包含其他 worker 写入的会话；已过期但尚未清理的会话也算引用
+        with self._lock:
+            return {r[0] for r in self._db.execute(
+                "SELECT DISTINCT value FROM sessions, json_each(sessions.data, '$.reference_audios')"
+            )}
+
+    def _remember(self, session_id: str, rev: str, session):
+        with self._lock:
+            self._local[session_id] = (rev, session)
+            self._local.move_to_end(session_id)
+            while len(self._local) > self.local_cache_size:
+                self._local.popitem(last=False)
+
+    def _flush_access(self):
+        """批量写回访问时间（调用方持有锁并负责提交）"""
+        if self._pending_access:
+            self._db.executemany(
+                "UPDATE sessions SET accessed_at = ? WHERE id = ?",
+                [(ts, sid) for sid, ts in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+        self._last_flush = time.time()
+
+    def _delete(self, session_id: str):
+        """删除会话行（调用方持有锁）"""
+        self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self._db.execute("DELETE FROM session_audio WHERE session_id = ?", (session_id,))
+        self._local.pop(session_id, None)
+        self._pending_access.pop(session_id, None)
+
+    def _collect_blobs(self):
+        """删除不再被任何会话引用的音频（调用方持有锁）"""
+        self._db.execute(
+            "DELETE FROM audio_blobs WHERE hash NOT IN (SELECT hash FROM session_audio)"
+        )
+
+    def _enforce_limits(self, protect: str):
+        """淘汰过期会话，再按 LRU 淘汰到数量和内存上限内（调用方持有锁）"""
+        expired = [r[0] for r in self._db.execute(
+            "SELECT id FROM sessions WHERE accessed_at < ? AND id != ?",
+            (time.time() - self.idle_ttl, protect)
+        )]
+        for sid in expired:
+            self._delete(sid)
+        self.evicted_idle += len(expired)
+
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(memory_bytes), 0) FROM sessions"
+        ).fetchone()
+        if count > self.max_sessions or total > self.max_audio_bytes:
+            rows = self._db.execute(
+                "SELECT id, memory_bytes FROM sessions WHERE id != ? ORDER BY accessed_at", (protect,)
+            ).fetchall()
+            for sid, size in rows:
+                if count > self.max_sessions:
+                    self.evicted_count += 1
+                elif total > self.max_audio_bytes:
+                    self.evicted_memory += 1
+                    print(f"[SessionStore] 内存超出预算，淘汰会话: {sid}")
+                else:
+                    break
+                self._delete(sid)
+                count -= 1
+                total -= size
+        self._collect_blobs()
+
+    def stats(self, top: int = 5) -> Dict[str, Any]:
+        result = super().stats(top)
+        with self._lock:
+            blob_count, blob_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM audio_blobs"
+            ).fetchone()
+        result.update({
+            "db_path": self.db_path,
+            "audio_blobs": blob_count,
+            "audio_blob_bytes": blob_bytes,
+            "local_hits": self.local_hits,
+            "db_loads": self.db_loads
+        })
+        return result
@@ -0,0 +1,50 @@
+"""
+相同 key 的并发请求合并（single-flight）
+
+同一 key 同时只执行一次，其余调用方等待同一个结果（或同一个异常）。
+实际工作在独立的 Task 中运行，个别调用方被取消不会影响其他等待方。
+"""
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+
+
+class SingleFlight:
+    """按 key 合并进行中的协程调用"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 fn()；若相同 key 已在执行中，则等待其结果"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # 所有等待方都已离开时，避免 "exception was never retrieved" 警告
+            task.exception()
+
+    def __contains__(self, key: str) -> bool:
+        """该 key 是否正在执行"""
+        return key in self._inflight
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }
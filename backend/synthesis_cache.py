@@ -0,0 +1,155 @@
+"""
+合成结果缓存（内容寻址）
+
+以规范化后的最终文本、音色/参考音频指纹、采样温度和后处理参数
+计算 key。内存层为按字节数淘汰的 LRU，磁盘层位于 outputs/cache/，
+同样按总大小淘汰最久未使用的文件。命中时完全跳过 Fish Speech 调用。
+"""
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+import hashlib
+import json
+import os
+
+
+class SynthesisCache:
+    """两级（内存 + 磁盘）合成结果缓存"""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        enabled: bool = True
+    ):
+        self.cache_dir = cache_dir
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> 文件大小，按最近使用排序
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.enabled:
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(**fields: Any) -> str:
+        """由合成参数计算内容寻址 key"""
+        payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def _load_disk_index(self):
+        """启动时扫描磁盘缓存目录，按 mtime 恢复 LRU 顺序"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".wav"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def __contains__(self, key: str) -> bool:
+        """是否已缓存（不计入命中统计）"""
+        return self.enabled and (key in self._memory or key in self._disk)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """查询缓存；磁盘命中会提升到内存层"""
+        if not self.enabled:
+            return None
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return data
+        if key in self._disk:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                self._drop_disk(key)
+            else:
+                self._disk.move_to_end(key)
+                self._put_memory(key, data)
+                self.disk_hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        """写入内存层和磁盘层"""
+        if not self.enabled or not data:
+            return
+        self._put_memory(key, data)
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            return
+        if len(data) > self.disk_max_bytes:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"[SynthesisCache] 写入磁盘缓存失败: {e}")
+            return
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def _put_memory(self, key: str, data: bytes):
+        if len(data) > self.memory_max_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _drop_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_max_bytes and self._disk:
+            key = next(iter(self._disk))
+            self._drop_disk(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,60 @@
+"""
+长文本分句
+
+按中英文句末标点切分，再把过短的句子合并、过长的句子按逗号或
+字数切开，得到长度相近的片段，供并行合成使用。
+"""
+from typing import List
+import re
+
+# 句末标点（中文 。！？；…，英文 .!?; 后需跟空白或结尾），以及换行
+_SENTENCE_END = re.compile(r'(?<=[。！？；…!?;])|(?<=\.)(?=\s|$)|\n+')
+# 句内可断开的位置
+_CLAUSE_END = re.compile(r'(?<=[，、：,:])')
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """超长句先按逗号切，仍然过长则按字数硬切"""
+    parts: List[str] = []
+    current = ""
+    for clause in _CLAUSE_END.split(sentence):
+        if not clause:
+            continue
+        if current and len(current) + len(clause) > max_chars:
+            parts.append(current)
+            current = ""
+        current += clause
+        while len(current) > max_chars:
+            parts.append(current[:max_chars])
+            current = current[max_chars:]
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_sentences(text: str, max_chars: int = 120, min_chars: int = 20) -> List[str]:
+    """
+    切分文本
+    max_chars: 单个片段最大字数
+    min_chars: 短于该长度的句子与后一句合并
+    """
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip() if sentence else ""
+        if not sentence:
+            continue
+        if len(sentence) > max_chars:
+            sentences.extend(p.strip() for p in _split_long(sentence, max_chars) if p.strip())
+        else:
+            sentences.append(sentence)
+
+    segments: List[str] = []
+    for sentence in sentences:
+        if segments and (len(segments[-1]) < min_chars or len(sentence) < min_chars) \
+                and len(segments[-1]) + len(sentence) + 1 <= max_chars:
+            # 英文句子之间保留空格，中文直接拼接
+            sep = " " if segments[-1][-1].isascii() and sentence[0].isascii() else ""
+            segments[-1] = segments[-1] + sep + sentence
+        else:
+            segments.append(sentence)
+    return segments
@@ -0,0 +1,156 @@
+"""
+WSOLA 时间伸缩（变速不变调）
+
+直接在 int16 PCM 上处理，不启动子进程、不经过 pydub/ffmpeg。
+每一帧在名义位置附近的容差窗口内，用 FFT 互相关寻找与上一帧
+自然延续最相似的片段，再以 Hann 窗重叠相加，从而保持音高。
+
+TimeStretcher 支持增量输入（流式），time_stretch() 为一次性处理。
+"""
+from typing import Optional
+import numpy as np
+
+from wav_io import read_wav, write_wav
+
+FRAME_MS = 30.0      # 帧长
+TOLERANCE_MS = 10.0  # 相似度搜索容差
+
+
+def _next_pow2(n: int) -> int:
+    return 1 << (n - 1).bit_length()
+
+
+class TimeStretcher:
+    """
+    增量式 WSOLA
+    speed: 1.0=原速, >1=加快, <1=减慢（音高不变）
+    """
+
+    def __init__(self, speed: float, sample_rate: int, channels: int = 1):
+        if speed <= 0:
+            raise ValueError("speed 必须大于 0")
+        self.speed = float(speed)
+        self.channels = channels
+        self.frame = max(64, int(sample_rate * FRAME_MS / 1000) // 2 * 2)
+        self.hop_out = self.frame // 2
+        self.hop_in = self.hop_out * self.speed
+        self.tolerance = max(1, int(sample_rate * TOLERANCE_MS / 1000))
+        # 周期 Hann 窗，50% 重叠时窗函数之和恒为 1
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.frame) / self.frame)).astype(np.float32)
+        self._fft_size = _next_pow2(self.frame + 2 * self.tolerance + self.frame)
+
+        self._in = np.zeros((0, channels), dtype=np.float32)
+        self._in_offset = 0          # self._in[0] 对应的输入绝对位置
+        self._in_total = 0           # 已接收的输入帧数
+        self._out = np.zeros((0, channels), dtype=np.float32)
+        self._wsum = np.zeros(0, dtype=np.float32)  # 各输出位置的窗函数累加和
+        self._out_offset = 0         # self._out[0] 对应的输出绝对位置
+        self._k = 0                  # 下一帧序号
+        self._prev_pos: Optional[int] = None
+        self._emitted = 0
+        self._finished = False
+
+    def _input(self, start: int, length: int) -> np.ndarray:
+        """取输入片段（绝对位置），超出已接收范围的部分补零"""
+        rel = start - self._in_offset
+        seg = self._in[max(rel, 0):max(rel + length, 0)]
+        if rel < 0:
+            seg = np.concatenate([np.zeros((min(-rel, length), self.channels), dtype=np.float32), seg])
+        if len(seg) < length:
+            seg = np.concatenate([seg, np.zeros((length - len(seg), self.channels), dtype=np.float32)])
+        return seg
+
+    def _best_position(self, nominal: int) -> int:
+        """在 [nominal - tolerance, nominal + tolerance] 内寻找最佳帧起点"""
+        if self._prev_pos is None:
+            return max(nominal, 0)
+        lo = max(nominal - self.tolerance, 0)
+        hi = nominal + self.tolerance
+        template = self._input(self._prev_pos + self.hop_out, self.frame).mean(axis=1)
+        search = self._input(lo, hi - lo + self.frame).mean(axis=1)
+        n = self._fft_size
+        corr = np.fft.irfft(np.fft.rfft(search, n) * np.conj(np.fft.rfft(template, n)), n)
+        return lo + int(np.argmax(corr[:hi - lo + 1]))
+
+    def _run(self, final: bool):
+        """处理所有输入已就绪的帧"""
+        while True:
+            nominal = int(round(self._k * self.hop_in))
+            if final:
+                if nominal >= self._in_total:
+                    break
+            else:
+                need = max(nominal + self.tolerance, (self._prev_pos or 0) + self.hop_out) + self.frame
+                if need > self._in_total:
+                    break
+            pos = self._best_position(nominal)
+            frame = self._input(pos, self.frame) * self.window[:, None]
+
+            start = self._k * self.hop_out - self._out_offset
+            if start + self.frame > len(self._out):
+                grow = start + self.frame - len(self._out)
+                self._out = np.concatenate([self._out, np.zeros((grow, self.channels), dtype=np.float32)])
+                self._wsum = np.concatenate([self._wsum, np.zeros(grow, dtype=np.float32)])
+            self._out[start:start + self.frame] += frame
+            self._wsum[start:start + self.frame] += self.window
+            self._prev_pos = pos
+            self._k += 1
+
+            # 丢弃之后不会再用到的输入
+            keep_from = min(self._prev_pos + self.hop_out, int(round(self._k * self.hop_in)) - self.tolerance)
+            drop = keep_from - self._in_offset
+            if drop > 0:
+                self._in = self._in[drop:]
+                self._in_offset += drop
+
+    def _take(self, upto: int) -> np.ndarray:
+        """取出输出中 [已输出位置, upto) 的部分"""
+        count = max(0, min(upto, self._out_offset + len(self._out)) - self._emitted)
+        rel = self._emitted - self._out_offset
+        chunk = self._out[rel:rel + count]
+        wsum = self._wsum[rel:rel + count, None]
+        # 首尾只有单个窗覆盖，按窗函数和归一化避免淡入淡出
+        chunk = np.where(wsum > 0.1, chunk / np.maximum(wsum, 0.1), chunk)
+        self._emitted += count
+        drop = self._emitted - self._out_offset
+        self._out = self._out[drop:]
+        self._wsum = self._wsum[drop:]
+        self._out_offset += drop
+        return np.clip(np.rint(chunk), -32768, 32767).astype(np.int16)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """输入 int16 PCM（shape=(帧数, 声道数)），返回已可确定的输出"""
+        if self._finished:
+            raise RuntimeError("TimeStretcher 已结束")
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        if len(samples):
+            self._in = np.concatenate([self._in, samples.astype(np.float32)])
+            self._in_total += len(samples)
+        self._run(final=False)
+        # 第 k 帧之前的输出不会再被后续帧叠加
+        return self._take(self._k * self.hop_out)
+
+    def flush(self) -> np.ndarray:
+        """输入结束，输出剩余部分（总长度约为 输入长度 / speed）"""
+        self._finished = True
+        self._run(final=True)
+        return self._take(int(round(self._in_total / self.speed)))
+
+
+def time_stretch(samples: np.ndarray, speed: float, sample_rate: int) -> np.ndarray:
+    """一次性时间伸缩 int16 PCM，保持音高"""
+    if speed == 1.0 or len(samples) == 0:
+        return samples
+    channels = samples.shape[1] if samples.ndim == 2 else 1
+    stretcher = TimeStretcher(speed, sample_rate, channels)
+    head = stretcher.process(samples)
+    tail = stretcher.flush()
+    out = np.concatenate([head, tail])
+    return out if samples.ndim == 2 else out[:, 0]
+
+
+def stretch_wav(audio_bytes: bytes, speed: float) -> bytes:
+    """调整 WAV 语速（变速不变调），返回 16-bit PCM WAV"""
+    samples, sample_rate = read_wav(audio_bytes)
+    return write_wav(time_stretch(samples, speed, sample_rate), sample_rate)
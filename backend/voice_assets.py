@@ -0,0 +1,141 @@
+"""
+预设音色参考音频缓存
+
+启动时（或首次使用时）读取 assets/voices/*.wav 并预先编码为 base64，
+合成时直接复用，避免每次请求都读盘、编码。
+音频文件或 voice_config.json 的 mtime 变化时自动失效重载。
+"""
+from typing import Optional, Dict, Any, Callable, List
+import base64
+import hashlib
+import os
+import threading
+import time
+
+
+class VoiceAsset:
+    """单个预设音色的参考音频（已编码）"""
+
+    def __init__(self, voice_id: str, path: str, data: bytes, mtime: float):
+        self.voice_id = voice_id
+        self.path = path
+        self.mtime = mtime
+        self.size = len(data)
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        self.audio_base64 = base64.b64encode(data).decode('utf-8')
+        self.checked_at = time.monotonic()
+
+
+class VoiceAssetCache:
+    """预设音色缓存 - 配置与参考音频均按 mtime 失效"""
+
+    def __init__(
+        self,
+        config_path: str,
+        loader: Callable[[], Dict[str, Any]],
+        search_dirs: List[str],
+        check_interval: float = 2.0
+    ):
+        """
+        config_path: voice_config.json 路径
+        loader: 解析配置的函数（返回 voice_id -> 配置）
+        search_dirs: 解析 reference_audio 相对路径时依次尝试的根目录
+        check_interval: 两次 stat 检查之间的最小间隔（秒）
+        """
+        self.config_path = config_path
+        self.loader = loader
+        self.search_dirs = search_dirs
+        self.check_interval = check_interval
+        self._voices: Dict[str, Any] = {}
+        self._config_mtime: Optional[float] = None
+        self._config_checked_at = 0.0
+        self._assets: Dict[str, VoiceAsset] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def voices(self) -> Dict[str, Any]:
+        """当前音色配置；voice_config.json 变化时重新加载并清空音频缓存"""
+        now = time.monotonic()
+        if self._config_mtime is not None and now - self._config_checked_at < self.check_interval:
+            return self._voices
+        with self._lock:
+            self._config_checked_at = now
+            mtime = self._mtime(self.config_path)
+            if self._config_mtime is None or mtime != self._config_mtime:
+                if self._config_mtime is not None:
+                    print(f"[VoiceAssetCache] voice_config.json 已变化，重新加载")
+                self._voices = self.loader()
+                self._config_mtime = mtime if mtime is not None else 0.0
+                self._assets.clear()
+        return self._voices
+
+    def resolve_path(self, ref_audio_path: str) -> Optional[str]:
+        """在候选目录中查找参考音频的实际路径"""
+        if os.path.isabs(ref_audio_path):
+            return ref_audio_path if os.path.exists(ref_audio_path) else None
+        for root in self.search_dirs:
+            path = os.path.join(root, ref_audio_path)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, voice_id: str) -> Optional[VoiceAsset]:
+        """获取音色的参考音频；未配置或文件不存在时返回 None"""
+        voice_config = self.voices().get(voice_id, {})
+        ref_audio_path = voice_config.get("reference_audio")
+        if not ref_audio_path:
+            return None
+
+        asset = self._assets.get(voice_id)
+        now = time.monotonic()
+        if asset is not None:
+            if now - asset.checked_at < self.check_interval:
+                self.hits += 1
+                return asset
+            if self._mtime(asset.path) == asset.mtime:
+                asset.checked_at = now
+                self.hits += 1
+                return asset
+            print(f"[VoiceAssetCache] 参考音频已变化，重新加载: {voice_id}")
+
+        self.misses += 1
+        path = self.resolve_path(ref_audio_path)
+        if not path:
+            print(f"[VoiceAssetCache] 未找到参考音频: {ref_audio_path}，尝试目录: {self.search_dirs}")
+            self._assets.pop(voice_id, None)
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        asset = VoiceAsset(voice_id, path, data, self._mtime(path) or 0.0)
+        with self._lock:
+            self._assets[voice_id] = asset
+        return asset
+
+    def preload(self) -> int:
+        """预加载全部音色，返回成功加载的数量"""
+        loaded = 0
+        for voice_id in list(self.voices().keys()):
+            try:
+                if self.get(voice_id):
+                    loaded += 1
+            except Exception as e:
+                print(f"[VoiceAssetCache] 预加载 {voice_id} 失败: {e}")
+        print(f"[VoiceAssetCache] 预加载完成: {loaded} 个音色")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "voices": len(self._voices),
+            "cached": len(self._assets),
+            "cached_bytes": sum(a.size for a in self._assets.values()),
+            "hits": self.hits,
+            "misses": self.misses
+        }
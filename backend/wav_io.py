@@ -0,0 +1,166 @@
+"""
+WAV 读写工具（纯 Python + NumPy，不依赖 ffmpeg）
+
+只处理 PCM WAV（Fish Speech 的输出格式）。解析时容忍流式输出中
+长度字段不准确的文件头（data 块长度为 0 或 0xFFFFFFFF）。
+"""
+from typing import List, Tuple
+import struct
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def is_wav(data: bytes) -> bool:
+    """是否为 RIFF/WAVE 文件"""
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def parse_header(data: bytes) -> Tuple[int, int, int, int]:
+    """
+    解析 WAV 文件头
+    返回 (channels, sample_rate, sample_width, data_offset)
+    """
+    if not is_wav(data):
+        raise ValueError("不是 WAV 文件")
+    pos = 12
+    fmt = None
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            if body + 16 > len(data):
+                raise ValueError("WAV 文件头不完整")
+            format_tag, channels, sample_rate = struct.unpack("<HHI", data[body:body + 8])
+            sample_width = struct.unpack("<H", data[body + 14:body + 16])[0] // 8
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                format_tag = struct.unpack("<H", data[body + 24:body + 26])[0]
+            if format_tag != WAVE_FORMAT_PCM:
+                raise ValueError(f"不支持的 WAV 编码: {format_tag}")
+            if sample_width not in _DTYPES:
+                raise ValueError(f"不支持的采样位宽: {sample_width * 8} bit")
+            fmt = (channels, sample_rate, sample_width)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV 缺少 fmt 块")
+            return fmt[0], fmt[1], fmt[2], body
+        pos = body + chunk_size + (chunk_size & 1)
+    raise ValueError("WAV 缺少 data 块")
+
+
+def read_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    读取 PCM WAV，返回 (int16 数组 shape=(帧数, 声道数), 采样率)
+    data 块长度字段不可信时读取到文件末尾
+    """
+    channels, sample_rate, sample_width, offset = parse_header(data)
+    data_size = struct.unpack("<I", data[offset - 4:offset])[0]
+    end = len(data) if data_size in (0, 0xFFFFFFFF) else min(len(data), offset + data_size)
+    frame_bytes = channels * sample_width
+    end -= (end - offset) % frame_bytes
+    samples = np.frombuffer(data[offset:end], dtype=_DTYPES[sample_width])
+    if sample_width == 1:
+        samples = ((samples.astype(np.int16) - 128) << 8)
+    elif sample_width == 4:
+        samples = (samples >> 16).astype(np.int16)
+    return samples.reshape(-1, channels), sample_rate
+
+
+def wav_header(sample_rate: int, channels: int, num_frames: int) -> bytes:
+    """16-bit PCM WAV 文件头"""
+    data_size = num_frames * channels * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, WAVE_FORMAT_PCM, channels, sample_rate,
+        sample_rate * channels * 2, channels * 2, 16,
+        b"data", data_size
+    )
+
+
+def write_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """将 int16 数组（shape=(帧数,) 或 (帧数, 声道数)）编码为 WAV"""
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    samples = np.ascontiguousarray(samples, dtype=np.int16)
+    return wav_header(sample_rate, samples.shape[1], samples.shape[0]) + samples.tobytes()
+
+
+def wav_duration(data: bytes) -> float:
+    """WAV 时长（秒），只解析文件头"""
+    channels, sample_rate, sample_width, offset = parse_header(data)
+    data_size = struct.unpack("<I", data[offset - 4:offset])[0]
+    if data_size in (0, 0xFFFFFFFF):
+        data_size = len(data) - offset
+    return min(data_size, len(data) - offset) / float(channels * sample_width * sample_rate)
+
+
+def streaming_wav_header(sample_rate: int, channels: int) -> bytes:
+    """长度未知时使用的 16-bit PCM WAV 文件头（长度字段填最大值）"""
+    header = bytearray(wav_header(sample_rate, channels, 0))
+    header[4:8] = struct.pack("<I", 0xFFFFFFFF)
+    header[40:44] = struct.pack("<I", 0xFFFFFFFF)
+    return bytes(header)
+
+
+class WavStreamReader:
+    """增量解析流式 WAV：先缓冲到文件头完整，之后逐块返回 int16 PCM"""
+
+    def __init__(self):
+        self._buffer = b""
+        self.channels = 0
+        self.sample_rate = 0
+        self.sample_width = 0
+        self.header_ready = False
+
+    def feed(self, chunk: bytes) -> np.ndarray:
+        """输入一块字节，返回其中完整的采样帧（shape=(帧数, 声道数)）"""
+        self._buffer += chunk
+        if not self.header_ready:
+            try:
+                self.channels, self.sample_rate, self.sample_width, offset = parse_header(self._buffer)
+            except ValueError:
+                # 文件头还不完整（超过 64KB 仍无法解析则认为不是 WAV）
+                if len(self._buffer) > 65536 or (len(self._buffer) >= 12 and not is_wav(self._buffer)):
+                    raise
+                return np.zeros((0, 1), dtype=np.int16)
+            self._buffer = self._buffer[offset:]
+            self.header_ready = True
+        frame_bytes = self.channels * self.sample_width
+        usable = len(self._buffer) - len(self._buffer) % frame_bytes
+        raw, self._buffer = self._buffer[:usable], self._buffer[usable:]
+        samples = np.frombuffer(raw, dtype=_DTYPES[self.sample_width])
+        if self.sample_width == 1:
+            samples = ((samples.astype(np.int16) - 128) << 8)
+        elif self.sample_width == 4:
+            samples = (samples >> 16).astype(np.int16)
+        return samples.reshape(-1, self.channels)
+
+
+def concat_wavs(wavs: List[bytes], crossfade_ms: float = 20.0) -> bytes:
+    """拼接多段 WAV（采样率、声道数需一致），相邻段之间做等功率交叉淡化"""
+    if len(wavs) == 1:
+        return wavs[0]
+    parts = [read_wav(w) for w in wavs]
+    sample_rate = parts[0][1]
+    channels = parts[0][0].shape[1]
+    if any(sr != sample_rate or pcm.shape[1] != channels for pcm, sr in parts):
+        raise ValueError("各段音频的采样率或声道数不一致")
+
+    fade = int(sample_rate * crossfade_ms / 1000)
+    out = parts[0][0].astype(np.float32)
+    for pcm, _ in parts[1:]:
+        pcm = pcm.astype(np.float32)
+        n = min(fade, len(out), len(pcm))
+        if n:
+            # 按实际重叠长度生成曲线（段比淡化时长短时也保持 cos² + sin² = 1）
+            t = np.linspace(0.0, np.pi / 2, n, dtype=np.float32)[:, None]
+            overlap = out[-n:] * np.cos(t) + pcm[:n] * np.sin(t)
+            out = np.concatenate([out[:-n], overlap, pcm[n:]])
+        else:
+            out = np.concatenate([out, pcm])
+    return write_wav(np.clip(np.rint(out), -32768, 32767).astype(np.int16), sample_rate)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+提示词大小基准测试：旧版内联提示词 vs prompts.py 模板
+
+用法（在 scripts 目录下）:
+    python bench_prompt_size.py [--live]
+
+默认只做离线统计：字符数和估计 token 数，以及新模板中可被服务端缓存的
+固定前缀和每次请求新增的部分。加 --live 且设置了 KIMI_API_KEY 时，
+每种提示词实际调用一次 Kimi，打印接口返回的 usage。
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from emotion_tags import render_catalogue  # noqa: E402
+from prompts import (  # noqa: E402
+    ANALYZE_SYSTEM, FEEDBACK_SYSTEM, SYSTEM_PREFIX,
+    analyze_messages, estimate_tokens, feedback_messages
+)
+
+SAMPLE_TEXT = "今天终于拿到了录取通知书，我太开心了！"
+SAMPLE_FEEDBACK = "语气再温柔一点，稍微慢一些"
+SAMPLE_PARAMS = {"speed": 1.0, "emotion_tag": "<|happy|>"}
+
+
+def legacy_analyze_prompt(text: str) -> str:
+    """旧版 analyze_text 提示词（整段作为 user 消息）"""
+    return f"""分析以下文本，确定最佳语音合成参数。
+
+【Fish Speech 支持的情感标记】（必须从这些中选择，不要自己造词）
+{render_catalogue()}
+
+【重要提示】
+- 情感标记必须从上面的列表中精确选择，格式为 "(标签名)"
+- 不要自己创造新的情感标签
+- 如果不确定，使用 "(neutral)" 或留空
+
+【语速调整】
+- 1.0 = 正常语速
+- > 1.0 = 加快（如 1.2）
+- < 1.0 = 减慢（如 0.8）
+
+文本："{text}"
+
+请分析：
+1. 场景/场合
+2. 最适合的情感标记（必须从上面列表精确选择，只返回标签名，如 <|happy|>、<|angry|>、<|sad|>、<|excited|>、<|calm|>、<|surprised|>）
+3. 推荐语速（1.0正常, >1加快, <1减慢）
+4. 选择理由
+
+输出JSON：
+{{
+    "scene": "场景",
+    "emotion": "<|happy|>",
+    "speed": 1.0,
+    "reason": "详细分析理由"
+}}
+
+重要：emotion 字段必须只包含情感标签，如 "<|sad|>"，不要包含任何中文或emoji。"""
+
+
+def legacy_feedback_prompt(feedback: str, current_params: dict) -> str:
+    """旧版 understand_feedback 提示词（整段作为 user 消息）"""
+    return f"""分析用户反馈，确定语音合成参数调整方案。
+
+【当前参数】
+- 语速(speed): {current_params.get('speed', 1.0)}
+- 情感标签(emotion_tag): {current_params.get('emotion_tag', '无')}
+
+【Fish Speech 支持的情感标记】（必须从这些中选择，不要自己造词）
+{render_catalogue()}
+
+【可用调整工具】
+1. adjust_emotion: 调整情感标签
+   - 必须从上面的【Fish Speech 支持的情感标记】列表中选择
+   - 格式为 "(标签名)"，如 "(happy)", "(serious)"
+   - 不要自己创造新的情感标签
+
+2. adjust_speed: 调整语速（音频后处理）
+   - 范围: 0.5-2.0, 1.0为正常
+   - 注意: 这是独立的后处理步骤，不是TTS参数
+
+【重要提示】
+- 情感标签必须从上面的列表中精确选择
+- 不要自己造词，如果列表中没有合适的，选择最接近的
+- 如果不确定，可以不调整情感标签
+
+【用户反馈】
+"{feedback}"
+
+请分析：
+1. 用户反馈的具体含义
+2. 需要调用哪些调整工具
+3. 每个工具的具体参数（情感标签必须从列表中选择）
+4. 调整理由
+
+输出JSON格式：
+{{
+    "adjustments": {{
+        "speed": 1.0,
+        "emotion_tag": "<|happy|>"
+    }},
+    "analysis": "详细分析过程...",
+    "function_calls": [
+        {{"function": "adjust_emotion", "params": {{"tag": "<|happy|>"}}, "reason": "..."}},
+        {{"function": "adjust_speed", "params": {{"speed": 0.9}}, "reason": "..."}}
+    ],
+    "tips": ["提示1", "提示2"]
+}}
+
+重要：emotion_tag 字段必须只包含情感标签，如 "<|sad|>"，不要包含任何中文或emoji。"""
+
+
+def messages_text(messages) -> str:
+    return "".join(m["content"] for m in messages)
+
+
+def offline():
+    cases = [
+        ("analyze", [{"role": "user", "content": legacy_analyze_prompt(SAMPLE_TEXT)}],
+         analyze_messages(SAMPLE_TEXT), ANALYZE_SYSTEM),
+        ("feedback", [{"role": "user", "content": legacy_feedback_prompt(SAMPLE_FEEDBACK, SAMPLE_PARAMS)}],
+         feedback_messages(SAMPLE_FEEDBACK, SAMPLE_PARAMS), FEEDBACK_SYSTEM),
+    ]
+    print(f"公共前缀: {len(SYSTEM_PREFIX)} 字符, 约 {estimate_tokens(SYSTEM_PREFIX)} token\n")
+    print(f"{'提示词':<10}{'旧版字符':>9}{'旧版token':>10}{'新版字符':>9}{'新版token':>10}{'可缓存token':>12}{'每次新增token':>14}")
+    for name, old, new, system in cases:
+        old_text, new_text = messages_text(old), messages_text(new)
+        cacheable = estimate_tokens(system)
+        print(
+            f"{name:<10}{len(old_text):>9}{estimate_tokens(old_text):>10}"
+            f"{len(new_text):>9}{estimate_tokens(new_text):>10}"
+            f"{cacheable:>12}{estimate_tokens(new_text) - cacheable:>14}"
+        )
+    print("\n（token 为粗略估计，实际数量以 --live 的 usage 为准）")
+    return cases
+
+
+def live(cases):
+    import httpx
+
+    api_key = os.getenv("KIMI_API_KEY", "")
+    if not api_key:
+        print("\n⚠️  未设置 KIMI_API_KEY，跳过 --live")
+        return
+    print(f"\n{'提示词':<10}{'版本':<6}{'prompt':>8}{'cached':>8}{'completion':>12}")
+    with httpx.Client(timeout=60.0) as client:
+        for name, old, new, _ in cases:
+            for label, messages in (("旧版", old), ("新版", new)):
+                response = client.post(
+                    "https://api.moonshot.cn/v1/chat/completions",
+                    headers={"Authorization": f"Bearer {api_key}"},
+                    json={"model": "moonshot-v1-8k", "messages": messages, "temperature": 0.3}
+                )
+                if response.status_code != 200:
+                    print(f"{name:<10}{label:<6} HTTP {response.status_code}: {response.text[:100]}")
+                    continue
+                usage = response.json().get("usage") or {}
+                cached = usage.get("cached_tokens") or (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+                print(f"{name:<10}{label:<6}{usage.get('prompt_tokens', 0):>8}{cached:>8}{usage.get('completion_tokens', 0):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="实际调用 Kimi，打印 usage")
+    args = parser.parse_args()
+    cases = offline()
+    if args.live:
+        live(cases)
+
+
+if __name__ == "__main__":
+    main()
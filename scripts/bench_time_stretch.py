@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+语速调整基准测试：旧版 pydub/ffmpeg 路径 vs NumPy WSOLA
+
+用法（在 scripts 目录下）:
+    python bench_time_stretch.py [--speeds 0.8,1.2,1.5] [--repeat 5]
+
+样本取自 backend/outputs/ 和 assets/voices/。assets/voices/*.wav 实际是
+edge-tts 生成的 MP3 内容，需要 pydub + ffmpeg 才能解码。
+旧版路径每次调用都要探测 ffmpeg，没有 ffmpeg 时旧版直接放弃调速，
+因此未安装 ffmpeg 时不测试旧版（否则旧版耗时不含 ffmpeg 开销，对比失真）。
+"""
+import shutil
+import argparse
+import glob
+import io
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from time_stretch import stretch_wav  # noqa: E402
+from wav_io import is_wav, read_wav, write_wav  # noqa: E402
+
+
+def legacy_adjust_speed(audio_bytes: bytes, speed: float) -> bytes:
+    """旧版实现：每次探测 ffmpeg，改帧率后重采样（音高随语速变化）"""
+    from pydub import AudioSegment
+    subprocess.run(['ffmpeg', '-version'], capture_output=True, timeout=5)
+    audio = AudioSegment.from_wav(io.BytesIO(audio_bytes))
+    audio = audio._spawn(audio.raw_data, overrides={'frame_rate': int(audio.frame_rate * speed)})
+    audio = audio.set_frame_rate(24000)
+    output = io.BytesIO()
+    audio.export(output, format="wav")
+    return output.getvalue()
+
+
+def load_samples():
+    """读取样本，统一转为 PCM WAV"""
+    paths = sorted(glob.glob(os.path.join(ROOT, "backend", "outputs", "*.wav")))
+    paths += sorted(glob.glob(os.path.join(ROOT, "assets", "voices", "*.wav")))
+    samples = []
+    skipped = []
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not is_wav(data):
+            try:
+                from pydub import AudioSegment
+                segment = AudioSegment.from_file(io.BytesIO(data))
+                buf = io.BytesIO()
+                segment.export(buf, format="wav")
+                data = buf.getvalue()
+            except Exception as e:
+                skipped.append(os.path.basename(path))
+                print(f"⏭️  跳过 {os.path.basename(path)}（非 PCM WAV，解码失败: {type(e).__name__}）")
+                continue
+        samples.append((os.path.basename(path), data))
+    if skipped:
+        print(f"⚠️  {len(skipped)} 个样本（MP3 内容）未能解码，需要安装 ffmpeg；结果不包含这些样本\n")
+    return samples
+
+
+def dominant_freq(wav_bytes: bytes) -> float:
+    """主频估计，用于对比音高是否保持"""
+    pcm, sr = read_wav(wav_bytes)
+    x = pcm.mean(axis=1).astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(x * np.hanning(len(x))))
+    lo = int(60 * len(x) / sr)  # 忽略 60Hz 以下
+    return (lo + int(np.argmax(spectrum[lo:]))) * sr / len(x)
+
+
+def duration(wav_bytes: bytes) -> float:
+    pcm, sr = read_wav(wav_bytes)
+    return len(pcm) / sr
+
+
+def bench(fn, data: bytes, speed: float, repeat: int):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(data, speed)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speeds", default="0.8,1.2,1.5")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    speeds = [float(s) for s in args.speeds.split(",")]
+
+    samples = load_samples()
+    if not samples:
+        print("❌ 没有可用样本")
+        sys.exit(1)
+
+    has_legacy = False
+    if shutil.which("ffmpeg") is None:
+        print("⚠️  未安装 ffmpeg：旧版路径此时直接放弃调速，无法公平对比耗时，只测试 WSOLA\n")
+    else:
+        try:
+            legacy_adjust_speed(write_wav(np.zeros(2400, dtype=np.int16), 24000), 1.2)
+            has_legacy = True
+        except Exception as e:
+            print(f"⚠️  旧版路径不可用（{type(e).__name__}: {e}），只测试 WSOLA\n")
+
+    print(f"{'样本':<28}{'speed':>6}{'原时长':>8}{'旧版ms':>9}{'WSOLA ms':>10}{'旧版时长':>9}{'WSOLA时长':>10}{'原主频':>8}{'旧版主频':>9}{'WSOLA主频':>10}")
+    for name, data in samples:
+        f0 = dominant_freq(data)
+        for speed in speeds:
+            new_ms, new_out = bench(stretch_wav, data, speed, args.repeat)
+            if has_legacy:
+                old_ms, old_out = bench(legacy_adjust_speed, data, speed, args.repeat)
+                old_cols = f"{old_ms:>9.1f}", f"{duration(old_out):>9.2f}", f"{dominant_freq(old_out):>9.0f}"
+            else:
+                old_cols = f"{'-':>9}", f"{'-':>9}", f"{'-':>9}"
+            print(
+                f"{name[:27]:<28}{speed:>6.2f}{duration(data):>8.2f}{old_cols[0]}{new_ms:>10.1f}"
+                f"{old_cols[1]}{duration(new_out):>10.2f}{f0:>8.0f}{old_cols[2]}{dominant_freq(new_out):>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
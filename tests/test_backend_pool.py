@@ -0,0 +1,72 @@
+"""BackendPool 每个后端的并发上限"""
+import asyncio
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from backend_pool import BackendPool  # noqa: E402
+
+URLS = ["http://a", "http://b"]
+
+
+def make_pool(delays, max_inflight=1):
+    """delays: host -> 响应耗时；返回 (pool, 每个后端的最大并发)"""
+    current = {host: 0 for host in delays}
+    peak = dict(current)
+
+    async def handler(request):
+        host = request.url.host
+        current[host] += 1
+        peak[host] = max(peak[host], current[host])
+        try:
+            await asyncio.sleep(delays[host])
+        finally:
+            current[host] -= 1
+        return httpx.Response(200, content=host.encode())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pool = BackendPool(URLS, lambda: client, health_interval=0, max_inflight=max_inflight)
+    return pool, peak
+
+
+def test_limit_is_per_backend():
+    async def main():
+        pool, peak = make_pool({"a": 0.02, "b": 0.02})
+        responses = await asyncio.gather(*(pool.request("POST", "/v1/tts") for _ in range(6)))
+        assert all(r.status_code == 200 for r in responses)
+        return pool, peak
+
+    pool, peak = asyncio.run(main())
+    assert peak == {"a": 1, "b": 1}
+    assert pool.stats()["inflight"] == 0 and pool.waiting == 0
+
+
+def test_hedge_uses_free_slot_on_other_backend():
+    async def main():
+        pool, peak = make_pool({"a": 0.1, "b": 0.1})
+        response = await pool.request("POST", "/v1/tts", hedge_after=0.01)
+        assert response.status_code == 200
+        return pool, peak
+
+    pool, peak = asyncio.run(main())
+    assert pool.hedges == 1
+    assert peak == {"a": 1, "b": 1}
+    assert pool.stats()["inflight"] == 0
+
+
+def test_no_hedge_when_other_backends_are_full():
+    async def main():
+        pool, peak = make_pool({"a": 0.1, "b": 0.1})
+        responses = await asyncio.gather(
+            *(pool.request("POST", "/v1/tts", hedge_after=0.01) for _ in range(2))
+        )
+        assert all(r.status_code == 200 for r in responses)
+        return pool, peak
+
+    pool, peak = asyncio.run(main())
+    assert pool.hedges == 0
+    assert peak == {"a": 1, "b": 1}
+    assert pool.stats()["inflight"] == 0
@@ -0,0 +1,43 @@
+"""BlobStore 索引与淘汰"""
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from blob_store import BlobStore  # noqa: E402
+
+
+def test_eviction_skips_referenced(tmp_path):
+    store = BlobStore(str(tmp_path), max_total_bytes=250)
+    first = store.put_bytes(b"a" * 100)
+    store.referenced = lambda: {first}
+    second = store.put_bytes(b"b" * 100)
+    third = store.put_bytes(b"c" * 100)
+    assert store.exists(first) and store.exists(third)
+    assert not store.exists(second)
+    assert store.stats()["bytes"] == 200
+
+
+def test_concurrent_reads_and_writes_keep_accounting(tmp_path):
+    store = BlobStore(str(tmp_path), max_total_bytes=10 ** 9, referenced=set)
+    hashes = [store.put_bytes(bytes([i]) * 64) for i in range(8)]
+
+    def reader():
+        for _ in range(200):
+            for h in hashes:
+                store.read(h)
+
+    def writer(offset):
+        for i in range(50):
+            store.put_bytes(bytes([offset, i]) * 32)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    threads += [threading.Thread(target=writer, args=(100 + n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = store.stats()
+    assert stats["blobs"] == 8 + 4 * 50
+    assert stats["bytes"] == 8 * 64 + 4 * 50 * 64
@@ -0,0 +1,89 @@
+"""合成任务队列"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from job_queue import JobQueue, QueueFull  # noqa: E402
+
+
+def test_round_robin_between_clients():
+    async def main():
+        queue = JobQueue(concurrency=1)
+        order = []
+        gate = asyncio.Event()
+
+        def task(name):
+            async def fn():
+                order.append(name)
+                await gate.wait()
+            return fn
+
+        # 执行槽被占用时 a 先提交 3 个任务，b 后提交 2 个：执行顺序应交替
+        jobs = [queue.submit("x", task("x"))]
+        jobs += [queue.submit("a", task(f"a{i}")) for i in range(3)]
+        jobs += [queue.submit("b", task(f"b{i}")) for i in range(2)]
+        gate.set()
+        while any(job.status in ("queued", "running") for job in jobs):
+            await asyncio.sleep(0.01)
+        return order
+
+    assert asyncio.run(main()) == ["x", "a0", "b0", "a1", "b1", "a2"]
+
+
+def test_concurrency_limit():
+    async def main():
+        queue = JobQueue(concurrency=2)
+        running = peak = 0
+
+        async def fn():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return "ok"
+
+        results = await asyncio.gather(*(queue.run(f"c{i}", fn) for i in range(6)))
+        return results, peak, queue.stats()
+
+    results, peak, stats = asyncio.run(main())
+    assert results == ["ok"] * 6
+    assert peak == 2
+    assert stats["running"] == 0 and stats["completed"] == 6
+
+
+def test_queue_full():
+    async def main():
+        queue = JobQueue(concurrency=1, max_queued=3, max_per_client=2)
+        queue.enqueue("a")  # 立即开始执行
+        queue.enqueue("a")
+        queue.enqueue("a")
+        with pytest.raises(QueueFull) as per_client:
+            queue.enqueue("a")
+        queue.enqueue("b")
+        with pytest.raises(QueueFull) as total:
+            queue.enqueue("c")
+        return per_client.value, total.value, queue.stats()
+
+    per_client, total, stats = asyncio.run(main())
+    assert per_client.retry_after >= 1.0 and total.retry_after >= 1.0
+    assert stats["rejected"] == 2
+
+
+def test_run_reraises_errors():
+    async def main():
+        queue = JobQueue(concurrency=1)
+
+        async def fn():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await queue.run("a", fn)
+        return queue.stats()
+
+    stats = asyncio.run(main())
+    assert stats["failed"] == 1 and stats["running"] == 0
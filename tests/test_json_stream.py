@@ -0,0 +1,56 @@
+"""增量 JSON 解析"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from json_stream import IncrementalJSONParser  # noqa: E402
+
+REPLY = {
+    "adjustments": {"speed": 0.9, "emotion_tag": "<|sad|>"},
+    "analysis": "语气要更低沉，带 \"引号\" 和 {括号}",
+    "function_calls": [{"function": "adjust_speed", "params": {"speed": 0.9}}],
+    "tips": ["提示1"]
+}
+
+
+def feed_all(parser: IncrementalJSONParser, text: str, size: int):
+    completed = []
+    for i in range(0, len(text), size):
+        completed.extend(parser.feed(text[i:i + size]))
+    return completed
+
+
+def test_fields_complete_in_order():
+    text = json.dumps(REPLY, ensure_ascii=False)
+    parser = IncrementalJSONParser()
+    assert feed_all(parser, text, 3) == list(REPLY)
+    assert parser.done
+    assert parser.result() == REPLY
+
+
+def test_first_field_available_before_end():
+    text = json.dumps(REPLY, ensure_ascii=False)
+    cut = text.index('"analysis"')
+    parser = IncrementalJSONParser()
+    assert parser.feed(text[:cut]) == ["adjustments"]
+    assert parser.fields["adjustments"] == REPLY["adjustments"]
+    assert parser.result() is None
+
+
+def test_fenced_reply():
+    text = "```json\n" + json.dumps(REPLY, ensure_ascii=False, indent=2) + "\n```\n多余的内容 {}"
+    parser = IncrementalJSONParser()
+    for size in (1, 7, len(text)):
+        parser = IncrementalJSONParser()
+        feed_all(parser, text, size)
+        assert parser.result() == REPLY
+
+
+def test_truncated_stream_keeps_completed_fields():
+    text = json.dumps(REPLY, ensure_ascii=False)
+    parser = IncrementalJSONParser()
+    parser.feed(text[:text.index('"tips"') + 5])
+    assert not parser.done
+    assert set(parser.fields) == {"adjustments", "analysis", "function_calls"}
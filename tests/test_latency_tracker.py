@@ -0,0 +1,45 @@
+"""LatencyTracker 自适应超时"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from latency_tracker import LatencyTracker  # noqa: E402
+
+DEFAULT, MINIMUM, MULTIPLIER = 60.0, 0.5, 2.0
+
+
+def simulate(tracker: LatencyTracker, latency: float, requests: int, units: float = 20):
+    """按自适应超时发出 requests 次耗时为 latency 的请求，返回成功次数"""
+    succeeded = 0
+    for _ in range(requests):
+        timeout = tracker.timeout(units, DEFAULT, MINIMUM, MULTIPLIER)
+        if latency > timeout:
+            tracker.record_timeout(timeout, units)
+        else:
+            tracker.record(latency, units)
+            succeeded += 1
+    return succeeded
+
+
+def test_timeout_follows_p99():
+    tracker = LatencyTracker()
+    simulate(tracker, 1.0, 100)
+    assert tracker.timeout(20, DEFAULT, MINIMUM, MULTIPLIER) == 2.0
+
+
+def test_timeout_adapts_after_slowdown():
+    tracker = LatencyTracker()
+    simulate(tracker, 1.0, 100)
+    # 后端整体变慢到 5 秒：前几次超时后超时时间放宽，之后的请求都能完成
+    succeeded = simulate(tracker, 5.0, 50)
+    assert tracker.timeouts <= 5
+    assert succeeded == 50 - tracker.timeouts
+    assert tracker.timeout(20, DEFAULT, MINIMUM, MULTIPLIER) >= 5.0
+
+
+def test_timeout_capped_by_default():
+    tracker = LatencyTracker()
+    simulate(tracker, 1.0, 100)
+    simulate(tracker, 500.0, 50)
+    assert tracker.timeout(20, DEFAULT, MINIMUM, MULTIPLIER) == DEFAULT
@@ -0,0 +1,57 @@
+"""参考音频规范化"""
+import os
+import sys
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from blob_store import BlobStore  # noqa: E402
+from reference_audio import ReferenceNormalizer, normalize_reference  # noqa: E402
+from wav_io import read_wav, write_wav  # noqa: E402
+
+
+def tone(sample_rate: int, seconds: float = 1.0, channels: int = 1) -> bytes:
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    signal = (8000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    return write_wav(np.repeat(signal[:, None], channels, axis=1), sample_rate)
+
+
+def test_downsamples_high_rate():
+    samples, rate = read_wav(normalize_reference(tone(48000)))
+    assert rate == 44100
+    assert samples.shape == (44100, 1)
+
+
+def test_keeps_low_rate():
+    _, rate = read_wav(normalize_reference(tone(16000)))
+    assert rate == 16000
+
+
+def test_keeps_original_when_not_smaller(tmp_path):
+    store = BlobStore(str(tmp_path))
+    normalizer = ReferenceNormalizer(store)
+    mono = store.put_bytes(tone(16000))
+    stereo = store.put_bytes(tone(16000, channels=2))
+    assert normalizer.normalize(mono) == mono
+    assert normalizer.normalize(stereo) != stereo
+    assert normalizer.passthrough == 1 and normalizer.processed == 1
+
+
+def test_concurrent_normalize(tmp_path):
+    store = BlobStore(str(tmp_path))
+    normalizer = ReferenceNormalizer(store, max_entries=4)
+    hashes = [store.put_bytes(tone(48000 + 100 * i, seconds=0.1)) for i in range(8)]
+
+    def worker():
+        for _ in range(5):
+            for h in hashes:
+                normalizer.normalize(h)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert normalizer.stats()["entries"] == 4
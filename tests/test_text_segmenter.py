@@ -0,0 +1,35 @@
+"""长文本分句"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from text_segmenter import split_sentences  # noqa: E402
+
+
+def test_short_text_single_segment():
+    assert split_sentences("你好。") == ["你好。"]
+
+
+def test_splits_on_sentence_end_and_merges_short():
+    text = "今天天气很好，我们去公园散步吧。" * 3 + "好！" + "明天可能会下雨，记得带伞出门。"
+    segments = split_sentences(text, max_chars=40, min_chars=10)
+    assert "".join(segments) == text
+    assert all(len(s) <= 40 for s in segments)
+    # 过短的 "好！" 与相邻句子合并
+    assert "好！" not in segments
+
+
+def test_long_sentence_split_by_clause_then_chars():
+    text = "，".join(["这是一个很长的分句"] * 10) + "。"
+    segments = split_sentences(text, max_chars=30)
+    assert all(len(s) <= 30 for s in segments)
+    assert "".join(segments) == text
+    assert split_sentences("字" * 70, max_chars=30) == ["字" * 30, "字" * 30, "字" * 10]
+
+
+def test_english_sentences_keep_spaces():
+    text = "Hello there. This is a test of the splitter. Short. Another sentence follows here."
+    segments = split_sentences(text, max_chars=50, min_chars=10)
+    assert " ".join(segments) == text
+    assert all(len(s) <= 50 for s in segments)
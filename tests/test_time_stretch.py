@@ -0,0 +1,51 @@
+"""WSOLA 变速不变调"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from time_stretch import TimeStretcher, time_stretch  # noqa: E402
+
+SAMPLE_RATE = 24000
+
+
+def tone(seconds: float, freq: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * freq * t) * 32767).astype(np.int16)
+
+
+def dominant_freq(samples: np.ndarray) -> float:
+    x = samples.astype(np.float64)
+    spectrum = np.abs(np.fft.rfft(x * np.hanning(len(x))))
+    return int(np.argmax(spectrum)) * SAMPLE_RATE / len(x)
+
+
+def test_output_length_follows_speed():
+    samples = tone(2.0)
+    for speed in (0.8, 1.2, 1.5):
+        out = time_stretch(samples, speed, SAMPLE_RATE)
+        assert abs(len(out) - len(samples) / speed) <= 1
+
+
+def test_pitch_preserved():
+    samples = tone(2.0, freq=220.0)
+    for speed in (0.8, 1.5):
+        out = time_stretch(samples, speed, SAMPLE_RATE)
+        assert abs(dominant_freq(out) - 220.0) < 5.0
+
+
+def test_speed_one_is_passthrough():
+    samples = tone(0.5)
+    assert time_stretch(samples, 1.0, SAMPLE_RATE) is samples
+
+
+def test_streaming_matches_one_shot():
+    samples = tone(2.0)
+    one_shot = time_stretch(samples, 1.25, SAMPLE_RATE)
+    stretcher = TimeStretcher(1.25, SAMPLE_RATE, 1)
+    chunks = [stretcher.process(samples[i:i + 1000]) for i in range(0, len(samples), 1000)]
+    chunks.append(stretcher.flush())
+    streamed = np.concatenate(chunks)[:, 0]
+    assert np.array_equal(streamed, one_shot)
@@ -0,0 +1,31 @@
+"""WAV 拼接"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from wav_io import concat_wavs, read_wav, write_wav  # noqa: E402
+
+SAMPLE_RATE = 24000
+
+
+def constant(frames: int, value: int = 10000) -> bytes:
+    return write_wav(np.full(frames, value, dtype=np.int16), SAMPLE_RATE)
+
+
+def test_concat_length():
+    fade = int(SAMPLE_RATE * 0.02)
+    out, _ = read_wav(concat_wavs([constant(2400), constant(2400)], crossfade_ms=20))
+    assert len(out) == 4800 - fade
+
+
+def test_short_segment_crossfade_is_equal_power():
+    # 第二段比淡化时长短：重叠部分两个增益仍来自同一条曲线
+    short = 100
+    out, _ = read_wav(concat_wavs([constant(2400), constant(short)], crossfade_ms=20))
+    overlap = out[-short:, 0].astype(np.float64) / 10000
+    t = np.linspace(0.0, np.pi / 2, short)
+    assert np.allclose(overlap, np.cos(t) + np.sin(t), atol=1e-3)
+    assert overlap[0] == 1.0 and overlap[-1] == 1.0